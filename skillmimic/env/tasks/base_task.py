@@ -17,6 +17,9 @@ from isaacgym.gymutil import get_property_setter_map, get_property_getter_map, g
 import numpy as np
 import torch
 
+from utils import randomization
+from utils.step_timer import time_phase
+
 
 # Base class for RL tasks
 class BaseTask():
@@ -45,6 +48,12 @@ class BaseTask():
 
         self.control_freq_inv = cfg["env"].get("controlFrequencyInv", 1)
 
+        # raise on any host-device sync inside a headless step
+        self.sync_debug = cfg["env"].get("syncDebug", False) and self.headless and self.device != "cpu"
+
+        # set by the agent when step timing is enabled
+        self.step_timer = None
+
         # optimization flags for pytorch JIT
         torch._C._jit_set_profiling_mode(False)
         torch._C._jit_set_profiling_executor(False)
@@ -75,8 +84,16 @@ class BaseTask():
         self.last_step = -1
         self.last_rand_step = -1
 
+        # domain randomization with the task.randomization_params of the config, see apply_randomizations
+        cfg_task = cfg.get("task", {})
+        self.randomization_params = cfg_task.get("randomization_params", None)
+        self.randomize = cfg_task.get("randomize", False) and self.randomization_params is not None
+        self.vectorized_randomization = cfg_task.get("vectorized_randomization", False)
+
         # create envs, sim and viewer
         self.create_sim()
+        if self.randomize:
+            self.apply_randomizations(self.randomization_params)
         self.gym.prepare_sim(self.sim)
 
         # todo: read from config
@@ -124,24 +141,43 @@ class BaseTask():
         return sim
 
     def step(self, actions):
-        if self.dr_randomizations.get('actions', None):
-            actions = self.dr_randomizations['actions']['noise_lambda'](actions)
+        # randomizes the envs reset since the last step, gym property setters sync with the host
+        if self.randomize:
+            self.apply_randomizations(self.randomization_params)
+
+        if self.sync_debug:
+            torch.cuda.set_sync_debug_mode("error")
+
+        try:
+            if self.dr_randomizations.get('actions', None):
+                actions = self.dr_randomizations['actions']['noise_lambda'](actions)
+
+            # apply actions
+            with time_phase(self.step_timer, 'pre_physics_step'):
+                self.pre_physics_step(actions)
 
-        # apply actions
-        self.pre_physics_step(actions)
+            # step physics and render each frame
+            # on a GPU pipeline PhysX does not run on the torch stream the timer's events are recorded on,
+            # so its time lands in the first phase that waits for the results, the 'refresh' of post_physics_step
+            with time_phase(self.step_timer, 'simulate'):
+                self._physics_step()
 
-        # step physics and render each frame
-        self._physics_step()
+            # to fix!
+            if self.device == 'cpu':
+                self.gym.fetch_results(self.sim, True)
 
-        # to fix!
-        if self.device == 'cpu':
-            self.gym.fetch_results(self.sim, True)
+            if self.randomize:
+                self.randomize_buf += 1
 
-        # compute observations, rewards, resets, ...
-        self.post_physics_step()
+            # compute observations, rewards, resets, ...
+            with time_phase(self.step_timer, 'post_physics_step'):
+                self.post_physics_step()
 
-        if self.dr_randomizations.get('observations', None):
-            self.obs_buf = self.dr_randomizations['observations']['noise_lambda'](self.obs_buf)
+            if self.dr_randomizations.get('observations', None):
+                self.obs_buf[:] = self.dr_randomizations['observations']['noise_lambda'](self.obs_buf)
+        finally:
+            if self.sync_debug:
+                torch.cuda.set_sync_debug_mode("default")
 
     def get_states(self):
         return self.states_buf
@@ -214,6 +250,9 @@ class BaseTask():
 
     # Apply randomizations only on resets, due to current PhysX limitations
     def apply_randomizations(self, dr_params):
+        if self.vectorized_randomization:
+            return self.apply_randomizations_vectorized(dr_params)
+
         # If we don't have a randomization frequency, randomize every step
         rand_freq = dr_params.get("frequency", 1)
 
@@ -316,18 +355,7 @@ class BaseTask():
                     self.dr_randomizations[nonphysical_param] = {'lo': lo, 'hi': hi, 'lo_corr': lo_corr, 'hi_corr': hi_corr, 'noise_lambda': noise_lambda}
 
         if "sim_params" in dr_params and do_nonenv_randomize:
-            prop_attrs = dr_params["sim_params"]
-            prop = self.gym.get_sim_params(self.sim)
-
-            if self.first_randomization:
-                self.original_props["sim_params"] = {
-                    attr: getattr(prop, attr) for attr in dir(prop)}
-
-            for attr, attr_randomization_params in prop_attrs.items():
-                apply_random_samples(
-                    prop, self.original_props["sim_params"], attr, attr_randomization_params, self.last_step)
-
-            self.gym.set_sim_params(self.sim, prop)
+            self._randomize_sim_params(dr_params["sim_params"])
 
         # If self.actor_params_generator is initialized: use it to
         # sample actor simulation params. This gives users the
@@ -409,6 +437,129 @@ class BaseTask():
 
         self.first_randomization = False
 
+    def _randomize_sim_params(self, prop_attrs):
+        prop = self.gym.get_sim_params(self.sim)
+
+        if self.first_randomization:
+            self.original_props["sim_params"] = {
+                attr: getattr(prop, attr) for attr in dir(prop)}
+
+        for attr, attr_randomization_params in prop_attrs.items():
+            apply_random_samples(
+                prop, self.original_props["sim_params"], attr, attr_randomization_params, self.last_step)
+
+        self.gym.set_sim_params(self.sim, prop)
+        return
+
+    # Tensor-based variant of apply_randomizations, used by it with task.vectorized_randomization.
+    # Each actor property attribute is drawn for all envs in one batched sample, and gym setters
+    # only run for envs whose values changed. Observation and action noise is sampled on device.
+    # Colors, scales and an actor_params_generator are only supported by the per-env path.
+    def apply_randomizations_vectorized(self, dr_params):
+        rand_freq = dr_params.get("frequency", 1)
+
+        self.last_step = self.gym.get_frame_count(self.sim)
+        if self.first_randomization:
+            unsupported = [prop_name for actor_properties in dr_params.get("actor_params", {}).values()
+                           for prop_name in actor_properties if prop_name in ['color', 'scale']]
+            assert(len(unsupported) == 0 and self.actor_params_generator is None), \
+                "Vectorized randomization does not support color, scale or an actor_params_generator"
+            do_nonenv_randomize = True
+            rand_envs = torch.ones(self.num_envs, device=self.device, dtype=torch.bool)
+            check_buckets(self.gym, self.envs, dr_params)
+            self._dr_original_values = {}
+            self._dr_values = {}
+        else:
+            do_nonenv_randomize = (self.last_step - self.last_rand_step) >= rand_freq
+            rand_envs = torch.logical_and(self.randomize_buf >= rand_freq, self.reset_buf)
+            self.randomize_buf[rand_envs] = 0
+
+        if do_nonenv_randomize:
+            self.last_rand_step = self.last_step
+
+        for nonphysical_param in ["observations", "actions"]:
+            if nonphysical_param in dr_params and do_nonenv_randomize:
+                self._build_batched_noise(nonphysical_param, dr_params[nonphysical_param])
+
+            # Unlike apply_randomizations, which redraws the correlated part of the noise for all envs
+            # whenever the noise is rebuilt, it is redrawn here for the randomized envs only
+            params = self.dr_randomizations.get(nonphysical_param, None)
+            if params is not None and params['corr'] is not None:
+                corr = torch.randn_like(params['corr'])
+                params['corr'] = torch.where(rand_envs.unsqueeze(-1), corr, params['corr'])
+
+        if "sim_params" in dr_params and do_nonenv_randomize:
+            self._randomize_sim_params(dr_params["sim_params"])
+
+        param_setters_map = get_property_setter_map(self.gym)
+        param_setter_defaults_map = get_default_setter_args(self.gym)
+        param_getters_map = get_property_getter_map(self.gym)
+
+        rand_envs = rand_envs.cpu()
+        for actor, actor_properties in dr_params.get("actor_params", {}).items():
+            # envs are built identically, so an actor has the same handle in every env
+            handle = self.gym.find_actor_handle(self.envs[0], actor)
+
+            for prop_name, prop_attrs in actor_properties.items():
+                changed = torch.zeros(self.num_envs, dtype=torch.bool)
+                values = {}
+                for attr, attr_randomization_params in prop_attrs.items():
+                    key = (actor, prop_name, attr)
+                    if self.first_randomization:
+                        prop = param_getters_map[prop_name](self.envs[0], handle)
+                        if isinstance(prop, np.ndarray):
+                            original = prop[attr]
+                        else:
+                            original = [getattr(p, attr) for p in prop]
+                        self._dr_original_values[key] = torch.tensor(original, dtype=torch.float64)
+                        self._dr_values[key] = self._dr_original_values[key].repeat(self.num_envs, 1)
+
+                    prev_values = self._dr_values[key]
+                    new_values = randomization.sample_params(attr_randomization_params, self._dr_original_values[key],
+                                                             self.num_envs, self.last_step)
+                    new_values = torch.where(rand_envs.unsqueeze(-1), new_values, prev_values)
+                    changed |= torch.any(new_values != prev_values, dim=-1)
+                    self._dr_values[key] = new_values
+                    values[attr] = new_values.numpy()
+
+                setter = param_setters_map[prop_name]
+                default_args = param_setter_defaults_map[prop_name]
+                for env_id in torch.nonzero(changed, as_tuple=False).squeeze(-1).tolist():
+                    env = self.envs[env_id]
+                    prop = param_getters_map[prop_name](env, handle)
+                    for attr, attr_values in values.items():
+                        if isinstance(prop, np.ndarray):
+                            prop[attr] = attr_values[env_id]
+                        else:
+                            for p, value in zip(prop, attr_values[env_id]):
+                                setattr(p, attr, float(value))
+                    setter(env, handle, prop, *default_args)
+
+        self.first_randomization = False
+        return
+
+    def _build_batched_noise(self, param_name, params):
+        op = randomization.get_operator(params)
+        corr = self.dr_randomizations[param_name]['corr'] if param_name in self.dr_randomizations else None
+        self.dr_randomizations[param_name] = {
+            'distribution': params["distribution"],
+            'range': randomization.scheduled_range(params, self.last_step),
+            'corr_range': randomization.scheduled_range(params, self.last_step, "range_correlated"),
+            'corr': corr,
+        }
+
+        def noise_lambda(tensor, param_name=param_name):
+            params = self.dr_randomizations[param_name]
+            # as in apply_randomizations, the correlated part is a standard normal draw scaled by its range
+            if params['corr'] is None:
+                params['corr'] = torch.randn_like(tensor)
+            corr = randomization.scale_correlated(params['distribution'], params['corr_range'], params['corr'])
+            noise = randomization.sample(params['distribution'], params['range'], tensor.shape, device=tensor.device)
+            return op(tensor, corr + noise)
+
+        self.dr_randomizations[param_name]['noise_lambda'] = noise_lambda
+        return
+
     def pre_physics_step(self, actions):
         raise NotImplementedError
 
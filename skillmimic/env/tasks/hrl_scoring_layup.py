@@ -258,7 +258,7 @@ class HRLScoringLayup(HumanoidWholeBodyWithObject):
     def _update_proj(self):
         # mouse control
         if self.projtype == 'Mouse':
-            for evt in self.gym.query_viewer_action_events(self.viewer):
+            for evt in self.evts:
                 if (evt.action == "space_shoot" or evt.action == "mouse_shoot") and evt.value > 0:
                     x = torch.rand(self.num_envs).to("cuda")*6 + 2
                     y = torch.rand(self.num_envs).to("cuda")*6 + 2
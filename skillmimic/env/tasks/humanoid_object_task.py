@@ -9,8 +9,9 @@ from isaacgym import gymapi
 from isaacgym.torch_utils import *
 
 from utils import torch_utils
+from utils import asset_cache
 
-from env.tasks.humanoid_task import HumanoidWholeBody
+from env.tasks.humanoid_task import HumanoidWholeBody, SimTensorView
 from utils.metrics import Metrics, compute_evaluation_metrics
 
 
@@ -20,6 +21,11 @@ PERTURB_PROJECTORS = [
 ]
 
 class HumanoidWholeBodyWithObject(HumanoidWholeBody): #metric
+    _target_states = SimTensorView('root_state')
+    _proj_states = SimTensorView('root_state')
+    _tar_contact_forces = SimTensorView('contact_force')
+    _proj_contact_forces = SimTensorView('contact_force')
+
     def __init__(self, cfg, sim_params, physics_engine, device_type, device_id, headless):
         self.projtype = cfg['env']['projtype']
         
@@ -69,7 +75,9 @@ class HumanoidWholeBodyWithObject(HumanoidWholeBody): #metric
         asset_options.max_angular_velocity = 100.0
         asset_options.density = self.ball_density #85.0#*6
         asset_options.default_dof_drive_mode = gymapi.DOF_MODE_NONE
-        asset_options.vhacd_enabled = True
+        # convex decomposition only applies to mesh collision geometry, the ball is a sphere primitive
+        asset_options.vhacd_enabled = asset_cache.urdf_has_mesh_collision(os.path.join(asset_root, asset_file),
+                                                                          self.get_asset_cache_dir())
         asset_options.vhacd_params.max_convex_hulls = 1
         asset_options.vhacd_params.max_num_vertices_per_ch = 64
         asset_options.vhacd_params.resolution = 300000
@@ -78,6 +86,11 @@ class HumanoidWholeBodyWithObject(HumanoidWholeBody): #metric
         # asset_options.fix_base_link = True
 
         self._target_asset = self.gym.load_asset(self.sim, asset_root, asset_file, asset_options)
+
+        # shape properties are the same for every ball, filled from the first actor in _build_target
+        self._target_shape_props = None
+        if not self.headless:
+            self._target_texture = self.gym.create_texture_from_file(self.sim, 'skillmimic/data/assets/urdf/basketball.png') #projectname
         return
     
     def _load_proj_asset(self):
@@ -113,19 +126,19 @@ class HumanoidWholeBodyWithObject(HumanoidWholeBody): #metric
 
         target_handle = self.gym.create_actor(env_ptr, self._target_asset, default_pose, "target", col_group, col_filter, segmentation_id)
 
-        ball_props =  self.gym.get_actor_rigid_shape_properties(env_ptr, target_handle)
-        # Modify the properties
-        for b in ball_props:
-            b.restitution = self.ball_restitution #0.66 #1.6
-        self.gym.set_actor_rigid_shape_properties(env_ptr, target_handle, ball_props)  
+        if self._target_shape_props is None:
+            self._target_shape_props = self.gym.get_actor_rigid_shape_properties(env_ptr, target_handle)
+            # Modify the properties
+            for b in self._target_shape_props:
+                b.restitution = self.ball_restitution #0.66 #1.6
+        self.gym.set_actor_rigid_shape_properties(env_ptr, target_handle, self._target_shape_props)  
         
         # set ball color
-        if self.cfg["headless"] == False:
+        if not self.headless:
             self.gym.set_rigid_body_color(env_ptr, target_handle, 0, gymapi.MESH_VISUAL,
                                         gymapi.Vec3(1.5, 1.5, 1.5))
                                         # gymapi.Vec3(0., 1.0, 1.5))
-            h = self.gym.create_texture_from_file(self.sim, 'skillmimic/data/assets/urdf/basketball.png') #projectname
-            self.gym.set_rigid_body_texture(env_ptr, target_handle, 0, gymapi.MESH_VISUAL, h)
+            self.gym.set_rigid_body_texture(env_ptr, target_handle, 0, gymapi.MESH_VISUAL, self._target_texture)
 
 
         self._target_handles.append(target_handle)
@@ -230,18 +243,64 @@ class HumanoidWholeBodyWithObject(HumanoidWholeBody): #metric
         self._target_states[env_ids, 10:13] = self.init_obj_rot_vel[env_ids]
         return
 
-    def _reset_env_tensors(self, env_ids):
-        super()._reset_env_tensors(env_ids)
+    def _reset_target_masked(self, reset_mask):
+        init_target_states = torch.cat([self.init_obj_pos, self.init_obj_rot,
+                                        self.init_obj_pos_vel, self.init_obj_rot_vel], dim=-1)
+        self._target_states[:] = torch.where(reset_mask.unsqueeze(-1), init_target_states, self._target_states)
+        return
 
-        env_ids_int32 = self._tar_actor_ids[env_ids]
-        self.gym.set_actor_root_state_tensor_indexed(self.sim, gymtorch.unwrap_tensor(self._root_states),
-                                                    gymtorch.unwrap_tensor(env_ids_int32), len(env_ids_int32))
-    
+    def snapshot(self, env_ids=None):
+        """
+        Copy of the simulation and episode state of env_ids, to be put back with restore(),
+        e.g. to evaluate several policies from the same mid-episode situation.
+
+        Returns:
+        dict: A [len(env_ids), ...] tensor per entry of _get_snapshot_tensors.
+        """
+        if (env_ids is None):
+            env_ids = self._all_env_ids
+        return {name: tensor[env_ids].clone() for name, tensor in self._get_snapshot_tensors().items()}
+
+    def restore(self, snapshot, env_ids=None):
+        """
+        Write a snapshot back into env_ids. A snapshot of a single env is broadcast to all of env_ids.
+        """
+        if (env_ids is None):
+            env_ids = self._all_env_ids
+        for name, tensor in self._get_snapshot_tensors().items():
+            tensor[env_ids] = snapshot[name]
+        self._set_env_state_tensors(env_ids)
         return
+
+    def _get_snapshot_tensors(self):
+        # per-env tensors indexed by env id along dim 0, written back in place by restore
+        return {
+            'humanoid_root_states': self._humanoid_root_states,
+            'dof_pos': self._dof_pos,
+            'dof_vel': self._dof_vel,
+            'target_states': self._target_states,
+            'progress_buf': self.progress_buf,
+            'reset_buf': self.reset_buf,
+            'terminate_buf': self._terminate_buf,
+            'obs_buf': self.obs_buf,
+        }
+
+    def _get_reset_root_actor_ids(self, env_ids):
+        humanoid_actor_ids = super()._get_reset_root_actor_ids(env_ids)
+        return torch.cat([humanoid_actor_ids, self._tar_actor_ids[env_ids]])
+
+    def _get_pre_step_sim_tensors(self):
+        sim_tensors = super()._get_pre_step_sim_tensors()
+        if self.projtype == "Mouse":
+            sim_tensors += ['root_state'] # read by _update_proj
+        return sim_tensors
     
     def pre_physics_step(self, actions):
         super().pre_physics_step(actions)
-        self.evts = list(self.gym.query_viewer_action_events(self.viewer))
+        if self.viewer:
+            self.evts = list(self.gym.query_viewer_action_events(self.viewer))
+        else:
+            self.evts = []
         return 
     
     def post_physics_step(self):
@@ -253,14 +312,19 @@ class HumanoidWholeBodyWithObject(HumanoidWholeBody): #metric
     def _update_proj(self):
 
         if self.projtype == 'Auto':
-            curr_timestep = self.progress_buf.cpu().numpy()[0]
-            curr_timestep = curr_timestep % (self._perturb_timesteps[-1] + 1)
-            perturb_step = np.where(self._perturb_timesteps == curr_timestep)[0]
-            
-            if (len(perturb_step) > 0):
-                perturb_id = perturb_step[0]
-                n = self.num_envs
-                humanoid_root_pos = self._humanoid_root_states[..., 0:3]
+            # the schedule stays on device: the launch state is selected with torch.where and
+            # all projectiles are written every step, so the step never waits on progress_buf
+            curr_timestep = self.progress_buf[0] % (int(self._perturb_timesteps[-1]) + 1)
+
+            # launch from the states reached by this step's simulate
+            self._mark_sim_tensors_stale(['root_state', 'rigid_body_state'])
+            n = self.num_envs
+            humanoid_root_pos = self._humanoid_root_states[..., 0:3]
+
+            for perturb_id in range(len(PERTURB_PROJECTORS)):
+                fire = curr_timestep == int(self._perturb_timesteps[perturb_id])
+                proj_states = self._proj_states[..., perturb_id, :]
+                launch_states = torch.zeros_like(proj_states)
 
                 rand_theta = torch.rand([n], dtype=self._proj_states.dtype, device=self._proj_states.device)
                 rand_theta *= 2 * np.pi
@@ -269,28 +333,27 @@ class HumanoidWholeBodyWithObject(HumanoidWholeBody): #metric
                 pos_y = -rand_dist * torch.sin(rand_theta)
                 pos_z = (self._proj_h_max - self._proj_h_min) * torch.rand([n], dtype=self._proj_states.dtype, device=self._proj_states.device) + self._proj_h_min
                 
-                self._proj_states[..., perturb_id, 0] = humanoid_root_pos[..., 0] + pos_x
-                self._proj_states[..., perturb_id, 1] = humanoid_root_pos[..., 1] + pos_y
-                self._proj_states[..., perturb_id, 2] = pos_z
-                self._proj_states[..., perturb_id, 3:6] = 0.0
-                self._proj_states[..., perturb_id, 6] = 1.0
+                launch_states[..., 0] = humanoid_root_pos[..., 0] + pos_x
+                launch_states[..., 1] = humanoid_root_pos[..., 1] + pos_y
+                launch_states[..., 2] = pos_z
+                launch_states[..., 6] = 1.0
                 
-                tar_body_idx = np.random.randint(self.num_bodies)
                 tar_body_idx = 1
 
                 launch_tar_pos = self._rigid_body_pos[..., tar_body_idx, :]
-                launch_dir = launch_tar_pos - self._proj_states[..., perturb_id, 0:3]
+                launch_dir = launch_tar_pos - launch_states[..., 0:3]
                 launch_dir += 0.1 * torch.randn_like(launch_dir)
                 launch_dir = torch.nn.functional.normalize(launch_dir, dim=-1)
                 launch_speed = (self._proj_speed_max - self._proj_speed_min) * torch.rand_like(launch_dir[:, 0:1]) + self._proj_speed_min
                 launch_vel = launch_speed * launch_dir
                 launch_vel[..., 0:2] += self._rigid_body_vel[..., tar_body_idx, 0:2]
-                self._proj_states[..., perturb_id, 7:10] = launch_vel
-                self._proj_states[..., perturb_id, 10:13] = 0.0
+                launch_states[..., 7:10] = launch_vel
+
+                proj_states[:] = torch.where(fire, launch_states, proj_states)
 
-                self.gym.set_actor_root_state_tensor_indexed(self.sim, gymtorch.unwrap_tensor(self._root_states),
-                                                             gymtorch.unwrap_tensor(self._proj_actor_ids),
-                                                             len(self._proj_actor_ids))
+            self.gym.set_actor_root_state_tensor_indexed(self.sim, gymtorch.unwrap_tensor(self._root_states),
+                                                         gymtorch.unwrap_tensor(self._proj_actor_ids),
+                                                         len(self._proj_actor_ids))
             
         elif self.projtype == 'Mouse':
             # mouse control
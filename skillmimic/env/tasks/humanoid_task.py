@@ -10,6 +10,8 @@ from isaacgym import gymapi
 from isaacgym.torch_utils import *
 
 from utils import torch_utils
+from utils import asset_cache
+from utils.step_timer import time_phase
 
 from env.tasks.base_task import BaseTask
 
@@ -19,7 +21,41 @@ PERTURB_OBJS = [
     # ["large", 60],
 ]
 
+class SimTensorView:
+    """
+    Attribute holding a slice of a gym state tensor. Reading it first refreshes the
+    underlying tensor if it went stale since its last refresh.
+    """
+    def __init__(self, sim_tensor):
+        self.sim_tensor = sim_tensor
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        if self.name not in obj.__dict__:
+            raise AttributeError(self.name)
+        obj._refresh_sim_tensor(self.sim_tensor)
+        return obj.__dict__[self.name]
+
+    def __set__(self, obj, value):
+        obj.__dict__[self.name] = value
+
 class HumanoidWholeBody(BaseTask):
+    _root_states = SimTensorView('root_state')
+    _humanoid_root_states = SimTensorView('root_state')
+    _dof_state = SimTensorView('dof_state')
+    _dof_pos = SimTensorView('dof_state')
+    _dof_vel = SimTensorView('dof_state')
+    _rigid_body_state = SimTensorView('rigid_body_state')
+    _rigid_body_pos = SimTensorView('rigid_body_state')
+    _rigid_body_rot = SimTensorView('rigid_body_state')
+    _rigid_body_vel = SimTensorView('rigid_body_state')
+    _rigid_body_ang_vel = SimTensorView('rigid_body_state')
+    _contact_forces = SimTensorView('contact_force')
+
     def __init__(self, cfg, sim_params, physics_engine, device_type, device_id, headless):
         self._enable_task_obs = cfg["env"]["enableTaskObs"]
 
@@ -72,10 +108,20 @@ class HumanoidWholeBody(BaseTask):
         self.gym.refresh_rigid_body_state_tensor(self.sim)
         self.gym.refresh_net_contact_force_tensor(self.sim)
 
+        # tensors are refreshed lazily, on the first read after simulate or an indexed write
+        self._sim_tensor_refresh_fns = {
+            'dof_state': self.gym.refresh_dof_state_tensor,
+            'root_state': self.gym.refresh_actor_root_state_tensor,
+            'rigid_body_state': self.gym.refresh_rigid_body_state_tensor,
+            'contact_force': self.gym.refresh_net_contact_force_tensor,
+        }
+        self._sim_tensor_stale = {name: False for name in self._sim_tensor_refresh_fns}
+
         # create some wrapper tensors for different slices
         self._root_states = gymtorch.wrap_tensor(actor_root_state)
         num_actors = self.get_num_actors_per_env()
         self._humanoid_actor_ids = num_actors * torch.arange(self.num_envs, device=self.device, dtype=torch.int32)
+        self._all_env_ids = torch.arange(self.num_envs, device=self.device, dtype=torch.long)
         self._humanoid_root_states = self._root_states.view(self.num_envs, num_actors, actor_root_state.shape[-1])[..., 0, :]
         self._initial_humanoid_root_states = self._humanoid_root_states.clone()
         self._initial_humanoid_root_states[:, 7:13] = 0
@@ -193,6 +239,13 @@ class HumanoidWholeBody(BaseTask):
         # asset_options.disable_gravity = True
         humanoid_asset = self.gym.load_asset(self.sim, asset_root, asset_file, asset_options)
 
+        # body and dof names parsed from the MJCF once, then read from the asset cache
+        self._humanoid_metadata = asset_cache.load_mjcf_metadata(asset_path,
+                                                                 self.cfg["env"]["keyBodies"],
+                                                                 self.cfg["env"]["contactBodies"],
+                                                                 self.get_asset_cache_dir())
+        assert(self._humanoid_metadata['body_names'] == self.gym.get_asset_rigid_body_names(humanoid_asset))
+
         self.num_humanoid_bodies = self.gym.get_asset_rigid_body_count(humanoid_asset)
         self.num_humanoid_shapes = self.gym.get_asset_rigid_shape_count(humanoid_asset)
 
@@ -222,6 +275,11 @@ class HumanoidWholeBody(BaseTask):
 
         max_agg_bodies = self.num_humanoid_bodies + 2
         max_agg_shapes = self.num_humanoid_shapes + 2
+
+        # identical for every env, so built once here instead of in _build_env
+        if (self._pd_control):
+            self._humanoid_dof_props = self.gym.get_asset_dof_properties(humanoid_asset)
+            self._humanoid_dof_props["driveMode"] = gymapi.DOF_MODE_POS
         
         for i in range(self.num_envs):
             # create env instance
@@ -266,13 +324,13 @@ class HumanoidWholeBody(BaseTask):
 
         self.gym.enable_actor_dof_force_sensors(env_ptr, humanoid_handle)
 
-        for j in range(self.num_bodies):
-            self.gym.set_rigid_body_color(env_ptr, humanoid_handle, j, gymapi.MESH_VISUAL, gymapi.Vec3(0.54, 0.85, 0.2))
+        # colors are only visible in the viewer
+        if not self.headless:
+            for j in range(self.num_bodies):
+                self.gym.set_rigid_body_color(env_ptr, humanoid_handle, j, gymapi.MESH_VISUAL, gymapi.Vec3(0.54, 0.85, 0.2))
 
         if (self._pd_control):
-            dof_prop = self.gym.get_asset_dof_properties(humanoid_asset)
-            dof_prop["driveMode"] = gymapi.DOF_MODE_POS
-            self.gym.set_actor_dof_properties(env_ptr, humanoid_handle, dof_prop)
+            self.gym.set_actor_dof_properties(env_ptr, humanoid_handle, self._humanoid_dof_props)
 
         self.humanoid_handles.append(humanoid_handle)
 
@@ -303,39 +361,95 @@ class HumanoidWholeBody(BaseTask):
     def reset(self, env_ids=None):
         if (env_ids is None):
             env_ids = to_torch(np.arange(self.num_envs), device=self.device, dtype=torch.long)
+        elif (torch.is_tensor(env_ids) and env_ids.dtype == torch.bool):
+            self._reset_envs_masked(env_ids)
+            return
         self._reset_envs(env_ids)
         return
 
+    def _reset_envs_masked(self, reset_mask):
+        # tasks without a mask path fall back to the index path, nonzero syncs with the host here
+        self._reset_envs(reset_mask.nonzero(as_tuple=False).flatten())
+        return
+
     def _reset_envs(self, env_ids):
         if (len(env_ids) > 0):
             self._reset_actors(env_ids)
             self._reset_env_tensors(env_ids)
-            self._refresh_sim_tensors()
             self._compute_observations(env_ids)
         return
 
     def _reset_env_tensors(self, env_ids): #Z10
-        env_ids_int32 = self._humanoid_actor_ids[env_ids]
+        self._set_env_state_tensors(env_ids)
+        self.progress_buf[env_ids] = 0
+        self.reset_buf[env_ids] = 0
+        self._terminate_buf[env_ids] = 0
+        return
+
+    def _set_env_state_tensors(self, env_ids):
+        # all actors of env_ids go through a single indexed write per state tensor
+        root_actor_ids = self._get_reset_root_actor_ids(env_ids)
+        dof_actor_ids = self._get_reset_dof_actor_ids(env_ids)
         self.gym.set_actor_root_state_tensor_indexed(self.sim,
                                                      gymtorch.unwrap_tensor(self._root_states),
-                                                     gymtorch.unwrap_tensor(env_ids_int32), len(env_ids_int32))
+                                                     gymtorch.unwrap_tensor(root_actor_ids), len(root_actor_ids))
         self.gym.set_dof_state_tensor_indexed(self.sim,
                                               gymtorch.unwrap_tensor(self._dof_state),
-                                              gymtorch.unwrap_tensor(env_ids_int32), len(env_ids_int32))
-        self.progress_buf[env_ids] = 0
-        self.reset_buf[env_ids] = 0
-        self._terminate_buf[env_ids] = 0
+                                              gymtorch.unwrap_tensor(dof_actor_ids), len(dof_actor_ids))
+        # root and dof states hold what was just written, only the derived tensors need a refresh
+        self._mark_sim_tensors_stale(['rigid_body_state', 'contact_force'])
+        return
+
+    def _reset_env_tensors_masked(self, reset_mask):
+        # every actor is written, the ones not being reset get their current state back,
+        # so the actor id list and its length do not depend on the mask
+        self._set_env_state_tensors(self._all_env_ids)
+        self.progress_buf.masked_fill_(reset_mask, 0)
+        self.reset_buf.masked_fill_(reset_mask, 0)
+        self._terminate_buf.masked_fill_(reset_mask, 0)
+        return
+
+    def _compute_observations_masked(self, reset_mask):
+        # Observations are computed for every env and only kept where reset_mask is set. Computing just the
+        # masked rows would need their indices on the host, the sync this path avoids, so a reset costs one
+        # full observation pass, the same as post_physics_step, however few envs are reset.
+        prev_obs_buf = self.obs_buf.clone()
+        self._compute_observations()
+        self.obs_buf[:] = torch.where(reset_mask.unsqueeze(-1), self.obs_buf, prev_obs_buf)
         return
+
+    def _get_reset_root_actor_ids(self, env_ids):
+        return self._humanoid_actor_ids[env_ids]
+
+    def _get_reset_dof_actor_ids(self, env_ids):
+        return self._humanoid_actor_ids[env_ids]
     
     def _refresh_sim_tensors(self):
-        self.gym.refresh_dof_state_tensor(self.sim)
-        self.gym.refresh_actor_root_state_tensor(self.sim)
-        self.gym.refresh_rigid_body_state_tensor(self.sim)
+        for name in self._sim_tensor_stale:
+            self._refresh_sim_tensor(name)
         # self.gym.refresh_force_sensor_tensor(self.sim)
         # self.gym.refresh_dof_force_tensor(self.sim) 
-        self.gym.refresh_net_contact_force_tensor(self.sim)
 
         return
+
+    def _refresh_sim_tensor(self, name):
+        if self._sim_tensor_stale[name]:
+            with time_phase(self.step_timer, 'refresh'):
+                self._sim_tensor_refresh_fns[name](self.sim)
+            self._sim_tensor_stale[name] = False
+        return
+
+    def _mark_sim_tensors_stale(self, names=None):
+        if names is None:
+            names = self._sim_tensor_stale.keys()
+        for name in names:
+            self._sim_tensor_stale[name] = True
+        return
+
+    def _get_pre_step_sim_tensors(self):
+        # tensors read in post_physics_step before they are marked stale, these must
+        # still hold their values from before simulate
+        return []
     
     def _reset_actors(self, env_ids):
         self._reset_humanoid(env_ids)
@@ -365,6 +479,12 @@ class HumanoidWholeBody(BaseTask):
         pd_tar = self._pd_action_offset + self._pd_action_scale * action
         return pd_tar
 
+    def _physics_step(self):
+        for name in self._get_pre_step_sim_tensors():
+            self._refresh_sim_tensor(name)
+        super()._physics_step()
+        return
+
     def post_physics_step(self):
         if self.projtype == "Mouse" or self.projtype == "Auto":
             self._update_proj()
@@ -372,12 +492,15 @@ class HumanoidWholeBody(BaseTask):
         self.progress_buf += 1
         # print(int(self.progress_buf[0]), "   ", end=' ')
 
-        self._refresh_sim_tensors()
+        self._mark_sim_tensors_stale()
 
-        self._compute_observations() # for policy
-        self._compute_reward(self.actions)
+        with time_phase(self.step_timer, 'observations'):
+            self._compute_observations() # for policy
+        with time_phase(self.step_timer, 'reward'):
+            self._compute_reward(self.actions)
         # self._compute_metrics() #metric zqh
-        self._compute_reset()
+        with time_phase(self.step_timer, 'compute_reset'):
+            self._compute_reset()
 
         # print(f'step: {int(self.progress_buf[0])}, reward: {float(self.rew_buf[0]):.10f}')
         
@@ -455,30 +578,21 @@ class HumanoidWholeBody(BaseTask):
         return
     
     def _build_key_body_ids_tensor(self, key_body_names):
-        env_ptr = self.envs[0]
-        actor_handle = self.humanoid_handles[0]
+        body_names = self._humanoid_metadata['body_names']
         body_ids = []
 
         for body_name in key_body_names:
-            body_id = self.gym.find_actor_rigid_body_handle(env_ptr, actor_handle, body_name)
-            assert(body_id != -1)
-            body_ids.append(body_id)
+            assert(body_name in body_names)
+            body_ids.append(body_names.index(body_name))
 
         body_ids = to_torch(body_ids, device=self.device, dtype=torch.long)
         return body_ids
 
     def _build_contact_body_ids_tensor(self, contact_body_names):
-        env_ptr = self.envs[0]
-        actor_handle = self.humanoid_handles[0]
-        body_ids = []
-
-        for body_name in contact_body_names:
-            body_id = self.gym.find_actor_rigid_body_handle(env_ptr, actor_handle, body_name)
-            assert(body_id != -1)
-            body_ids.append(body_id)
+        return self._build_key_body_ids_tensor(contact_body_names)
 
-        body_ids = to_torch(body_ids, device=self.device, dtype=torch.long)
-        return body_ids
+    def get_asset_cache_dir(self):
+        return self.cfg["env"]["asset"].get("cacheDir", asset_cache.DEFAULT_CACHE_DIR)
     
     def _init_camera(self):
         self.gym.refresh_actor_root_state_tensor(self.sim)
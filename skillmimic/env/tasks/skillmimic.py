@@ -4,6 +4,7 @@ import torch
 from torch import Tensor
 from typing import Tuple
 import glob, os, random
+import atexit
 from isaacgym import gymtorch
 from isaacgym import gymapi
 from isaacgym.torch_utils import *
@@ -11,6 +12,8 @@ from datetime import datetime
 
 from utils import torch_utils
 from utils.motion_data_handler import MotionDataHandler
+from utils.motion_scan import save_report
+from utils.frame_writer import FrameWriter
 
 from env.tasks.humanoid_object_task import HumanoidWholeBodyWithObject
 
@@ -31,6 +34,8 @@ class SkillMimicBallPlay(HumanoidWholeBodyWithObject):
         self.reward_weights_default = cfg["env"]["rewardWeights"]
         self.save_images = cfg['env']['saveImages']
         self.save_images_timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self._frame_writer_mode = cfg['env'].get('frameWriter', 'viewer')
+        self._frame_writer = None
         self.init_vel = cfg['env']['initVel']
         self.isTest = cfg['args'].test
 
@@ -60,6 +65,17 @@ class SkillMimicBallPlay(HumanoidWholeBodyWithObject):
 
         self._subscribe_events_for_change_condition()
 
+        # frames are captured from a camera sensor that follows the viewer camera and written
+        # in the background; 'viewer' keeps the synchronous write_viewer_image_to_file dump
+        if self.save_images and self.viewer and self._frame_writer_mode != 'viewer':
+            if self._frame_writer_mode == 'video':
+                out_path = "skillmimic/data/videos/" + self.save_images_timestamp + ".mp4" #projectname
+            else:
+                out_path = "skillmimic/data/images/" + self.save_images_timestamp #projectname
+            self._frame_writer = FrameWriter(out_path, self._frame_writer_mode,
+                                             fps=cfg['env'].get('frameWriterFps', 30))
+            atexit.register(self._frame_writer.close)
+
         self.envid2motid = torch.zeros(self.num_envs, device=self.device, dtype=torch.long) #{}
         # self.envid2episode_lengths = torch.zeros(self.num_envs, device=self.device, dtype=torch.long)
 
@@ -88,6 +104,31 @@ class SkillMimicBallPlay(HumanoidWholeBodyWithObject):
 
         return
 
+    def _get_pre_step_sim_tensors(self):
+        # _compute_hoi_observations reads these before they are marked stale. Only a stale tensor is refreshed:
+        # root and rigid body states were already read by the last step's observations, so in practice only
+        # dof_state is refreshed here, once per step, in place of its refresh after simulate.
+        sim_tensors = super()._get_pre_step_sim_tensors()
+        sim_tensors += ['dof_state', 'root_state', 'rigid_body_state'] # read by _compute_hoi_observations
+        return sim_tensors
+
+    def _get_snapshot_tensors(self):
+        snapshot_tensors = super()._get_snapshot_tensors()
+        snapshot_tensors.update({
+            'hoi_data_batch': self.hoi_data_batch,
+            'hoi_data_label_batch': self.hoi_data_label_batch,
+            'curr_ref_obs': self._curr_ref_obs,
+            'hist_ref_obs': self._hist_ref_obs,
+            'curr_obs': self._curr_obs,
+            'hist_obs': self._hist_obs,
+            'reached_target': self.reached_target,
+            'envid2motid': self._motion_data.envid2motid,
+            'envid2episode_lengths': self._motion_data.envid2episode_lengths,
+        })
+        for k, reward_weights in self._motion_data.reward_weights.items():
+            snapshot_tensors['reward_weights_' + k] = reward_weights
+        return snapshot_tensors
+
     def _update_hist_hoi_obs(self, env_ids=None):
         self._hist_obs = self._curr_obs.clone()
         return
@@ -117,7 +158,7 @@ class SkillMimicBallPlay(HumanoidWholeBodyWithObject):
             textemb_batch = self.hoi_data_label_batch
             obs = torch.cat((obs,textemb_batch),dim=-1)
             self.obs_buf[:] = obs
-            env_ids = torch.arange(self.num_envs)
+            env_ids = torch.arange(self.num_envs, device=self.device)
             ts = self.progress_buf.clone() #self.progress_buf[0].clone()
             self._curr_ref_obs = self.hoi_data_batch[env_ids,ts].clone() #ZC0
 
@@ -163,6 +204,10 @@ class SkillMimicBallPlay(HumanoidWholeBodyWithObject):
 
         self._motion_data = MotionDataHandler(motion_file, self.device, self._key_body_ids, self.cfg, self.num_envs, 
                                             self.max_episode_length, self.reward_weights_default, self.init_vel, self.play_dataset)
+
+        scan_report = self.cfg["env"].get("motionScanReport", "")
+        if scan_report:
+            save_report(self._motion_data.scan_anomalies(), scan_report)
         
         if self.play_dataset:
             self.max_episode_length = self._motion_data.max_episode_length
@@ -195,6 +240,21 @@ class SkillMimicBallPlay(HumanoidWholeBodyWithObject):
 
         return
 
+    def _reset_envs_masked(self, reset_mask):
+        self.reached_target.masked_fill_(reset_mask, 0) #metric
+
+        self._reset_actors_masked(reset_mask)
+        self._reset_env_tensors_masked(reset_mask)
+        self._compute_observations_masked(reset_mask)
+        return
+
+    def _compute_observations_masked(self, reset_mask):
+        # _compute_observations also rewrites the reference of every env, keep it only where reset_mask is set
+        prev_ref_obs = self._curr_ref_obs.clone()
+        super()._compute_observations_masked(reset_mask)
+        self._curr_ref_obs[:] = torch.where(reset_mask.unsqueeze(-1), self._curr_ref_obs, prev_ref_obs)
+        return
+
     def _reset_actors(self, env_ids):
         if self._state_init == -1:
             self._reset_random_ref_state_init(env_ids) #V1 Random Ref State Init (RRSI)
@@ -217,6 +277,36 @@ class SkillMimicBallPlay(HumanoidWholeBodyWithObject):
         self._dof_vel[env_ids] = self.init_dof_pos_vel[env_ids]
         return
 
+    def _reset_actors_masked(self, reset_mask):
+        # reset states are drawn for every env and only taken where reset_mask is set
+        motion_ids = self._motion_data.sample_motions_on_device(self.num_envs)
+        if self._state_init == -1:
+            motion_times = self._motion_data.sample_time_on_device(motion_ids)
+        elif self._state_init >= 2:
+            motion_times = torch.full(motion_ids.shape, self._state_init, device=self.device, dtype=torch.int)
+        else:
+            assert(False), f"Unsupported state initialization from: {self._state_init}"
+
+        init_state = self._motion_data.get_initial_state_masked(reset_mask, motion_ids, motion_times)
+        init_buffers = [self.hoi_data_batch,
+                        self.init_root_pos, self.init_root_rot, self.init_root_pos_vel, self.init_root_rot_vel,
+                        self.init_dof_pos, self.init_dof_pos_vel,
+                        self.init_obj_pos, self.init_obj_pos_vel, self.init_obj_rot, self.init_obj_rot_vel]
+        for buffer, state in zip(init_buffers, init_state):
+            mask = reset_mask.view([-1] + [1] * (buffer.dim() - 1))
+            buffer[:] = torch.where(mask, state, buffer)
+
+        self._reset_humanoid_masked(reset_mask)
+        self._reset_target_masked(reset_mask)
+        return
+
+    def _reset_humanoid_masked(self, reset_mask):
+        init_root_states = torch.cat([self.init_root_pos, self.init_root_rot,
+                                      self.init_root_pos_vel, self.init_root_rot_vel], dim=-1)
+        self._humanoid_root_states[:] = torch.where(reset_mask.unsqueeze(-1), init_root_states, self._humanoid_root_states)
+        self._dof_pos[:] = torch.where(reset_mask.unsqueeze(-1), self.init_dof_pos, self._dof_pos)
+        self._dof_vel[:] = torch.where(reset_mask.unsqueeze(-1), self.init_dof_pos_vel, self._dof_vel)
+        return
 
     def _reset_random_ref_state_init(self, env_ids): #Z11
         num_envs = env_ids.shape[0]
@@ -341,6 +431,7 @@ class SkillMimicBallPlay(HumanoidWholeBodyWithObject):
       
         self.gym.set_actor_root_state_tensor(self.sim, gymtorch.unwrap_tensor(self._root_states))
         self.gym.set_dof_state_tensor(self.sim, gymtorch.unwrap_tensor(self._dof_state))
+        self._mark_sim_tensors_stale()
         self._refresh_sim_tensors()     
 
         self.render(t=time)
@@ -377,11 +468,36 @@ class SkillMimicBallPlay(HumanoidWholeBodyWithObject):
                 frame_id = t if self.play_dataset else self.progress_buf[env_ids]
                 # dataname = self.motion_file[len('skillmimic/data/motions/mocap_0330/'):-7] #ZC8 #projectname
                 # dataname = self.save_images #"test_images"
-                rgb_filename = "skillmimic/data/images/" + self.save_images_timestamp + "/rgb_env%d_frame%05d.png" % (env_ids, frame_id)
-                os.makedirs("skillmimic/data/images/" + self.save_images_timestamp, exist_ok=True)
-                self.gym.write_viewer_image_to_file(self.viewer,rgb_filename)
+                if self._frame_writer is not None:
+                    self._capture_frame(int(frame_id))
+                else:
+                    rgb_filename = "skillmimic/data/images/" + self.save_images_timestamp + "/rgb_env%d_frame%05d.png" % (env_ids, frame_id)
+                    os.makedirs("skillmimic/data/images/" + self.save_images_timestamp, exist_ok=True)
+                    self.gym.write_viewer_image_to_file(self.viewer,rgb_filename)
         return
     
+    def _build_env(self, env_id, env_ptr, humanoid_asset):
+        super()._build_env(env_id, env_ptr, humanoid_asset)
+
+        if env_id == 0 and self.save_images and not self.headless and self._frame_writer_mode != 'viewer':
+            camera_props = gymapi.CameraProperties()
+            camera_props.width = self.cfg['env'].get('frameWidth', 1280)
+            camera_props.height = self.cfg['env'].get('frameHeight', 720)
+            self._frame_camera = self.gym.create_camera_sensor(env_ptr, camera_props)
+        return
+
+    def _capture_frame(self, frame_id):
+        env_ptr = self.envs[0]
+        cam_trans = self.gym.get_viewer_camera_transform(self.viewer, None)
+        env_origin = self.gym.get_env_origin(env_ptr)
+        cam_trans.p = gymapi.Vec3(cam_trans.p.x - env_origin.x, cam_trans.p.y - env_origin.y, cam_trans.p.z - env_origin.z)
+        self.gym.set_camera_transform(self._frame_camera, env_ptr, cam_trans)
+
+        self.gym.render_all_camera_sensors(self.sim)
+        image = self.gym.get_camera_image(self.sim, env_ptr, self._frame_camera, gymapi.IMAGE_COLOR)
+        self._frame_writer.put(frame_id, image.reshape(image.shape[0], -1, 4))
+        return
+
     def _draw_task(self):
 
         # # draw obj contact
@@ -120,16 +120,40 @@ class VecTaskGPU(VecTask):
 
 # Python CPU/GPU Class
 class VecTaskPython(VecTask):
+    def __init__(self, task, rl_device, clip_observations=5.0, clip_actions=1.0):
+        super().__init__(task, rl_device, clip_observations=clip_observations, clip_actions=clip_actions)
+
+        # the observations returned by step/reset are only valid until the next call: with nothing to
+        # clip on the same device they are the task's obs_buf itself, otherwise a persistent buffer
+        task_device = torch.device(self.task.device)
+        self._rl_device = torch.device(rl_device)
+        self._same_device = task_device.type == self._rl_device.type and \
+            (task_device.index is None or self._rl_device.index is None or task_device.index == self._rl_device.index)
+        self._share_obs_buf = self._same_device and np.isinf(self.clip_obs)
+        self._clipped_obs_buf = None
 
     def get_state(self):
         return torch.clamp(self.task.states_buf, -self.clip_obs, self.clip_obs).to(self.rl_device)
 
+    def get_obs(self):
+        if self._share_obs_buf:
+            return self.task.obs_buf
+
+        if self._clipped_obs_buf is None:
+            self._clipped_obs_buf = torch.empty_like(self.task.obs_buf, device=self._rl_device)
+        if self._same_device:
+            torch.clamp(self.task.obs_buf, -self.clip_obs, self.clip_obs, out=self._clipped_obs_buf)
+        else:
+            self._clipped_obs_buf.copy_(self.task.obs_buf)
+            self._clipped_obs_buf.clamp_(-self.clip_obs, self.clip_obs)
+        return self._clipped_obs_buf
+
     def step(self, actions):
         actions_tensor = torch.clamp(actions, -self.clip_actions, self.clip_actions)
 
         self.task.step(actions_tensor)
 
-        return torch.clamp(self.task.obs_buf, -self.clip_obs, self.clip_obs).to(self.rl_device), self.task.rew_buf.to(self.rl_device), self.task.reset_buf.to(self.rl_device), self.task.extras
+        return self.get_obs(), self.task.rew_buf.to(self.rl_device), self.task.reset_buf.to(self.rl_device), self.task.extras
 
     def reset(self):
         actions = 0.01 * (1 - 2 * torch.rand([self.task.num_envs, self.task.num_actions], dtype=torch.float32, device=self.rl_device))
@@ -137,4 +161,4 @@ class VecTaskPython(VecTask):
         # step the simulator
         self.task.step(actions)
 
-        return torch.clamp(self.task.obs_buf, -self.clip_obs, self.clip_obs).to(self.rl_device)
+        return self.get_obs()
@@ -0,0 +1,211 @@
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+
+
+def _shard_worker(shard_id, make_env_fn, conn, num_threads):
+    torch.set_num_threads(num_threads)
+    env = make_env_fn(shard_id)
+    task = env.task
+    conn.send({
+        'num_envs': env.num_envs,
+        'num_obs': env.num_obs,
+        'num_states': env.num_states,
+        'num_actions': env.num_actions,
+        'num_agents': env.get_number_of_agents(),
+        'task_obs_size': task.get_task_obs_size(),
+        'observation_space': env.observation_space,
+        'action_space': env.action_space,
+        'state_space': env.state_space,
+        'amp_observation_space': env.amp_observation_space,
+    })
+
+    buffers, start, end = conn.recv()
+    shard = {name: buffer[start:end] for name, buffer in buffers.items()}
+
+    def write_obs(obs):
+        shard['obs'].copy_(obs)
+        if 'states' in shard:
+            shard['states'].copy_(env.get_state())
+        return
+
+    while True:
+        cmd = conn.recv()
+        if cmd == 'step':
+            obs, rewards, resets, extras = env.step(shard['actions'])
+            write_obs(obs)
+            shard['rewards'].copy_(rewards)
+            shard['resets'].copy_(resets)
+            for name in buffers:
+                if name.startswith('extras/'):
+                    shard[name].copy_(extras[name[len('extras/'):]])
+        elif cmd == 'reset':
+            write_obs(env.reset(None))
+        elif cmd == 'reset_ids':
+            env_ids = shard['reset_mask'].nonzero(as_tuple=False).flatten()
+            write_obs(env.reset(env_ids))
+        elif cmd == 'fetch_amp_obs_demo':
+            # demos are sampled from the motion library, not from the envs, any shard can serve them
+            conn.send(env.fetch_amp_obs_demo(conn.recv()))
+            continue
+        elif cmd == 'close':
+            break
+        conn.send(True)
+
+    conn.close()
+    return
+
+
+class ShardedTaskInfo():
+    """
+    Stands in for VecTaskPythonWrapper.task on the agent side, the tasks themselves live in the workers.
+    """
+    def __init__(self, num_envs, task_obs_size):
+        self.num_envs = num_envs
+        self.viewer = None
+        self.step_timer = None
+        self._task_obs_size = task_obs_size
+        return
+
+    def get_task_obs_size(self):
+        return self._task_obs_size
+
+
+class VecTaskPythonSharded():
+    """
+    Runs the envs of a VecTaskPython-compatible task in num_shards worker processes.
+
+    make_env_fn(shard_id) builds the VecTaskPythonWrapper of one shard inside its worker and must be
+    picklable. Actions, observations, rewards, resets and the extras in extras_dtypes are exchanged
+    through shared-memory tensors, shard k owning a contiguous block of env ids in shard order.
+    Like VecTaskPython, the returned tensors are only valid until the next step or reset. AMP demos are
+    fetched from shard 0 through its pipe.
+    """
+    def __init__(self, make_env_fn, num_shards, rl_device, extras_dtypes=None, threads_per_shard=1):
+        if extras_dtypes is None:
+            extras_dtypes = {'terminate': torch.long}
+        self.rl_device = rl_device
+        self._ctx = mp.get_context('spawn')
+
+        self._conns = []
+        self._procs = []
+        for shard_id in range(num_shards):
+            parent_conn, child_conn = self._ctx.Pipe()
+            proc = self._ctx.Process(target=_shard_worker, args=(shard_id, make_env_fn, child_conn, threads_per_shard),
+                                     daemon=True)
+            proc.start()
+            child_conn.close()
+            self._conns.append(parent_conn)
+            self._procs.append(proc)
+
+        specs = [conn.recv() for conn in self._conns]
+        spec = specs[0]
+        for s in specs[1:]:
+            assert(s['num_obs'] == spec['num_obs'] and s['num_actions'] == spec['num_actions']), "Shards must build the same task"
+
+        shard_sizes = [s['num_envs'] for s in specs]
+        self.num_environments = sum(shard_sizes)
+        self.num_agents = spec['num_agents']
+        self.num_observations = spec['num_obs']
+        self.num_states = spec['num_states']
+        self.num_actions = spec['num_actions']
+        self.obs_space = spec['observation_space']
+        self.act_space = spec['action_space']
+        self.state_space = spec['state_space']
+        self._amp_obs_space = spec['amp_observation_space']
+        self.task = ShardedTaskInfo(self.num_environments, spec['task_obs_size'])
+
+        n = self.num_environments
+        self._buffers = {
+            'actions': torch.zeros((n, self.num_actions), dtype=torch.float),
+            'obs': torch.zeros((n, self.num_observations), dtype=torch.float),
+            'rewards': torch.zeros(n, dtype=torch.float),
+            'resets': torch.zeros(n, dtype=torch.long),
+            'reset_mask': torch.zeros(n, dtype=torch.bool),
+        }
+        if self.num_states > 0:
+            self._buffers['states'] = torch.zeros((n, self.num_states), dtype=torch.float)
+        for name, dtype in extras_dtypes.items():
+            self._buffers['extras/' + name] = torch.zeros(n, dtype=dtype)
+        for buffer in self._buffers.values():
+            buffer.share_memory_()
+
+        offsets = np.cumsum([0] + shard_sizes)
+        for conn, start, end in zip(self._conns, offsets[:-1], offsets[1:]):
+            conn.send((self._buffers, int(start), int(end)))
+        return
+
+    def _run(self, cmd):
+        for conn in self._conns:
+            conn.send(cmd)
+        for conn in self._conns:
+            conn.recv()
+        return
+
+    def _to_rl_device(self, tensor):
+        return tensor.to(self.rl_device)
+
+    def step(self, actions):
+        self._buffers['actions'].copy_(actions)
+        self._run('step')
+
+        extras = {name[len('extras/'):]: self._to_rl_device(buffer)
+                  for name, buffer in self._buffers.items() if name.startswith('extras/')}
+        return self._to_rl_device(self._buffers['obs']), self._to_rl_device(self._buffers['rewards']), \
+            self._to_rl_device(self._buffers['resets']), extras
+
+    def reset(self, env_ids=None):
+        if env_ids is None:
+            self._run('reset')
+        else:
+            reset_mask = self._buffers['reset_mask']
+            if torch.is_tensor(env_ids) and env_ids.dtype == torch.bool:
+                reset_mask.copy_(env_ids)
+            else:
+                reset_mask.zero_()
+                reset_mask[torch.as_tensor(env_ids, dtype=torch.long).cpu()] = True
+            self._run('reset_ids')
+        return self._to_rl_device(self._buffers['obs'])
+
+    def get_state(self):
+        return self._to_rl_device(self._buffers['states'])
+
+    def close(self):
+        for conn in self._conns:
+            conn.send('close')
+        for proc in self._procs:
+            proc.join()
+        return
+
+    def get_number_of_agents(self):
+        return self.num_agents
+
+    def fetch_amp_obs_demo(self, num_samples):
+        conn = self._conns[0]
+        conn.send('fetch_amp_obs_demo')
+        conn.send(num_samples)
+        return self._to_rl_device(conn.recv())
+
+    @property
+    def amp_observation_space(self):
+        return self._amp_obs_space
+
+    @property
+    def observation_space(self):
+        return self.obs_space
+
+    @property
+    def action_space(self):
+        return self.act_space
+
+    @property
+    def num_envs(self):
+        return self.num_environments
+
+    @property
+    def num_acts(self):
+        return self.num_actions
+
+    @property
+    def num_obs(self):
+        return self.num_observations
@@ -52,7 +52,7 @@ class VecTaskPythonWrapper(VecTaskPython):
 
     def reset(self, env_ids=None):
         self.task.reset(env_ids)
-        return torch.clamp(self.task.obs_buf, -self.clip_obs, self.clip_obs).to(self.rl_device)
+        return self.get_obs()
 
     @property
     def amp_observation_space(self):
@@ -48,6 +48,9 @@ class AMPDataset(datasets.PPODataset):
         for k,v in self.values_dict.items():
             if k not in self.special_names and v is not None:
                 input_dict[k] = v[sample_idx]
+                if v.dtype in [torch.float16, torch.bfloat16]:
+                    # fields stored in half precision by the experience buffer
+                    input_dict[k] = input_dict[k].float()
                 
         if (end >= self.batch_size):
             self._shuffle_idx_buf()
@@ -26,6 +26,7 @@
 # OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+from concurrent.futures import ThreadPoolExecutor
 import copy
 from datetime import datetime
 from gym import spaces
@@ -47,12 +48,15 @@ import torch
 from torch import optim
 
 import learning.amp_datasets as amp_datasets
+from learning.common_agent_mixin import CommonAgentMixin
+from utils.step_timer import StepTimer, time_phase
+from utils.profiler import build_profiler
 
 from tensorboardX import SummaryWriter
 
-class CommonAgent(a2c_continuous.A2CAgent):
+class CommonAgent(CommonAgentMixin, a2c_continuous.A2CAgent):
     def __init__(self, base_name, config):
-        a2c_common.A2CBase.__init__(self, base_name, config)
+        config = self._init_a2c_base(base_name, config)
 
         self._load_config_params(config)
 
@@ -61,6 +65,10 @@ class CommonAgent(a2c_continuous.A2CAgent):
         self.bounds_loss_coef = config.get('bounds_loss_coef', None)
         self.clip_actions = config.get('clip_actions', True)
         self._save_intermediate = config.get('save_intermediate', False)
+        self._step_timing = config.get('step_timing', False)
+        self._step_timer = None
+        self._masked_reset = config.get('masked_reset', False)
+        self._init_checkpoint_writer(config)
 
         net_config = self._build_net_config()
         self.model = self.network.build(net_config) # self.network <learning.hrl_models.ModelHRLContinuous object at 0x...>
@@ -98,6 +106,17 @@ class CommonAgent(a2c_continuous.A2CAgent):
         self.algo_observer.after_init(self)
         
         self.done_indices = []
+        self._init_update_params(config)
+        # play the next rollout with a frozen copy of the policy while the last one is trained on
+        self._async_update = config.get('async_update', False)
+        self._async_actor = None
+        self._learner = None
+        self._learner_stream = None
+        if self._async_update:
+            assert(not self.is_rnn and not self.has_central_value), "async_update supports neither rnn models nor a central value"
+            self._learner = ThreadPoolExecutor(max_workers=1)
+            if torch.device(self.ppo_device).type == 'cuda':
+                self._learner_stream = torch.cuda.Stream(self.ppo_device)
         
         return
 
@@ -107,10 +126,19 @@ class CommonAgent(a2c_continuous.A2CAgent):
         self.experience_buffer.tensor_dict['next_values'] = torch.zeros_like(self.experience_buffer.tensor_dict['values'])
 
         self.tensor_list += ['next_obses']
+
+        if self._masked_reset:
+            # per-step episode stats, read back with a single nonzero after the rollout
+            self._done_stats = {
+                'dones': torch.zeros((self.horizon_length,) + self.dones.shape, dtype=torch.bool, device=self.ppo_device),
+                'rewards': torch.zeros((self.horizon_length,) + self.current_rewards.shape, dtype=torch.float32, device=self.ppo_device),
+                'lengths': torch.zeros((self.horizon_length,) + self.current_lengths.shape, dtype=torch.float32, device=self.ppo_device),
+            }
         return
 
     def train(self):
         self.init_tensors()
+        self._cast_experience_buffer()
         self.last_mean_rewards = -100500
         start_time = time.time()
         total_time = 0
@@ -126,10 +154,13 @@ class CommonAgent(a2c_continuous.A2CAgent):
             self.hvd.setup_algo(self)
 
         self._init_train()
+        profiler = build_profiler(self.config, self.summaries_dir)
 
         while True:
             epoch_num = self.update_epoch()
             train_info = self.train_epoch() # core
+            if profiler is not None:
+                profiler.step()
 
             sum_time = train_info['total_time']
             total_time += sum_time
@@ -142,21 +173,17 @@ class CommonAgent(a2c_continuous.A2CAgent):
                 scaled_play_time = train_info['play_time']
                 curr_frames = self.curr_frames
                 self.frame += curr_frames
-                if self.print_stats:
-                    fps_step = curr_frames / scaled_play_time
-                    fps_total = curr_frames / scaled_time
-                    print("epoch_num:{}".format(epoch_num), "mean_rewards:{}".format(self._get_mean_rewards()), f'fps step: {fps_step:.1f} fps total: {fps_total:.1f}')
-
                 self.writer.add_scalar('performance/total_fps', curr_frames / scaled_time, frame)
                 self.writer.add_scalar('performance/step_fps', curr_frames / scaled_play_time, frame)
                 self.writer.add_scalar('info/epochs', epoch_num, frame)
                 self._log_train_info(train_info, frame)
+                self._log_step_timing(train_info, frame)
 
                 self.algo_observer.after_print_stats(frame, epoch_num, total_time)
                 
                 if self.game_rewards.current_size > 0:
-                    mean_rewards = self._get_mean_rewards()
-                    mean_lengths = self.game_lengths.get_mean()
+                    mean_rewards = self._get_mean_rewards_tensor()
+                    mean_lengths = self.game_lengths.mean.squeeze(0)
 
                     for i in range(self.value_size):
                         self.writer.add_scalar('rewards{0}/frame'.format(i), mean_rewards[i], frame)
@@ -169,6 +196,13 @@ class CommonAgent(a2c_continuous.A2CAgent):
                     if self.has_self_play_config:
                         self.self_play_manager.update(self)
 
+                # one device sync for all scalars of the epoch
+                self.writer.flush_scalars()
+                if self.print_stats:
+                    fps_step = curr_frames / scaled_play_time
+                    fps_total = curr_frames / scaled_time
+                    print("epoch_num:{}".format(epoch_num), "mean_rewards:{}".format(self._get_mean_rewards()), f'fps step: {fps_step:.1f} fps total: {fps_total:.1f}')
+
                 if self.save_freq > 0:
                     if (epoch_num % self.save_freq == 0):
                         self.save(model_output_file)
@@ -179,10 +213,20 @@ class CommonAgent(a2c_continuous.A2CAgent):
 
                 if epoch_num > self.max_epochs:
                     self.save(model_output_file)
+                    if self._checkpoint_writer is not None:
+                        self._checkpoint_writer.close()
+                    if profiler is not None:
+                        profiler.close()
                     print('MAX EPOCHS NUM!')
                     return self.last_mean_rewards, epoch_num
 
                 update_time = 0
+
+            if self.multi_gpu and epoch_num > self.max_epochs:
+                # the other ranks stop with rank 0
+                if profiler is not None:
+                    profiler.close()
+                return self.last_mean_rewards, epoch_num
         return
 
     def set_full_state_weights(self, weights):
@@ -201,6 +245,9 @@ class CommonAgent(a2c_continuous.A2CAgent):
         return
 
     def train_epoch(self):
+        if self._async_update:
+            return self._train_epoch_async()
+
         play_time_start = time.time()
         with torch.no_grad():
             if self.is_rnn:
@@ -221,44 +268,11 @@ class CommonAgent(a2c_continuous.A2CAgent):
         if self.has_central_value:
             self.train_central_value()
 
-        train_info = None
-
         if self.is_rnn:
             frames_mask_ratio = rnn_masks.sum().item() / (rnn_masks.nelement())
             print(frames_mask_ratio)
 
-        for _ in range(0, self.mini_epochs_num):
-            ep_kls = []
-            for i in range(len(self.dataset)):
-                curr_train_info = self.train_actor_critic(self.dataset[i])
-                
-                if self.schedule_type == 'legacy':  
-                    if self.multi_gpu:
-                        curr_train_info['kl'] = self.hvd.average_value(curr_train_info['kl'], 'ep_kls')
-                    self.last_lr, self.entropy_coef = self.scheduler.update(self.last_lr, self.entropy_coef, self.epoch_num, 0, curr_train_info['kl'].item())
-                    self.update_lr(self.last_lr)
-
-                if (train_info is None):
-                    train_info = dict()
-                    for k, v in curr_train_info.items():
-                        train_info[k] = [v]
-                else:
-                    for k, v in curr_train_info.items():
-                        train_info[k].append(v)
-            
-            av_kls = torch_ext.mean_list(train_info['kl'])
-
-            if self.schedule_type == 'standard':
-                if self.multi_gpu:
-                    av_kls = self.hvd.average_value(av_kls, 'ep_kls')
-                self.last_lr, self.entropy_coef = self.scheduler.update(self.last_lr, self.entropy_coef, self.epoch_num, 0, av_kls.item())
-                self.update_lr(self.last_lr)
-
-        if self.schedule_type == 'standard_epoch':
-            if self.multi_gpu:
-                av_kls = self.hvd.average_value(torch_ext.mean_list(kls), 'ep_kls')
-            self.last_lr, self.entropy_coef = self.scheduler.update(self.last_lr, self.entropy_coef, self.epoch_num, 0, av_kls.item())
-            self.update_lr(self.last_lr)
+        train_info = self._train_mini_epochs()
 
         update_time_end = time.time()
         play_time = play_time_end - play_time_start
@@ -268,10 +282,86 @@ class CommonAgent(a2c_continuous.A2CAgent):
         train_info['play_time'] = play_time
         train_info['update_time'] = update_time
         train_info['total_time'] = total_time
+        if self._step_timer is not None:
+            train_info['step_phase_ms'] = self._step_timer.summary()
+        self._record_train_batch_info(batch_dict, train_info)
+
+        return train_info
+
+    def _train_epoch_async(self):
+        # One-step-lagged actor-learner: the learner thread updates the policy on the last rollout
+        # while the actor plays the next one with the policy from before that update. The PPO ratio is
+        # taken against the stored neglogpacs, i.e. against the policy that played the batch.
+        play_time_start = time.time()
+        self.curr_frames = 0
+        if self._async_actor is None:
+            # the first epoch plays one extra rollout, to have a batch for the learner
+            self._async_actor = self._build_async_actor()
+            self._prepare_async_batch(self._play_async_rollout())
+
+        if self._learner_stream is not None:
+            # the dataset was written on this thread's stream
+            self._learner_stream.wait_stream(torch.cuda.current_stream(self.ppo_device))
+        update = self._learner.submit(self._update_async)
+        batch_dict = self._play_async_rollout()
+        play_time_end = time.time()
+
+        train_info = update.result()
+        if self._learner_stream is not None:
+            torch.cuda.current_stream(self.ppo_device).wait_stream(self._learner_stream)
+        self._sync_async_actor()
+        self._prepare_async_batch(batch_dict)
+
+        # update_time is the learner's own time, the overlap shows as play_time + update_time > total_time
+        train_info['play_time'] = play_time_end - play_time_start
+        train_info['total_time'] = time.time() - play_time_start
+        if self._step_timer is not None:
+            train_info['step_phase_ms'] = self._step_timer.summary()
         self._record_train_batch_info(batch_dict, train_info)
 
         return train_info
 
+    def _build_async_actor(self):
+        # Shallow copy of the agent that plays the rollouts and from now on owns the env state (obs,
+        # dones, episode sums). The policy and normalizers are its own copies, so it shares no module
+        # with the learner; buffers, meters and the env are shared.
+        actor = copy.copy(self)
+        for name in self._async_actor_modules():
+            setattr(actor, name, copy.deepcopy(getattr(self, name)))
+        return actor
+
+    def _async_actor_modules(self):
+        names = ['model']
+        if self.normalize_input:
+            names.append('running_mean_std')
+        if self.normalize_value:
+            names.append('value_mean_std')
+        return names
+
+    def _sync_async_actor(self):
+        for name in self._async_actor_modules():
+            getattr(self._async_actor, name).load_state_dict(getattr(self, name).state_dict())
+        return
+
+    def _play_async_rollout(self):
+        with torch.no_grad():
+            batch_dict = self._async_actor.play_steps()
+        self.curr_frames += batch_dict.pop('played_frames')
+        return batch_dict
+
+    def _prepare_async_batch(self, batch_dict):
+        self.set_train()
+        self.prepare_dataset(batch_dict)
+        self.algo_observer.after_steps()
+        return
+
+    def _update_async(self):
+        update_time_start = time.time()
+        with torch.cuda.stream(self._learner_stream):
+            train_info = self._train_mini_epochs()
+        train_info['update_time'] = time.time() - update_time_start
+        return train_info
+
     def play_steps(self):
         self.set_eval()
         
@@ -279,14 +369,16 @@ class CommonAgent(a2c_continuous.A2CAgent):
         update_list = self.update_list
 
         for n in range(self.horizon_length):
-            self.obs = self.env_reset(self.done_indices)
+            with time_phase(self._step_timer, 'env_reset'):
+                self.obs = self.env_reset(self.done_indices)
             self.experience_buffer.update_data('obses', n, self.obs['obs'])
 
-            if self.use_action_masks:
-                masks = self.vec_env.get_action_masks()
-                res_dict = self.get_masked_action_values(self.obs, masks)
-            else:
-                res_dict = self.get_action_values(self.obs)
+            with time_phase(self._step_timer, 'inference'):
+                if self.use_action_masks:
+                    masks = self.vec_env.get_action_masks()
+                    res_dict = self.get_masked_action_values(self.obs, masks)
+                else:
+                    res_dict = self.get_action_values(self.obs)
 
             for k in update_list:
                 self.experience_buffer.update_data(k, n, res_dict[k]) 
@@ -294,7 +386,8 @@ class CommonAgent(a2c_continuous.A2CAgent):
             if self.has_central_value:
                 self.experience_buffer.update_data('states', n, self.obs['states'])
 
-            self.obs, rewards, self.dones, infos = self.env_step(res_dict['actions'])
+            with time_phase(self._step_timer, 'env_step'):
+                self.obs, rewards, self.dones, infos = self.env_step(res_dict['actions'])
             shaped_rewards = self.rewards_shaper(rewards)
             self.experience_buffer.update_data('rewards', n, shaped_rewards)
             self.experience_buffer.update_data('next_obses', n, self.obs['obs'])
@@ -302,17 +395,22 @@ class CommonAgent(a2c_continuous.A2CAgent):
             
             terminated = infos['terminate'].float()
             terminated = terminated.unsqueeze(-1)
-            next_vals = self._eval_critic(self.obs)
+            with time_phase(self._step_timer, 'next_values'):
+                next_vals = self._eval_critic(self.obs)
             next_vals *= (1.0 - terminated)
             self.experience_buffer.update_data('next_values', n, next_vals)
 
             self.current_rewards += rewards
             self.current_lengths += 1
-            all_done_indices = self.dones.nonzero(as_tuple=False)
-            self.done_indices = all_done_indices[::self.num_agents]
-  
-            self.game_rewards.update(self.current_rewards[self.done_indices])
-            self.game_lengths.update(self.current_lengths[self.done_indices])
+            if self._masked_reset:
+                self._record_done_stats(n)
+                self.done_indices = self.dones.bool()
+            else:
+                all_done_indices = self.dones.nonzero(as_tuple=False)
+                self.done_indices = all_done_indices[::self.num_agents]
+
+                self.game_rewards.update(self.current_rewards[self.done_indices])
+                self.game_lengths.update(self.current_lengths[self.done_indices])
             self.algo_observer.process_infos(infos, self.done_indices)
 
             not_dones = 1.0 - self.dones.float()
@@ -320,7 +418,11 @@ class CommonAgent(a2c_continuous.A2CAgent):
             self.current_rewards = self.current_rewards * not_dones.unsqueeze(1)
             self.current_lengths = self.current_lengths * not_dones
 
-            self.done_indices = self.done_indices[:, 0]
+            if not self._masked_reset:
+                self.done_indices = self.done_indices[:, 0]
+
+        if self._masked_reset:
+            self._update_done_stats()
 
         mb_fdones = self.experience_buffer.tensor_dict['dones'].float()
         mb_values = self.experience_buffer.tensor_dict['values']
@@ -398,69 +500,76 @@ class CommonAgent(a2c_continuous.A2CAgent):
         lr_mul = 1.0
         curr_e_clip = lr_mul * self.e_clip
 
-        batch_dict = {
-            'is_train': True,
-            'prev_actions': actions_batch, 
-            'obs' : obs_batch
-        }
-
         rnn_masks = None
         if self.is_rnn:
             rnn_masks = input_dict['rnn_masks']
-            batch_dict['rnn_states'] = input_dict['rnn_states']
-            batch_dict['seq_length'] = self.seq_len
 
-        with torch.cuda.amp.autocast(enabled=self.mixed_precision):
-            res_dict = self.model(batch_dict)
-            action_log_probs = res_dict['prev_neglogp']
-            values = res_dict['values']
-            entropy = res_dict['entropy']
-            mu = res_dict['mus']
-            sigma = res_dict['sigmas']
+        if self.multi_gpu:
+            self.optimizer.zero_grad()
+        else:
+            for param in self.model.parameters():
+                param.grad = None
+
+        # Each micro-batch loss is a sum divided by the minibatch size, so the accumulated gradients
+        # and the summed losses are those of a single pass over the whole minibatch.
+        batch_size = obs_batch.shape[0]
+        a_loss = c_loss = b_loss = entropy = a_clip_frac = 0.0
+        mus = []
+        sigmas = []
+        for mb in self._micro_batches(batch_size):
+            batch_dict = {
+                'is_train': True,
+                'prev_actions': actions_batch[mb], 
+                'obs' : obs_batch[mb]
+            }
+            if self.is_rnn:
+                batch_dict['rnn_states'] = input_dict['rnn_states']
+                batch_dict['seq_length'] = self.seq_len
 
-            a_info = self._actor_loss(old_action_log_probs_batch, action_log_probs, advantage, curr_e_clip)
-            a_loss = a_info['actor_loss']
+            with torch.cuda.amp.autocast(enabled=self.mixed_precision):
+                res_dict = self.model(batch_dict)
+                action_log_probs = res_dict['prev_neglogp']
+                values = res_dict['values']
+                mu = res_dict['mus']
 
-            c_info = self._critic_loss(value_preds_batch, values, curr_e_clip, return_batch, self.clip_value)
-            c_loss = c_info['critic_loss']
+                a_info = self._actor_loss(old_action_log_probs_batch[mb], action_log_probs, advantage[mb], curr_e_clip)
+                c_info = self._critic_loss(value_preds_batch[mb], values, curr_e_clip, return_batch[mb], self.clip_value)
 
-            b_loss = self.bound_loss(mu)
-            
-            a_loss = torch.mean(a_loss)
-            c_loss = torch.mean(c_loss)
-            b_loss = torch.mean(b_loss)
-            entropy = torch.mean(entropy)
+                mb_a_loss = torch.sum(a_info['actor_loss']) / batch_size
+                mb_c_loss = torch.sum(c_info['critic_loss']) / batch_size
+                mb_b_loss = torch.sum(self.bound_loss(mu)) / batch_size
+                mb_entropy = torch.sum(res_dict['entropy']) / batch_size
 
-            loss = a_loss + self.critic_coef * c_loss - self.entropy_coef * entropy + self.bounds_loss_coef * b_loss
-            
-            a_clip_frac = torch.mean(a_info['actor_clipped'].float())
-            
-            a_info['actor_loss'] = a_loss
-            a_info['actor_clip_frac'] = a_clip_frac
+                loss = mb_a_loss + self.critic_coef * mb_c_loss - self.entropy_coef * mb_entropy + self.bounds_loss_coef * mb_b_loss
 
-            if self.multi_gpu:
-                self.optimizer.zero_grad()
-            else:
-                for param in self.model.parameters():
-                    param.grad = None
+            self.scaler.scale(loss).backward()
+
+            a_loss += mb_a_loss.detach()
+            c_loss += mb_c_loss.detach()
+            b_loss += mb_b_loss.detach()
+            entropy += mb_entropy.detach()
+            a_clip_frac += torch.sum(a_info['actor_clipped'].float()) / batch_size
+            mus.append(mu.detach())
+            sigmas.append(res_dict['sigmas'].detach())
 
-        self.scaler.scale(loss).backward()
+        self._apply_scheduled_lr()
         self.scaler.step(self.optimizer)
         self.scaler.update()
 
         with torch.no_grad():
             reduce_kl = not self.is_rnn
-            kl_dist = torch_ext.policy_kl(mu.detach(), sigma.detach(), old_mu_batch, old_sigma_batch, reduce_kl)
+            kl_dist = torch_ext.policy_kl(torch.cat(mus), torch.cat(sigmas), old_mu_batch, old_sigma_batch, reduce_kl)
                     
         self.train_result = {
             'entropy': entropy,
             'kl': kl_dist,
             'last_lr': self.last_lr, 
             'lr_mul': lr_mul, 
-            'b_loss': b_loss
+            'b_loss': b_loss,
+            'actor_loss': a_loss,
+            'actor_clip_frac': a_clip_frac,
+            'critic_loss': c_loss
         }
-        self.train_result.update(a_info)
-        self.train_result.update(c_info)
 
         return
 
@@ -478,6 +587,18 @@ class CommonAgent(a2c_continuous.A2CAgent):
 
         return mb_advs
 
+    def _record_done_stats(self, n):
+        self._done_stats['dones'][n] = self.dones.bool()
+        self._done_stats['rewards'][n] = self.current_rewards
+        self._done_stats['lengths'][n] = self.current_lengths
+        return
+
+    def _update_done_stats(self):
+        done_mask = self._done_stats['dones']
+        self.game_rewards.update(self._done_stats['rewards'][done_mask])
+        self.game_lengths.update(self._done_stats['lengths'][done_mask])
+        return
+
     def env_reset(self, env_ids=None):
         obs = self.vec_env.reset(env_ids)
         obs = self.obs_to_tensors(obs)
@@ -494,7 +615,11 @@ class CommonAgent(a2c_continuous.A2CAgent):
         return b_loss
 
     def _get_mean_rewards(self):
-        return self.game_rewards.get_mean()
+        return self._get_mean_rewards_tensor().cpu().numpy()
+
+    def _get_mean_rewards_tensor(self):
+        # game_rewards.get_mean() without the copy to host
+        return self.game_rewards.mean.squeeze(0)
 
     def _load_config_params(self, config):
         self.last_lr = config['learning_rate']
@@ -520,6 +645,9 @@ class CommonAgent(a2c_continuous.A2CAgent):
         return
 
     def _init_train(self):
+        if self._step_timing:
+            self._step_timer = StepTimer(self.ppo_device)
+            self.vec_env.env.task.step_timer = self._step_timer
         return
 
     def _eval_critic(self, obs_dict):
@@ -581,14 +709,26 @@ class CommonAgent(a2c_continuous.A2CAgent):
     def _log_train_info(self, train_info, frame):
         self.writer.add_scalar('performance/update_time', train_info['update_time'], frame)
         self.writer.add_scalar('performance/play_time', train_info['play_time'], frame)
-        self.writer.add_scalar('losses/a_loss', torch_ext.mean_list(train_info['actor_loss']).item(), frame)
-        self.writer.add_scalar('losses/c_loss', torch_ext.mean_list(train_info['critic_loss']).item(), frame)
+        self.writer.add_scalar('losses/a_loss', torch_ext.mean_list(train_info['actor_loss']), frame)
+        self.writer.add_scalar('losses/c_loss', torch_ext.mean_list(train_info['critic_loss']), frame)
         
-        self.writer.add_scalar('losses/bounds_loss', torch_ext.mean_list(train_info['b_loss']).item(), frame)
-        self.writer.add_scalar('losses/entropy', torch_ext.mean_list(train_info['entropy']).item(), frame)
+        self.writer.add_scalar('losses/bounds_loss', torch_ext.mean_list(train_info['b_loss']), frame)
+        self.writer.add_scalar('losses/entropy', torch_ext.mean_list(train_info['entropy']), frame)
         self.writer.add_scalar('info/last_lr', train_info['last_lr'][-1] * train_info['lr_mul'][-1], frame)
         self.writer.add_scalar('info/lr_mul', train_info['lr_mul'][-1], frame)
         self.writer.add_scalar('info/e_clip', self.e_clip * train_info['lr_mul'][-1], frame)
-        self.writer.add_scalar('info/clip_frac', torch_ext.mean_list(train_info['actor_clip_frac']).item(), frame)
-        self.writer.add_scalar('info/kl', torch_ext.mean_list(train_info['kl']).item(), frame)
+        self.writer.add_scalar('info/clip_frac', torch_ext.mean_list(train_info['actor_clip_frac']), frame)
+        self.writer.add_scalar('info/kl', torch_ext.mean_list(train_info['kl']), frame)
+        self.writer.add_scalar('info/mini_epochs', train_info['mini_epochs'], frame)
+        return
+
+    def _log_step_timing(self, train_info, frame):
+        if 'step_phase_ms' not in train_info:
+            return
+
+        # env phases are nested in env_step, percentages are of the whole play time
+        play_time_ms = train_info['play_time'] * 1000.
+        for name, ms in train_info['step_phase_ms'].items():
+            self.writer.add_scalar('step_phases/{:s}_ms'.format(name), ms / self.horizon_length, frame)
+            self.writer.add_scalar('step_phases/{:s}_pct'.format(name), 100. * ms / play_time_ms, frame)
         return
@@ -47,12 +47,14 @@ import torch
 from torch import optim
 
 import learning.amp_datasets as amp_datasets
+from learning.common_agent_mixin import CommonAgentMixin
+from utils.profiler import build_profiler
 
 from tensorboardX import SummaryWriter
 
-class CommonAgentDiscrete(a2c_discrete.DiscreteA2CAgent):
+class CommonAgentDiscrete(CommonAgentMixin, a2c_discrete.DiscreteA2CAgent):
     def __init__(self, base_name, config):
-        a2c_common.A2CBase.__init__(self, base_name, config)
+        config = self._init_a2c_base(base_name, config)
 
         self._load_config_params(config)
 
@@ -61,6 +63,7 @@ class CommonAgentDiscrete(a2c_discrete.DiscreteA2CAgent):
 
         #Z Remove action constraints
         self._save_intermediate = config.get('save_intermediate', False)
+        self._init_checkpoint_writer(config)
 
         net_config = self._build_net_config()
         self.model = self.network.build(net_config)
@@ -98,7 +101,9 @@ class CommonAgentDiscrete(a2c_discrete.DiscreteA2CAgent):
         self.algo_observer.after_init(self)
 
         self.done_indices = []
-        
+        self._init_update_params(config)
+        assert(not config.get('async_update', False)), "async_update is only implemented for the continuous agents"
+
         return
 
     def init_tensors(self):
@@ -111,6 +116,7 @@ class CommonAgentDiscrete(a2c_discrete.DiscreteA2CAgent):
 
     def train(self):
         self.init_tensors()
+        self._cast_experience_buffer()
         self.last_mean_rewards = -100500
         start_time = time.time()
         total_time = 0
@@ -126,10 +132,13 @@ class CommonAgentDiscrete(a2c_discrete.DiscreteA2CAgent):
             self.hvd.setup_algo(self)
 
         self._init_train()
+        profiler = build_profiler(self.config, self.summaries_dir)
 
         while True:
             epoch_num = self.update_epoch()
             train_info = self.train_epoch() # core
+            if profiler is not None:
+                profiler.step()
 
             sum_time = train_info['total_time']
             total_time += sum_time
@@ -142,11 +151,6 @@ class CommonAgentDiscrete(a2c_discrete.DiscreteA2CAgent):
                 scaled_play_time = train_info['play_time']
                 curr_frames = self.curr_frames
                 self.frame += curr_frames
-                if self.print_stats:
-                    fps_step = curr_frames / scaled_play_time
-                    fps_total = curr_frames / scaled_time
-                    print("epoch_num:{}".format(epoch_num), "mean_rewards:{}".format(self._get_mean_rewards()), f'fps step: {fps_step:.1f} fps total: {fps_total:.1f}')
-
                 self.writer.add_scalar('performance/total_fps', curr_frames / scaled_time, frame)
                 self.writer.add_scalar('performance/step_fps', curr_frames / scaled_play_time, frame)
                 self.writer.add_scalar('info/epochs', epoch_num, frame)
@@ -155,8 +159,8 @@ class CommonAgentDiscrete(a2c_discrete.DiscreteA2CAgent):
                 self.algo_observer.after_print_stats(frame, epoch_num, total_time)
                 
                 if self.game_rewards.current_size > 0:
-                    mean_rewards = self._get_mean_rewards()
-                    mean_lengths = self.game_lengths.get_mean()
+                    mean_rewards = self._get_mean_rewards_tensor()
+                    mean_lengths = self.game_lengths.mean.squeeze(0)
 
                     for i in range(self.value_size):
                         self.writer.add_scalar('rewards{0}/frame'.format(i), mean_rewards[i], frame)
@@ -169,6 +173,13 @@ class CommonAgentDiscrete(a2c_discrete.DiscreteA2CAgent):
                     if self.has_self_play_config:
                         self.self_play_manager.update(self)
 
+                # one device sync for all scalars of the epoch
+                self.writer.flush_scalars()
+                if self.print_stats:
+                    fps_step = curr_frames / scaled_play_time
+                    fps_total = curr_frames / scaled_time
+                    print("epoch_num:{}".format(epoch_num), "mean_rewards:{}".format(self._get_mean_rewards()), f'fps step: {fps_step:.1f} fps total: {fps_total:.1f}')
+
                 if self.save_freq > 0:
                     if (epoch_num % self.save_freq == 0):
                         self.save(model_output_file)
@@ -179,10 +190,20 @@ class CommonAgentDiscrete(a2c_discrete.DiscreteA2CAgent):
 
                 if epoch_num > self.max_epochs:
                     self.save(model_output_file)
+                    if self._checkpoint_writer is not None:
+                        self._checkpoint_writer.close()
+                    if profiler is not None:
+                        profiler.close()
                     print('MAX EPOCHS NUM!')
                     return self.last_mean_rewards, epoch_num
 
                 update_time = 0
+
+            if self.multi_gpu and epoch_num > self.max_epochs:
+                # the other ranks stop with rank 0
+                if profiler is not None:
+                    profiler.close()
+                return self.last_mean_rewards, epoch_num
         return
 
     def set_full_state_weights(self, weights):
@@ -221,44 +242,11 @@ class CommonAgentDiscrete(a2c_discrete.DiscreteA2CAgent):
         if self.has_central_value:
             self.train_central_value()
 
-        train_info = None
-
         if self.is_rnn:
             frames_mask_ratio = rnn_masks.sum().item() / (rnn_masks.nelement())
             print(frames_mask_ratio)
 
-        for _ in range(0, self.mini_epochs_num):
-            ep_kls = []
-            for i in range(len(self.dataset)):
-                curr_train_info = self.train_actor_critic(self.dataset[i])
-                
-                if self.schedule_type == 'legacy':  
-                    if self.multi_gpu:
-                        curr_train_info['kl'] = self.hvd.average_value(curr_train_info['kl'], 'ep_kls')
-                    self.last_lr, self.entropy_coef = self.scheduler.update(self.last_lr, self.entropy_coef, self.epoch_num, 0, curr_train_info['kl'].item())
-                    self.update_lr(self.last_lr)
-
-                if (train_info is None):
-                    train_info = dict()
-                    for k, v in curr_train_info.items():
-                        train_info[k] = [v]
-                else:
-                    for k, v in curr_train_info.items():
-                        train_info[k].append(v)
-            
-            av_kls = torch_ext.mean_list(train_info['kl'])
-
-            if self.schedule_type == 'standard':
-                if self.multi_gpu:
-                    av_kls = self.hvd.average_value(av_kls, 'ep_kls')
-                self.last_lr, self.entropy_coef = self.scheduler.update(self.last_lr, self.entropy_coef, self.epoch_num, 0, av_kls.item())
-                self.update_lr(self.last_lr)
-
-        if self.schedule_type == 'standard_epoch':
-            if self.multi_gpu:
-                av_kls = self.hvd.average_value(torch_ext.mean_list(kls), 'ep_kls')
-            self.last_lr, self.entropy_coef = self.scheduler.update(self.last_lr, self.entropy_coef, self.epoch_num, 0, av_kls.item())
-            self.update_lr(self.last_lr)
+        train_info = self._train_mini_epochs()
 
         update_time_end = time.time()
         play_time = play_time_end - play_time_start
@@ -409,61 +397,61 @@ class CommonAgentDiscrete(a2c_discrete.DiscreteA2CAgent):
         lr_mul = 1.0
         curr_e_clip = lr_mul * self.e_clip
 
-        batch_dict = {
-            'is_train': True,
-            'prev_actions': actions_batch, 
-            'obs' : obs_batch
-        }
-
         rnn_masks = None
         if self.is_rnn:
             rnn_masks = input_dict['rnn_masks']
-            batch_dict['rnn_states'] = input_dict['rnn_states']
-            batch_dict['seq_length'] = self.seq_len
 
-        with torch.cuda.amp.autocast(enabled=self.mixed_precision):
-            res_dict = self.model(batch_dict)
-            action_log_probs = res_dict['prev_neglogp']
-            values = res_dict['values']
-            entropy = res_dict['entropy']
-            now_logits = res_dict['logits']
-            # mu = res_dict['mus']
-            # sigma = res_dict['sigmas']
+        if self.multi_gpu:
+            self.optimizer.zero_grad()
+        else:
+            for param in self.model.parameters():
+                param.grad = None
+
+        # Each micro-batch loss is a sum divided by the minibatch size, so the accumulated gradients
+        # and the summed losses are those of a single pass over the whole minibatch.
+        batch_size = obs_batch.shape[0]
+        a_loss = c_loss = entropy = a_clip_frac = 0.0
+        logits = []
+        for mb in self._micro_batches(batch_size):
+            batch_dict = {
+                'is_train': True,
+                'prev_actions': actions_batch[mb], 
+                'obs' : obs_batch[mb]
+            }
+            if self.is_rnn:
+                batch_dict['rnn_states'] = input_dict['rnn_states']
+                batch_dict['seq_length'] = self.seq_len
 
-            a_info = self._actor_loss(old_action_log_probs_batch, action_log_probs, advantage, curr_e_clip)
-            a_loss = a_info['actor_loss']
+            with torch.cuda.amp.autocast(enabled=self.mixed_precision):
+                res_dict = self.model(batch_dict)
+                action_log_probs = res_dict['prev_neglogp']
+                values = res_dict['values']
 
-            c_info = self._critic_loss(value_preds_batch, values, curr_e_clip, return_batch, self.clip_value)
-            c_loss = c_info['critic_loss']
+                a_info = self._actor_loss(old_action_log_probs_batch[mb], action_log_probs, advantage[mb], curr_e_clip)
+                c_info = self._critic_loss(value_preds_batch[mb], values, curr_e_clip, return_batch[mb], self.clip_value)
 
-            # b_loss = self.bound_loss(mu)
-            
-            a_loss = torch.mean(a_loss)
-            c_loss = torch.mean(c_loss)
-            # b_loss = torch.mean(b_loss)
-            entropy = torch.mean(entropy)
+                mb_a_loss = torch.sum(a_info['actor_loss']) / batch_size
+                mb_c_loss = torch.sum(c_info['critic_loss']) / batch_size
+                mb_entropy = torch.sum(res_dict['entropy']) / batch_size
 
-            loss = a_loss + self.critic_coef * c_loss - self.entropy_coef * entropy #+ self.bounds_loss_coef * b_loss
-            
-            a_clip_frac = torch.mean(a_info['actor_clipped'].float())
-            
-            a_info['actor_loss'] = a_loss
-            a_info['actor_clip_frac'] = a_clip_frac
+                loss = mb_a_loss + self.critic_coef * mb_c_loss - self.entropy_coef * mb_entropy
 
-            if self.multi_gpu:
-                self.optimizer.zero_grad()
-            else:
-                for param in self.model.parameters():
-                    param.grad = None
+            self.scaler.scale(loss).backward()
 
-        self.scaler.scale(loss).backward()
+            a_loss += mb_a_loss.detach()
+            c_loss += mb_c_loss.detach()
+            entropy += mb_entropy.detach()
+            a_clip_frac += torch.sum(a_info['actor_clipped'].float()) / batch_size
+            logits.append(res_dict['logits'].detach())
+
+        self._apply_scheduled_lr()
         self.scaler.step(self.optimizer)
         self.scaler.update()
 
         with torch.no_grad():
             reduce_kl = not self.is_rnn
             dist_before = torch.distributions.Categorical(logits=logits_batch)
-            dist_now = torch.distributions.Categorical(logits=now_logits)
+            dist_now = torch.distributions.Categorical(logits=torch.cat(logits))
             kl_dist = torch.distributions.kl_divergence(dist_before, dist_now).mean()
             if reduce_kl:
                 kl_dist = kl_dist.mean()
@@ -473,10 +461,10 @@ class CommonAgentDiscrete(a2c_discrete.DiscreteA2CAgent):
             'kl': kl_dist,
             'last_lr': self.last_lr, 
             'lr_mul': lr_mul, 
-            # 'b_loss': b_loss
+            'actor_loss': a_loss,
+            'actor_clip_frac': a_clip_frac,
+            'critic_loss': c_loss
         }
-        self.train_result.update(a_info)
-        self.train_result.update(c_info)
 
         return
 
@@ -510,7 +498,11 @@ class CommonAgentDiscrete(a2c_discrete.DiscreteA2CAgent):
         return b_loss
 
     def _get_mean_rewards(self):
-        return self.game_rewards.get_mean()
+        return self._get_mean_rewards_tensor().cpu().numpy()
+
+    def _get_mean_rewards_tensor(self):
+        # game_rewards.get_mean() without the copy to host
+        return self.game_rewards.mean.squeeze(0)
 
     def _load_config_params(self, config):
         self.last_lr = config['learning_rate']
@@ -594,14 +586,15 @@ class CommonAgentDiscrete(a2c_discrete.DiscreteA2CAgent):
     def _log_train_info(self, train_info, frame):
         self.writer.add_scalar('performance/update_time', train_info['update_time'], frame)
         self.writer.add_scalar('performance/play_time', train_info['play_time'], frame)
-        self.writer.add_scalar('losses/a_loss', torch_ext.mean_list(train_info['actor_loss']).item(), frame)
-        self.writer.add_scalar('losses/c_loss', torch_ext.mean_list(train_info['critic_loss']).item(), frame)
+        self.writer.add_scalar('losses/a_loss', torch_ext.mean_list(train_info['actor_loss']), frame)
+        self.writer.add_scalar('losses/c_loss', torch_ext.mean_list(train_info['critic_loss']), frame)
         
-        # self.writer.add_scalar('losses/bounds_loss', torch_ext.mean_list(train_info['b_loss']).item(), frame)
-        self.writer.add_scalar('losses/entropy', torch_ext.mean_list(train_info['entropy']).item(), frame)
+        # self.writer.add_scalar('losses/bounds_loss', torch_ext.mean_list(train_info['b_loss']), frame)
+        self.writer.add_scalar('losses/entropy', torch_ext.mean_list(train_info['entropy']), frame)
         self.writer.add_scalar('info/last_lr', train_info['last_lr'][-1] * train_info['lr_mul'][-1], frame)
         self.writer.add_scalar('info/lr_mul', train_info['lr_mul'][-1], frame)
         self.writer.add_scalar('info/e_clip', self.e_clip * train_info['lr_mul'][-1], frame)
-        self.writer.add_scalar('info/clip_frac', torch_ext.mean_list(train_info['actor_clip_frac']).item(), frame)
-        self.writer.add_scalar('info/kl', torch_ext.mean_list(train_info['kl']).item(), frame)
+        self.writer.add_scalar('info/clip_frac', torch_ext.mean_list(train_info['actor_clip_frac']), frame)
+        self.writer.add_scalar('info/kl', torch_ext.mean_list(train_info['kl']), frame)
+        self.writer.add_scalar('info/mini_epochs', train_info['mini_epochs'], frame)
         return
@@ -0,0 +1,172 @@
+import atexit
+
+from rl_games.algos_torch import torch_ext
+from rl_games.common import a2c_common
+from rl_games.common import schedulers
+
+import torch
+
+from utils.checkpoint_writer import CheckpointWriter
+from utils.scalar_writer import BatchedScalarWriter
+from utils.torch_distributed import TorchDistributedWrapper
+
+# storage types of the experience buffer fields in buffer_half_fields
+BUFFER_DTYPES = {
+    'float32': None,
+    'float16': torch.float16,
+    'bfloat16': torch.bfloat16,
+}
+
+
+class CommonAgentMixin():
+    # Training-loop code shared by CommonAgent and CommonAgentDiscrete, listed before the rl_games agent base
+
+    def _init_a2c_base(self, base_name, config):
+        dist_wrapper = None
+        if config.get('torch_distributed', False):
+            assert(not config.get('multi_gpu', False)), "Use either horovod or torch.distributed"
+            dist_wrapper = TorchDistributedWrapper()
+            config = dist_wrapper.update_algo_config(config)
+
+        a2c_common.A2CBase.__init__(self, base_name, config)
+        if dist_wrapper is not None:
+            # reuse the horovod code paths with the torch.distributed wrapper
+            self.multi_gpu = True
+            self.hvd = dist_wrapper
+            self.rank = dist_wrapper.rank
+            self.rank_size = dist_wrapper.rank_size
+            if self.rank != 0:
+                # A2CBase opened a writer before the rank was known
+                self.writer.close()
+                self.writer = None
+        if self.writer is not None:
+            self.writer = BatchedScalarWriter(self.writer)
+        return config
+
+    def _init_checkpoint_writer(self, config):
+        self._checkpoint_writer = None
+        if config.get('background_save', False):
+            self._checkpoint_writer = CheckpointWriter(config.get('max_pending_saves', 2))
+            atexit.register(self._checkpoint_writer.close)
+        return
+
+    def save(self, fn):
+        if self._checkpoint_writer is None:
+            super().save(fn)
+            return
+        self._checkpoint_writer.save(fn + '.pth', self.get_full_state_weights())
+        return
+
+    def _init_update_params(self, config):
+        self._pending_kl = None
+        self._lr_needs_kl = isinstance(self.scheduler, schedulers.AdaptiveScheduler)
+        # stop the update once the approximate KL exceeds kl_early_stop times the KL target, 0 disables
+        self._kl_early_stop = config.get('kl_early_stop', 0)
+        self._kl_target = config.get('kl_threshold', 0.008)
+        self._buffer_dtype = BUFFER_DTYPES[config.get('buffer_dtype', 'float32')]
+        self._buffer_half_fields = config.get('buffer_half_fields', ['obses', 'next_obses', 'mus', 'sigmas'])
+        # split each minibatch into grad_accum_steps micro-batches and accumulate their gradients
+        self._grad_accum_steps = config.get('grad_accum_steps', 1)
+        if self._grad_accum_steps > 1:
+            assert(not self.is_rnn), "Gradient accumulation is not supported with rnn models"
+            assert(not self.multi_gpu or isinstance(self.hvd, TorchDistributedWrapper)), \
+                "Gradient accumulation with multiple GPUs needs torch_distributed, horovod reduces on every backward"
+        return
+
+    def _train_mini_epochs(self):
+        train_info = None
+        mini_epochs = 0
+        for _ in range(0, self.mini_epochs_num):
+            ep_kls = []
+            for i in range(len(self.dataset)):
+                curr_train_info = self.train_actor_critic(self.dataset[i])
+                
+                if self.schedule_type == 'legacy':  
+                    # the legacy schedule adapts the lr after every minibatch, so an adaptive one still reads
+                    # each minibatch's KL back, once the next backward pass is queued (see _apply_scheduled_lr)
+                    if self.multi_gpu:
+                        curr_train_info['kl'] = self.hvd.average_value(curr_train_info['kl'], 'ep_kls')
+                    self._schedule_lr(curr_train_info['kl'])
+
+                if (train_info is None):
+                    train_info = dict()
+                    for k, v in curr_train_info.items():
+                        train_info[k] = [v]
+                else:
+                    for k, v in curr_train_info.items():
+                        train_info[k].append(v)
+            
+            av_kls = torch_ext.mean_list(train_info['kl'])
+
+            if self.schedule_type == 'standard':
+                if self.multi_gpu:
+                    av_kls = self.hvd.average_value(av_kls, 'ep_kls')
+                self._schedule_lr(av_kls)
+
+            mini_epochs += 1
+            if self._stop_mini_epochs(av_kls):
+                break
+
+        self._apply_scheduled_lr()
+
+        if self.schedule_type == 'standard_epoch':
+            if self.multi_gpu:
+                av_kls = self.hvd.average_value(torch_ext.mean_list(kls), 'ep_kls')
+            self.last_lr, self.entropy_coef = self.scheduler.update(self.last_lr, self.entropy_coef, self.epoch_num, 0, av_kls.item())
+            self.update_lr(self.last_lr)
+
+        train_info['mini_epochs'] = mini_epochs
+        return train_info
+
+    def _cast_experience_buffer(self):
+        # rewards, values and returns stay in fp32, the fields listed here are upcast per minibatch by the dataset
+        if self._buffer_dtype is None:
+            return
+        tensor_dict = self.experience_buffer.tensor_dict
+        saved_bytes = 0
+        cast_fields = []
+        for name in self._buffer_half_fields:
+            buffer = tensor_dict.get(name, None)
+            if buffer is None or buffer.dtype != torch.float32:
+                # e.g. mus and sigmas, which the discrete agents do not store
+                continue
+            tensor_dict[name] = buffer.to(self._buffer_dtype)
+            saved_bytes += buffer.numel() * (buffer.element_size() - tensor_dict[name].element_size())
+            cast_fields.append(name)
+        print("Experience buffer: {} stored as {}, {:.1f} MB saved".format(
+            ', '.join(cast_fields), self._buffer_dtype, saved_bytes / 2**20))
+        return
+
+    def _stop_mini_epochs(self, av_kls):
+        if self._kl_early_stop <= 0:
+            return False
+        if self.multi_gpu and self.schedule_type != 'standard':
+            # every rank has to stop after the same mini-epoch
+            av_kls = self.hvd.average_value(av_kls, 'ep_kls')
+        return av_kls.item() > self._kl_early_stop * self._kl_target
+
+    def _micro_batches(self, batch_size):
+        # slices of a minibatch processed one at a time by calc_gradients, a single slice without accumulation
+        micro_size = -(-batch_size // self._grad_accum_steps)
+        return [slice(start, min(start + micro_size, batch_size)) for start in range(0, batch_size, micro_size)]
+
+    def _schedule_lr(self, kl):
+        self._pending_kl = kl
+        if not self._lr_needs_kl:
+            # identity and linear schedules ignore the KL, it is never read back
+            self._apply_scheduled_lr()
+        return
+
+    def _apply_scheduled_lr(self):
+        # The adaptive schedule needs the KL on the host. calc_gradients applies it once the next
+        # minibatch's backward pass is queued, so reading it back does not leave the device idle.
+        # The adaptive schedule never changes the entropy coef, so the lr of every step is unchanged.
+        if self._pending_kl is None:
+            return
+        kl = self._pending_kl
+        self._pending_kl = None
+        if self._lr_needs_kl:
+            kl = kl.item()
+        self.last_lr, self.entropy_coef = self.scheduler.update(self.last_lr, self.entropy_coef, self.epoch_num, 0, kl)
+        self.update_lr(self.last_lr)
+        return
@@ -34,6 +34,11 @@ from rl_games.algos_torch.running_mean_std import RunningMeanStd
 from rl_games.common.player import BasePlayer
 
 import numpy as np
+import atexit
+import os
+
+from utils.rollout_recorder import build_rollout_recorder
+from utils.profiler import build_profiler
 
 class CommonPlayerDiscrete(players.PpoPlayerDiscrete):
     def __init__(self, config):
@@ -47,6 +52,15 @@ class CommonPlayerDiscrete(players.PpoPlayerDiscrete):
 
         net_config = self._build_net_config()
         self._build_net(net_config)   
+
+        self._rollout_recorder = build_rollout_recorder(self.config, self.env.task)
+        if self._rollout_recorder is not None:
+            atexit.register(self._rollout_recorder.close)
+
+        profile_dir = os.path.join(self.config.get('train_dir', 'runs'), self.config['name'], 'summaries')
+        self._profiler = build_profiler(self.config, profile_dir)
+        if self._profiler is not None:
+            atexit.register(self._profiler.close)
         
         return
 
@@ -118,8 +132,7 @@ class CommonPlayerDiscrete(players.PpoPlayerDiscrete):
                         for s in self.states:
                             s[:,all_done_indices,:] = s[:,all_done_indices,:] * 0.0
 
-                    cur_rewards = cr[done_indices].sum().item()
-                    cur_steps = steps[done_indices].sum().item()
+                    cur_rewards, cur_steps = torch.stack([cr[done_indices].sum(), steps[done_indices].sum()]).tolist()
 
                     cr = cr * (1.0 - done.float())
                     steps = steps * (1.0 - done.float())
@@ -200,6 +213,13 @@ class CommonPlayerDiscrete(players.PpoPlayerDiscrete):
         return self.obs_to_torch(obs)
 
     def _post_step(self, info):
+        if self._profiler is not None:
+            self._profiler.step()
+        return
+
+    def _record_step(self):
+        if self._rollout_recorder is not None:
+            self._rollout_recorder.record_task(self.env.task)
         return
 
     def _build_net_config(self):
@@ -49,7 +49,7 @@ from torch import optim
 import learning.common_agent_discrete as common_agent_discrete
 import learning.skillmimic_models as skillmimic_models #ZC0
 import learning.skillmimic_network_builder as skillmimic_network_builder
-import learning.skillmimic_agent as skillmimic_agent
+import learning.llc_actor as llc_actor
 
 from tensorboardX import SummaryWriter
 
@@ -142,10 +142,9 @@ class HRLAgentDiscrete(common_agent_discrete.CommonAgentDiscrete):
 
         return
 
-    def _get_mean_rewards(self):
-        rewards = super()._get_mean_rewards()
-        rewards *= self._llc_steps
-        return rewards
+    def _get_mean_rewards_tensor(self):
+        # the base returns a view of the game_rewards meter, scale out of place
+        return super()._get_mean_rewards_tensor() * self._llc_steps
 
     def _setup_action_space(self):
         super()._setup_action_space()
@@ -182,13 +181,10 @@ class HRLAgentDiscrete(common_agent_discrete.CommonAgentDiscrete):
         llc_agent_config = self._build_llc_agent_config(config_params, network)
 
         # self._llc_agent = ase_agent.ASEAgent('llc', llc_agent_config)
-        self._llc_agent = skillmimic_agent.SkillMimicAgent('llc', llc_agent_config)
+        self._llc_agent = llc_actor.LLCActor(llc_agent_config, self.device)
 
         self._llc_agent.restore(checkpoint_file)
         print("Loaded LLC checkpoint from {:s}".format(checkpoint_file))
-        self._llc_agent.set_eval()
-
-        self._llc_agent.model.to(self.device)
         
         return
 
@@ -256,6 +252,6 @@ class HRLAgentDiscrete(common_agent_discrete.CommonAgentDiscrete):
         super()._log_train_info(train_info, frame)
 
         disc_reward_std, disc_reward_mean = torch.std_mean(train_info['disc_rewards'])
-        self.writer.add_scalar('info/disc_reward_mean', disc_reward_mean.item(), frame)
-        self.writer.add_scalar('info/disc_reward_std', disc_reward_std.item(), frame)
+        self.writer.add_scalar('info/disc_reward_mean', disc_reward_mean, frame)
+        self.writer.add_scalar('info/disc_reward_std', disc_reward_std, frame)
         return
\ No newline at end of file
@@ -41,7 +41,7 @@ from rl_games.common.player import BasePlayer
 import learning.common_player_discrete as common_player_discrete
 import learning.skillmimic_models as skillmimic_models #ZC0
 import learning.skillmimic_network_builder as skillmimic_network_builder
-import learning.skillmimic_players as skillmimic_players
+import learning.llc_actor as llc_actor
 
 class HRLPlayerDiscrete(common_player_discrete.CommonPlayerDiscrete):
     def __init__(self, config):
@@ -167,8 +167,7 @@ class HRLPlayerDiscrete(common_player_discrete.CommonPlayerDiscrete):
                         for s in self.states:
                             s[:,all_done_indices,:] = s[:,all_done_indices,:] * 0.0
 
-                    cur_rewards = cr[done_indices].sum().item()
-                    cur_steps = steps[done_indices].sum().item()
+                    cur_rewards, cur_steps = torch.stack([cr[done_indices].sum(), steps[done_indices].sum()]).tolist()
 
                     cr = cr * (1.0 - done.float())
                     steps = steps * (1.0 - done.float())
@@ -215,6 +214,7 @@ class HRLPlayerDiscrete(common_player_discrete.CommonPlayerDiscrete):
             llc_actions = self._compute_llc_action(obs, actions)
                         
             obs, curr_rewards, curr_dones, infos = env.step(llc_actions)
+            self._record_step()
 
             rewards += curr_rewards
             done_count += curr_dones
@@ -257,7 +257,7 @@ class HRLPlayerDiscrete(common_player_discrete.CommonPlayerDiscrete):
         llc_agent_config = self._build_llc_agent_config(config_params, network)
 
         # self._llc_agent = ase_players.ASEPlayer(llc_agent_config)
-        self._llc_agent = skillmimic_players.SkillMimicPlayerContinuous(llc_agent_config)
+        self._llc_agent = llc_actor.LLCActor(llc_agent_config, self.device)
 
         self._llc_agent.restore(checkpoint_file)
         print("Loaded LLC checkpoint from {:s}".format(checkpoint_file))
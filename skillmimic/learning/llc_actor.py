@@ -0,0 +1,69 @@
+import torch
+
+from rl_games.algos_torch import players
+from rl_games.algos_torch import torch_ext
+from rl_games.algos_torch.running_mean_std import RunningMeanStd
+
+from utils.checkpoint_reader import load_checkpoint, load_actor_state_dict
+
+
+class LLCActor():
+    """
+    Inference-only low-level controller for the HRL agents and players.
+
+    Exposes the part of the SkillMimic agent/player interface the HRL code calls (model, _preproc_obs,
+    preprocess_actions, is_tensor_obses, set_eval) without the optimizer, experience buffer and
+    normalizers of a training agent. restore() loads the actor-only part of a checkpoint.
+    """
+    def __init__(self, config, device):
+        env_info = config['env_info']
+        action_space = env_info['action_space']
+        self.device = device
+        self.normalize_input = config['normalize_input']
+        self.clip_actions = config.get('clip_actions', True)
+        self.is_tensor_obses = True
+
+        self.actions_num = action_space.shape[0]
+        self.actions_low = torch.from_numpy(action_space.low.copy()).float().to(self.device)
+        self.actions_high = torch.from_numpy(action_space.high.copy()).float().to(self.device)
+
+        obs_shape = torch_ext.shape_whc_to_cwh(env_info['observation_space'].shape)
+        net_config = {
+            'actions_num' : self.actions_num,
+            'input_shape' : obs_shape,
+            'num_seqs' : config.get('num_actors', 1),
+            'value_size': env_info.get('value_size', 1),
+        }
+        self.model = config['network'].build(net_config)
+        self.model.to(self.device)
+
+        if self.normalize_input:
+            self.running_mean_std = RunningMeanStd(obs_shape).to(self.device)
+
+        self.set_eval()
+        return
+
+    def restore(self, fn):
+        checkpoint = load_checkpoint(fn, mmap=True, actor_only=True)
+        load_actor_state_dict(self.model, checkpoint['model'])
+        if self.normalize_input:
+            self.running_mean_std.load_state_dict(checkpoint['running_mean_std'])
+        return
+
+    def set_eval(self):
+        self.model.eval()
+        if self.normalize_input:
+            self.running_mean_std.eval()
+        return
+
+    def _preproc_obs(self, obs_batch):
+        if self.normalize_input:
+            obs_batch = self.running_mean_std(obs_batch)
+        return obs_batch
+
+    def preprocess_actions(self, actions):
+        if self.clip_actions:
+            actions = players.rescale_actions(self.actions_low, self.actions_high, torch.clamp(actions, -1.0, 1.0))
+        if not self.is_tensor_obses:
+            actions = actions.cpu().numpy()
+        return actions
@@ -42,6 +42,7 @@ import torch
 from torch import nn
 
 import learning.common_agent as common_agent
+from utils.step_timer import time_phase
 
 from tensorboardX import SummaryWriter
 
@@ -110,15 +111,17 @@ class SkillMimicAgent(common_agent.CommonAgent):
 
         for n in range(self.horizon_length):
 
-            self.obs = self.env_reset(self.done_indices)
+            with time_phase(self._step_timer, 'env_reset'):
+                self.obs = self.env_reset(self.done_indices)
 
             self.experience_buffer.update_data('obses', n, self.obs['obs'])
 
-            if self.use_action_masks:
-                masks = self.vec_env.get_action_masks()
-                res_dict = self.get_masked_action_values(self.obs, masks)
-            else:
-                res_dict = self.get_action_values(self.obs, self._rand_action_probs)
+            with time_phase(self._step_timer, 'inference'):
+                if self.use_action_masks:
+                    masks = self.vec_env.get_action_masks()
+                    res_dict = self.get_masked_action_values(self.obs, masks)
+                else:
+                    res_dict = self.get_action_values(self.obs, self._rand_action_probs)
 
             for k in update_list:
                 self.experience_buffer.update_data(k, n, res_dict[k]) 
@@ -126,7 +129,8 @@ class SkillMimicAgent(common_agent.CommonAgent):
             if self.has_central_value:
                 self.experience_buffer.update_data('states', n, self.obs['states'])
 
-            self.obs, rewards, self.dones, infos = self.env_step(res_dict['actions'])
+            with time_phase(self._step_timer, 'env_step'):
+                self.obs, rewards, self.dones, infos = self.env_step(res_dict['actions'])
             shaped_rewards = self.rewards_shaper(rewards)
             self.experience_buffer.update_data('rewards', n, shaped_rewards)
             self.experience_buffer.update_data('next_obses', n, self.obs['obs'])
@@ -135,17 +139,22 @@ class SkillMimicAgent(common_agent.CommonAgent):
 
             terminated = infos['terminate'].float()
             terminated = terminated.unsqueeze(-1)
-            next_vals = self._eval_critic(self.obs)
+            with time_phase(self._step_timer, 'next_values'):
+                next_vals = self._eval_critic(self.obs)
             next_vals *= (1.0 - terminated)
             self.experience_buffer.update_data('next_values', n, next_vals)
 
             self.current_rewards += rewards
             self.current_lengths += 1
-            all_done_indices = self.dones.nonzero(as_tuple=False)
-            self.done_indices = all_done_indices[::self.num_agents]
-  
-            self.game_rewards.update(self.current_rewards[self.done_indices])
-            self.game_lengths.update(self.current_lengths[self.done_indices])
+            if self._masked_reset:
+                self._record_done_stats(n)
+                self.done_indices = self.dones.bool()
+            else:
+                all_done_indices = self.dones.nonzero(as_tuple=False)
+                self.done_indices = all_done_indices[::self.num_agents]
+
+                self.game_rewards.update(self.current_rewards[self.done_indices])
+                self.game_lengths.update(self.current_lengths[self.done_indices])
             self.algo_observer.process_infos(infos, self.done_indices)
 
             not_dones = 1.0 - self.dones.float()
@@ -156,7 +165,11 @@ class SkillMimicAgent(common_agent.CommonAgent):
             if (self.vec_env.env.task.viewer):
                 self._amp_debug(infos)
                 
-            self.done_indices = self.done_indices[:, 0]
+            if not self._masked_reset:
+                self.done_indices = self.done_indices[:, 0]
+
+        if self._masked_reset:
+            self._update_done_stats()
 
         mb_fdones = self.experience_buffer.tensor_dict['dones'].float()
         mb_values = self.experience_buffer.tensor_dict['values']
@@ -212,77 +225,6 @@ class SkillMimicAgent(common_agent.CommonAgent):
         self.dataset.values_dict['rand_action_mask'] = rand_action_mask
         return
     
-    def train_epoch(self):
-        play_time_start = time.time()
-
-        with torch.no_grad():
-            if self.is_rnn:
-                batch_dict = self.play_steps_rnn()
-            else:
-                batch_dict = self.play_steps() # sampling
-
-        play_time_end = time.time()
-        update_time_start = time.time()
-        rnn_masks = batch_dict.get('rnn_masks', None)
-        
-        self.set_train()
-        self.prepare_dataset(batch_dict)
-        self.algo_observer.after_steps()
-
-        if self.has_central_value:
-            self.train_central_value()
-
-        train_info = None
-
-        if self.is_rnn:
-            frames_mask_ratio = rnn_masks.sum().item() / (rnn_masks.nelement())
-            print(frames_mask_ratio)
-
-        for _ in range(0, self.mini_epochs_num):
-            ep_kls = []
-            for i in range(len(self.dataset)):
-                curr_train_info = self.train_actor_critic(self.dataset[i]) # updating
-                
-                if self.schedule_type == 'legacy':  
-                    if self.multi_gpu:
-                        curr_train_info['kl'] = self.hvd.average_value(curr_train_info['kl'], 'ep_kls')
-                    self.last_lr, self.entropy_coef = self.scheduler.update(self.last_lr, self.entropy_coef, self.epoch_num, 0, curr_train_info['kl'].item())
-                    self.update_lr(self.last_lr)
-
-                if (train_info is None):
-                    train_info = dict()
-                    for k, v in curr_train_info.items():
-                        train_info[k] = [v]
-                else:
-                    for k, v in curr_train_info.items():
-                        train_info[k].append(v)
-            
-            av_kls = torch_ext.mean_list(train_info['kl'])
-
-            if self.schedule_type == 'standard':
-                if self.multi_gpu:
-                    av_kls = self.hvd.average_value(av_kls, 'ep_kls')
-                self.last_lr, self.entropy_coef = self.scheduler.update(self.last_lr, self.entropy_coef, self.epoch_num, 0, av_kls.item())
-                self.update_lr(self.last_lr)
-
-        if self.schedule_type == 'standard_epoch':
-            if self.multi_gpu:
-                av_kls = self.hvd.average_value(torch_ext.mean_list(kls), 'ep_kls')
-            self.last_lr, self.entropy_coef = self.scheduler.update(self.last_lr, self.entropy_coef, self.epoch_num, 0, av_kls.item())
-            self.update_lr(self.last_lr)
-
-        update_time_end = time.time()
-        play_time = play_time_end - play_time_start
-        update_time = update_time_end - update_time_start
-        total_time = update_time_end - play_time_start
-
-        train_info['play_time'] = play_time
-        train_info['update_time'] = update_time
-        train_info['total_time'] = total_time
-        self._record_train_batch_info(batch_dict, train_info)
-
-        return train_info
-
     def calc_gradients(self, input_dict):
         self.set_train()
 
@@ -304,54 +246,61 @@ class SkillMimicAgent(common_agent.CommonAgent):
         lr_mul = 1.0
         curr_e_clip = lr_mul * self.e_clip
 
-        batch_dict = {
-            'is_train': True,
-            'prev_actions': actions_batch, 
-            'obs' : obs_batch
-        }
-
         rnn_masks = None
         if self.is_rnn:
             rnn_masks = input_dict['rnn_masks']
-            batch_dict['rnn_states'] = input_dict['rnn_states']
-            batch_dict['seq_length'] = self.seq_len
 
-        with torch.cuda.amp.autocast(enabled=self.mixed_precision):
-            res_dict = self.model(batch_dict)
-            action_log_probs = res_dict['prev_neglogp']
-            values = res_dict['values']
-            entropy = res_dict['entropy']
-            mu = res_dict['mus']
-            sigma = res_dict['sigmas']
+        if self.multi_gpu:
+            self.optimizer.zero_grad()
+        else:
+            for param in self.model.parameters():
+                param.grad = None
+
+        # The masked losses of every micro-batch are divided by the mask sum of the whole minibatch and
+        # the critic loss by the minibatch size, so the accumulated gradients and the summed losses are
+        # those of a single pass over the whole minibatch.
+        batch_size = obs_batch.shape[0]
+        a_loss = c_loss = b_loss = entropy = a_clip_frac = 0.0
+        mus = []
+        sigmas = []
+        for mb in self._micro_batches(batch_size):
+            batch_dict = {
+                'is_train': True,
+                'prev_actions': actions_batch[mb], 
+                'obs' : obs_batch[mb]
+            }
+            if self.is_rnn:
+                batch_dict['rnn_states'] = input_dict['rnn_states']
+                batch_dict['seq_length'] = self.seq_len
 
-            a_info = self._actor_loss(old_action_log_probs_batch, action_log_probs, advantage, curr_e_clip)
-            a_loss = a_info['actor_loss']
-            a_clipped = a_info['actor_clipped'].float()
+            mb_mask = rand_action_mask[mb]
 
-            c_info = self._critic_loss(value_preds_batch, values, curr_e_clip, return_batch, self.clip_value)
-            c_loss = c_info['critic_loss']
+            with torch.cuda.amp.autocast(enabled=self.mixed_precision):
+                res_dict = self.model(batch_dict)
+                action_log_probs = res_dict['prev_neglogp']
+                values = res_dict['values']
+                mu = res_dict['mus']
 
-            b_loss = self.bound_loss(mu)
-            
-            c_loss = torch.mean(c_loss)
-            a_loss = torch.sum(rand_action_mask * a_loss) / rand_action_sum
-            entropy = torch.sum(rand_action_mask * entropy) / rand_action_sum
-            b_loss = torch.sum(rand_action_mask * b_loss) / rand_action_sum
-            a_clip_frac = torch.sum(rand_action_mask * a_clipped) / rand_action_sum
-            
-            loss = a_loss + self.critic_coef * c_loss + self.bounds_loss_coef * b_loss
-            
-            a_info['actor_loss'] = a_loss
-            a_info['actor_clip_frac'] = a_clip_frac
-            c_info['critic_loss'] = c_loss
+                a_info = self._actor_loss(old_action_log_probs_batch[mb], action_log_probs, advantage[mb], curr_e_clip)
+                c_info = self._critic_loss(value_preds_batch[mb], values, curr_e_clip, return_batch[mb], self.clip_value)
 
-            if self.multi_gpu:
-                self.optimizer.zero_grad()
-            else:
-                for param in self.model.parameters():
-                    param.grad = None
+                mb_c_loss = torch.sum(c_info['critic_loss']) / batch_size
+                mb_a_loss = torch.sum(mb_mask * a_info['actor_loss']) / rand_action_sum
+                mb_b_loss = torch.sum(mb_mask * self.bound_loss(mu)) / rand_action_sum
+
+                loss = mb_a_loss + self.critic_coef * mb_c_loss + self.bounds_loss_coef * mb_b_loss
+
+            self.scaler.scale(loss).backward()
+
+            a_loss += mb_a_loss.detach()
+            c_loss += mb_c_loss.detach()
+            b_loss += mb_b_loss.detach()
+            entropy += torch.sum(mb_mask * res_dict['entropy'].detach()) / rand_action_sum
+            a_clip_frac += torch.sum(mb_mask * a_info['actor_clipped'].float()) / rand_action_sum
+            mus.append(mu.detach())
+            sigmas.append(res_dict['sigmas'].detach())
 
-        self.scaler.scale(loss).backward()
+        self._apply_scheduled_lr()
         if self.truncate_grads:
             if self.multi_gpu:
                 self.optimizer.synchronize()
@@ -371,7 +320,7 @@ class SkillMimicAgent(common_agent.CommonAgent):
 
         with torch.no_grad():
             reduce_kl = not self.is_rnn
-            kl_dist = torch_ext.policy_kl(mu.detach(), sigma.detach(), old_mu_batch, old_sigma_batch, reduce_kl)
+            kl_dist = torch_ext.policy_kl(torch.cat(mus), torch.cat(sigmas), old_mu_batch, old_sigma_batch, reduce_kl)
             if self.is_rnn:
                 kl_dist = (kl_dist * rnn_masks).sum() / rnn_masks.numel()  #/ sum_mask
                     
@@ -380,10 +329,11 @@ class SkillMimicAgent(common_agent.CommonAgent):
             'kl': kl_dist,
             'last_lr': self.last_lr, 
             'lr_mul': lr_mul, 
-            'b_loss': b_loss
+            'b_loss': b_loss,
+            'actor_loss': a_loss,
+            'actor_clip_frac': a_clip_frac,
+            'critic_loss': c_loss
         }
-        self.train_result.update(a_info)
-        self.train_result.update(c_info)
 
         return
 
@@ -444,14 +394,15 @@ class SkillMimicAgent(common_agent.CommonAgent):
     def _log_train_info(self, train_info, frame):
         self.writer.add_scalar('performance/update_time', train_info['update_time'], frame)
         self.writer.add_scalar('performance/play_time', train_info['play_time'], frame)
-        self.writer.add_scalar('losses/a_loss', torch_ext.mean_list(train_info['actor_loss']).item(), frame)
-        self.writer.add_scalar('losses/c_loss', torch_ext.mean_list(train_info['critic_loss']).item(), frame)
+        self.writer.add_scalar('losses/a_loss', torch_ext.mean_list(train_info['actor_loss']), frame)
+        self.writer.add_scalar('losses/c_loss', torch_ext.mean_list(train_info['critic_loss']), frame)
         
-        self.writer.add_scalar('losses/bounds_loss', torch_ext.mean_list(train_info['b_loss']).item(), frame)
-        self.writer.add_scalar('losses/entropy', torch_ext.mean_list(train_info['entropy']).item(), frame)
+        self.writer.add_scalar('losses/bounds_loss', torch_ext.mean_list(train_info['b_loss']), frame)
+        self.writer.add_scalar('losses/entropy', torch_ext.mean_list(train_info['entropy']), frame)
         self.writer.add_scalar('info/last_lr', train_info['last_lr'][-1] * train_info['lr_mul'][-1], frame)
         self.writer.add_scalar('info/lr_mul', train_info['lr_mul'][-1], frame)
         self.writer.add_scalar('info/e_clip', self.e_clip * train_info['lr_mul'][-1], frame)
-        self.writer.add_scalar('info/clip_frac', torch_ext.mean_list(train_info['actor_clip_frac']).item(), frame)
-        self.writer.add_scalar('info/kl', torch_ext.mean_list(train_info['kl']).item(), frame)
+        self.writer.add_scalar('info/clip_frac', torch_ext.mean_list(train_info['actor_clip_frac']), frame)
+        self.writer.add_scalar('info/kl', torch_ext.mean_list(train_info['kl']), frame)
+        self.writer.add_scalar('info/mini_epochs', train_info['mini_epochs'], frame)
         return
\ No newline at end of file
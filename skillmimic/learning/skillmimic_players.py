@@ -32,6 +32,7 @@ from rl_games.algos_torch import torch_ext
 from rl_games.algos_torch.running_mean_std import RunningMeanStd
 import os
 import learning.common_player as common_player
+from utils.checkpoint_reader import load_checkpoint, load_actor_state_dict
 
 # from utils import fid #V1
 # import physhoi.learning.fid as fid
@@ -171,8 +172,7 @@ class SkillMimicPlayerContinuous(common_player.CommonPlayer):
                             for s in self.states:
                                 s[:,all_done_indices,:] = s[:,all_done_indices,:] * 0.0
 
-                        cur_rewards = cr[done_indices].sum().item()
-                        cur_steps = steps[done_indices].sum().item()
+                        cur_rewards, cur_steps = torch.stack([cr[done_indices].sum(), steps[done_indices].sum()]).tolist()
 
                         cr = cr * (1.0 - done.float())
                         steps = steps * (1.0 - done.float())
@@ -181,10 +181,10 @@ class SkillMimicPlayerContinuous(common_player.CommonPlayer):
                         sum_steps += cur_steps
 
                         if METRIC: #metric
-                            ca = cum_accuracy[done_indices].sum().item() 
-                            cb = cum_mpjpe_b[done_indices].sum().item()
-                            co = cum_mpjpe_o[done_indices].sum().item()
-                            cc = cum_cg_error[done_indices].sum().item()
+                            ca, cb, co, cc, cs = torch.stack([
+                                cum_accuracy[done_indices].sum(), cum_mpjpe_b[done_indices].sum(),
+                                cum_mpjpe_o[done_indices].sum(), cum_cg_error[done_indices].sum(),
+                                info["succ"][done_indices].sum().float()]).tolist()
 
                             cum_accuracy *= (1.0 - done.float())
                             cum_mpjpe_b *= (1.0 - done.float())
@@ -196,7 +196,7 @@ class SkillMimicPlayerContinuous(common_player.CommonPlayer):
                             sum_mpjpe_o += co
                             sum_cg_error += cc
 
-                            sum_succ += info["succ"][done_indices].sum().item()
+                            sum_succ += cs
                         #
 
 
@@ -249,8 +249,12 @@ class SkillMimicPlayerContinuous(common_player.CommonPlayer):
     def load_dual(self, fn): #ZC9
         networks = [self.model.a2c_network.network1, self.model.a2c_network.network2]
         dual_model_cp = [fn] * 2
+        # both networks start from the same file, read it once
+        checkpoints = {}
         for network, cp in zip(networks, dual_model_cp):
-            checkpoint = torch.load(cp, map_location=self.device)
+            if cp not in checkpoints:
+                checkpoints[cp] = load_checkpoint(cp, map_location=self.device)
+            checkpoint = checkpoints[cp]
             model_checkpoint = {x[len('a2c_network.'):]: y for x, y in checkpoint['model'].items()}
 
             model_state_dict = network.state_dict()
@@ -296,18 +300,22 @@ class SkillMimicPlayerContinuous(common_player.CommonPlayer):
                     network.running_obs.mean[:obs_len] = model_checkpoint['running_obs.running_mean'].float()
                     network.running_obs.var[:obs_len] = model_checkpoint['running_obs.running_var'].float()
                     network.running_obs.std[:obs_len] = torch.sqrt(network.running_obs.var[:obs_len])
+        return checkpoints[fn]
     
     def restore(self, fn):
         if self.config.get('dual', False): #ZC9
-            self.load_dual(fn)
+            checkpoint = self.load_dual(fn)
             if self.normalize_input:
-                self.running_mean_std.load_state_dict(torch_ext.load_checkpoint(fn)['running_mean_std'])
+                self.running_mean_std.load_state_dict(checkpoint['running_mean_std'])
             return
 
         if (fn != 'Base'):
-            super().restore(fn)
+            # the player never uses the critic, its values are discarded
+            checkpoint = load_checkpoint(fn, mmap=True, actor_only=True)
+            load_actor_state_dict(self.model, checkpoint['model'])
+            if self.normalize_input:
+                self.running_mean_std.load_state_dict(checkpoint['running_mean_std'])
             if self._normalize_amp_input:
-                checkpoint = torch_ext.load_checkpoint(fn)
                 self._amp_input_mean_std.load_state_dict(checkpoint['amp_input_mean_std'])
         return
     
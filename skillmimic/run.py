@@ -30,7 +30,8 @@ import os
 # os.environ['CUDA_LAUNCH_BLOCKING'] = '1'
 
 from utils.config import set_np_formatting, set_seed, get_args, parse_sim_params, load_cfg
-from utils.parse_task import parse_task
+from utils.parse_task import parse_task, parse_sharded_task
+from utils.profiler import parse_profile_range
 
 from rl_games.algos_torch import players
 from rl_games.algos_torch import torch_ext
@@ -83,9 +84,25 @@ def create_rlgpu_env(**kwargs):
 
         cfg['rank'] = rank
         cfg['rl_device'] = 'cuda:' + str(rank)
+    elif cfg_train['params']['config'].get('torch_distributed', False):
+        # set by torchrun
+        rank = int(os.environ.get('RANK', 0))
+        local_rank = int(os.environ.get('LOCAL_RANK', rank))
+        print("torch.distributed rank: ", rank)
 
-    sim_params = parse_sim_params(args, cfg, cfg_train)
-    task, env = parse_task(args, cfg, cfg_train, sim_params)
+        cfg_train['params']['seed'] = cfg_train['params']['seed'] + rank
+
+        if torch.cuda.is_available():
+            args.device_id = local_rank
+            args.rl_device = 'cuda:' + str(local_rank)
+            cfg['rl_device'] = 'cuda:' + str(local_rank)
+        cfg['rank'] = rank
+
+    if args.num_shards > 1:
+        task, env = parse_sharded_task(args, cfg, cfg_train)
+    else:
+        sim_params = parse_sim_params(args, cfg, cfg_train)
+        task, env = parse_task(args, cfg, cfg_train, sim_params)
 
     print('num_envs: {:d}'.format(env.num_envs))
     print('num_actions: {:d}'.format(env.num_actions))
@@ -230,11 +247,45 @@ def main():
     if args.horovod:
         cfg_train['params']['config']['multi_gpu'] = args.horovod
 
+    if args.torch_distributed:
+        cfg_train['params']['config']['torch_distributed'] = True
+
     if args.horizon_length != -1:
         cfg_train['params']['config']['horizon_length'] = args.horizon_length
 
     if args.minibatch_size != -1:
         cfg_train['params']['config']['minibatch_size'] = args.minibatch_size
+
+    if args.step_timing:
+        cfg_train['params']['config']['step_timing'] = True
+
+    if args.masked_reset:
+        cfg_train['params']['config']['masked_reset'] = True
+
+    if args.kl_early_stop > 0.:
+        cfg_train['params']['config']['kl_early_stop'] = args.kl_early_stop
+
+    if args.profile_epochs:
+        cfg_train['params']['config']['profile_epochs'] = list(parse_profile_range(args.profile_epochs))
+        cfg_train['params']['config']['profile_warmup'] = args.profile_warmup
+        cfg_train['params']['config']['profile_record_shapes'] = args.profile_record_shapes
+        cfg_train['params']['config']['profile_with_stack'] = args.profile_with_stack
+
+    if args.buffer_dtype != 'float32':
+        cfg_train['params']['config']['buffer_dtype'] = args.buffer_dtype
+
+    if args.grad_accum_steps > 1:
+        cfg_train['params']['config']['grad_accum_steps'] = args.grad_accum_steps
+
+    if args.async_update:
+        cfg_train['params']['config']['async_update'] = True
+
+    if args.background_save:
+        cfg_train['params']['config']['background_save'] = True
+
+    if args.record_rollout:
+        cfg_train['params']['config']['record_rollout'] = args.record_rollout
+        cfg_train['params']['config']['record_envs'] = [int(env_id) for env_id in args.record_envs.split(',')]
         
     if args.motion_file:
         cfg['env']['motion_file'] = args.motion_file
@@ -257,8 +308,15 @@ def main():
     if args.op != -1.:
         cfg['env']['rewardWeights']['op'] = args.op
 
+    if args.scan_motion:
+        cfg['env']['motionScanReport'] = args.scan_motion
+
+    if args.sync_debug:
+        cfg['env']['syncDebug'] = True
+
     if args.save_images:
         cfg['env']['saveImages'] = args.save_images #True
+        cfg['env']['frameWriter'] = args.frame_writer
     
     if args.init_vel:
         cfg['env']['initVel'] = True
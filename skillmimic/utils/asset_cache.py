@@ -0,0 +1,111 @@
+import os
+import json
+import math
+import hashlib
+import xml.etree.ElementTree as ET
+
+DEFAULT_CACHE_DIR = "skillmimic/data/assets/cache" #projectname
+
+
+def file_hash(file_path):
+    with open(file_path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def cache_key(file_path, options):
+    """
+    Key of a preprocessed asset: the hash of the asset file plus the options it was processed with.
+    """
+    key = {'file': file_hash(file_path), 'options': options}
+    return hashlib.sha1(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+
+def _cached(file_path, options, build_fn, cache_dir):
+    if cache_dir is None:
+        return build_fn()
+
+    name = os.path.splitext(os.path.basename(file_path))[0]
+    cache_file = os.path.join(cache_dir, "{:s}_{:s}.json".format(name, cache_key(file_path, options)))
+    if os.path.exists(cache_file):
+        with open(cache_file, 'r') as f:
+            return json.load(f)
+
+    data = build_fn()
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_file = cache_file + ".tmp{:d}".format(os.getpid())
+    with open(tmp_file, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_file, cache_file)
+    return data
+
+
+def load_mjcf_metadata(asset_file, key_bodies=(), contact_bodies=(), cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Body/DOF metadata of an MJCF humanoid, parsed once and cached as JSON. Needs no Isaac Gym.
+
+    Bodies are listed in document order, which is the rigid body order of the loaded asset.
+    Returns:
+    dict: body_names, dof_names, dof_limits_lower/upper (radians), motor_efforts, key_body_ids, contact_body_ids.
+    """
+    options = {'key_bodies': list(key_bodies), 'contact_bodies': list(contact_bodies)}
+    return _cached(asset_file, options, lambda: parse_mjcf_metadata(asset_file, key_bodies, contact_bodies), cache_dir)
+
+
+def parse_mjcf_metadata(asset_file, key_bodies=(), contact_bodies=()):
+    root = ET.parse(asset_file).getroot()
+
+    compiler = root.find('compiler')
+    in_degrees = compiler is None or compiler.get('angle', 'degree') == 'degree'
+
+    joint_default = root.find('default/joint')
+    default_range = joint_default.get('range') if joint_default is not None else None
+
+    body_names = []
+    dof_names = []
+    dof_limits_lower = []
+    dof_limits_upper = []
+    for body in root.find('worldbody').iter('body'):
+        body_names.append(body.get('name'))
+        for joint in body.findall('joint'):
+            dof_names.append(joint.get('name'))
+            joint_range = joint.get('range', default_range)
+            if joint_range is None:
+                lower, upper = -math.pi, math.pi
+            else:
+                lower, upper = [float(v) for v in joint_range.split()]
+                if in_degrees:
+                    lower, upper = math.radians(lower), math.radians(upper)
+            dof_limits_lower.append(float(lower))
+            dof_limits_upper.append(float(upper))
+
+    gears = {}
+    actuator = root.find('actuator')
+    if actuator is not None:
+        for motor in actuator.findall('motor'):
+            gears[motor.get('joint')] = float(motor.get('gear', 1.))
+    motor_efforts = [gears.get(name, 0.) for name in dof_names]
+
+    for name in list(key_bodies) + list(contact_bodies):
+        assert name in body_names, "Unknown body {:s} in {:s}".format(name, asset_file)
+
+    metadata = {
+        'body_names': body_names,
+        'dof_names': dof_names,
+        'dof_limits_lower': dof_limits_lower,
+        'dof_limits_upper': dof_limits_upper,
+        'motor_efforts': motor_efforts,
+        'key_body_ids': [body_names.index(name) for name in key_bodies],
+        'contact_body_ids': [body_names.index(name) for name in contact_bodies],
+    }
+    return metadata
+
+
+def urdf_has_mesh_collision(asset_file, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Whether any collision geometry of a URDF is a mesh. Convex decomposition only applies to meshes.
+    """
+    def build():
+        root = ET.parse(asset_file).getroot()
+        return {'mesh_collision': root.find('.//collision/geometry/mesh') is not None}
+
+    return _cached(asset_file, {}, build, cache_dir)['mesh_collision']
@@ -0,0 +1,90 @@
+from collections import OrderedDict
+import os
+
+import torch
+
+
+# checkpoint entries needed to run a policy; the optimizer, epoch and frame counters are dropped
+ACTOR_KEYS = ['model', 'running_mean_std', 'amp_input_mean_std']
+# sub-modules of the skillmimic network that only the value function uses
+CRITIC_MODULES = ['critic_cnn', 'critic_mlp', 'value']
+
+# actor states kept by load_checkpoint, the least recently used one is dropped beyond this count
+MAX_CACHED_CHECKPOINTS = 4
+
+_cache = OrderedDict()
+
+
+def is_critic_key(key):
+    names = key.split('.')
+    if names[0] == 'a2c_network':
+        names = names[1:]
+    return len(names) > 0 and names[0] in CRITIC_MODULES
+
+
+def actor_state(checkpoint):
+    """
+    The entries of a checkpoint needed for inference, with the critic weights removed from the model.
+    """
+    state = {k: checkpoint[k] for k in ACTOR_KEYS if k in checkpoint}
+    if 'model' in state:
+        state['model'] = {k: v for k, v in state['model'].items() if not is_critic_key(k)}
+    return state
+
+
+def _torch_load(filename, map_location, mmap):
+    if mmap:
+        try:
+            return torch.load(filename, map_location=map_location, mmap=True)
+        except TypeError:
+            # torch < 2.1 has no mmap argument
+            pass
+    return torch.load(filename, map_location=map_location)
+
+
+def load_checkpoint(filename, map_location='cpu', mmap=False, actor_only=False):
+    """
+    Loads a checkpoint. With actor_only only the policy and normalizer entries are kept (see
+    actor_state) and the result is cached per path, later calls return the cached dict until the
+    file changes; it is shared between callers and must not be modified. At most
+    MAX_CACHED_CHECKPOINTS actor states are cached. Full checkpoints, with the optimizer state,
+    are read on every call and never cached.
+
+    mmap maps the file instead of reading it into memory, which needs a checkpoint written by
+    torch >= 1.6 and is ignored on older torch.
+    """
+    path = os.path.abspath(filename)
+    if not actor_only:
+        print("=> loading checkpoint '{}'".format(filename))
+        return _torch_load(path, map_location, mmap)
+
+    stamp = os.stat(path).st_mtime_ns
+    key = (path, str(map_location))
+    cached = _cache.get(key)
+    if cached is not None and cached[0] == stamp:
+        _cache.move_to_end(key)
+        return cached[1]
+
+    print("=> loading checkpoint '{}'".format(filename))
+    checkpoint = actor_state(_torch_load(path, map_location, mmap))
+    _cache[key] = (stamp, checkpoint)
+    _cache.move_to_end(key)
+    while len(_cache) > MAX_CACHED_CHECKPOINTS:
+        _cache.popitem(last=False)
+    return checkpoint
+
+
+def load_actor_state_dict(model, model_state):
+    """
+    Loads an actor-only model state, only critic weights may be missing from it.
+    """
+    missing_keys, unexpected_keys = model.load_state_dict(model_state, strict=False)
+    missing_keys = [k for k in missing_keys if not is_critic_key(k)]
+    assert(len(missing_keys) == 0 and len(unexpected_keys) == 0), \
+        "Checkpoint does not match the actor, missing keys: {}, unexpected keys: {}".format(missing_keys, unexpected_keys)
+    return
+
+
+def clear_checkpoint_cache():
+    _cache.clear()
+    return
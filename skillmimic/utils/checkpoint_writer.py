@@ -0,0 +1,83 @@
+import os
+import queue
+import threading
+
+import torch
+
+
+def state_to_cpu(state):
+    """
+    Copy of a (nested) checkpoint state with every tensor cloned to CPU, safe to serialize
+    while training keeps updating the original tensors.
+    """
+    if torch.is_tensor(state):
+        return state.detach().to('cpu', copy=True)
+    elif isinstance(state, dict):
+        return {k: state_to_cpu(v) for k, v in state.items()}
+    elif isinstance(state, (list, tuple)):
+        return type(state)(state_to_cpu(v) for v in state)
+    return state
+
+
+def save_atomic(filename, state):
+    # write to a temp file next to the target and rename, so filename always holds a complete checkpoint
+    tmp_filename = "{:s}.tmp{:d}".format(filename, os.getpid())
+    try:
+        with open(tmp_filename, 'wb') as f:
+            torch.save(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_filename, filename)
+    except BaseException:
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+        raise
+    return
+
+
+class CheckpointWriter():
+    """
+    Writes checkpoints from a background thread.
+
+    save() snapshots the state to CPU on the calling thread and queues it. Checkpoints are written
+    in the order they were saved; with max_in_flight of them queued, save() blocks until the oldest
+    is written. Errors of a background write are raised by the next save() or close().
+    """
+    def __init__(self, max_in_flight=2):
+        self._queue = queue.Queue(maxsize=max_in_flight)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return
+
+    def save(self, filename, state):
+        self._raise_error()
+        print("=> saving checkpoint '{}'".format(filename))
+        self._queue.put((filename, state_to_cpu(state)))
+        return
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self._raise_error()
+        return
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            filename, state = item
+            try:
+                save_atomic(filename, state)
+            except Exception as e:
+                self._error = e
+        return
+
+    def _raise_error(self):
+        if self._error is not None:
+            error = self._error
+            self._error = None
+            raise error
+        return
@@ -102,6 +102,8 @@ def load_cfg(args):
             cfg["task"]["randomize"] = args.randomize or cfg["task"]["randomize"]
     else:
         cfg["task"] = {"randomize": False}
+    if args.vectorized_randomization:
+        cfg["task"]["vectorized_randomization"] = True
 
     logdir = args.logdir
     # Set deterministic mode
@@ -195,8 +197,12 @@ def get_args(benchmark=False):
             "help": "Path to the saved weights, only for rl_games RL library"},
         {"name": "--headless", "action": "store_true", "default": False,
             "help": "Force display off at all times"},
+        {"name": "--sync_debug", "action": "store_true", "default": False,
+            "help": "Raise on any host-device synchronization inside a headless env step"},
         {"name": "--horovod", "action": "store_true", "default": False,
             "help": "Use horovod for multi-gpu training, have effect only with rl_games RL library"},
+        {"name": "--torch_distributed", "action": "store_true", "default": False,
+            "help": "Use torch.distributed for multi-process training, launch with torchrun (nccl on GPUs, gloo on CPU)"},
         {"name": "--task", "type": str, "default": "Humanoid",
             "help": "Can be BallBalance, Cartpole, CartpoleYUp, Ant, Humanoid, Anymal, FrankaCabinet, Quadcopter, ShadowHand, Ingenuity"},
         {"name": "--projtype", "type": str, "default": "None",
@@ -216,14 +222,24 @@ def get_args(benchmark=False):
             "default": "", "help": "Specify reference motion file"},
         {"name": "--play_dataset", "action": "store_true", "default": False,
             "help": "Display the dataset"},
+        {"name": "--scan_motion", "type": str, "default": "",
+            "help": "Scan the loaded motion clips for data anomalies and save a JSON report to this path"},
         {"name": "--init_vel", "action": "store_true", "default": False,
             "help": "Init the object velocity at the first frame"},
+        {"name": "--record_rollout", "type": str, "default": "",
+            "help": "Directory to record the body and ball transforms of a test run to, one .pt file per env for the Blender scripts"},
+        {"name": "--record_envs", "type": str, "default": "0",
+            "help": "Comma separated ids of the envs recorded by --record_rollout"},
         {"name": "--save_images", "action": "store_true", "default": False,
             "help": "Save images for viewer"},
+        {"name": "--frame_writer", "type": str, "default": "viewer",
+            "help": "How saved frames are written: viewer (synchronous viewer dump), png (background PNG writer) or video (background ffmpeg encoding)"},
         # {"name": "--save_images", "type": str, "default": "",
         #     "help": "Save images for viewer"},
         {"name": "--num_envs", "type": int, "default": 0,
             "help": "Number of environments to create - override config file"},
+        {"name": "--num_shards", "type": int, "default": 1,
+            "help": "Split the environments over this many worker processes (CPU simulation only)"},
         {"name": "--episode_length", "type": int, "default": 0,
             "help": "Episode length, by default is read from yaml config"},
         {"name": "--seed", "type": int, "help": "Random seed"},
@@ -245,8 +261,32 @@ def get_args(benchmark=False):
             "help": "Set number of simulation steps per 1 PPO iteration. Supported only by rl_games. If not -1 overrides the config settings."},
         {"name": "--minibatch_size", "type": int, "default": -1,
             "help": "Set batch size for PPO optimization step. Supported only by rl_games. If not -1 overrides the config settings."},
+        {"name": "--step_timing", "action": "store_true", "default": False,
+            "help": "Log the time spent in each phase of the rollout step to tensorboard"},
+        {"name": "--kl_early_stop", "type": float, "default": 0.,
+            "help": "End the PPO update once the approximate KL exceeds this multiple of kl_threshold, 0 disables"},
+        {"name": "--profile_epochs", "type": str, "default": "",
+            "help": "Capture a torch.profiler trace of epochs N,M (or only epoch N) of this run (env steps when testing), e.g. 10,12"},
+        {"name": "--profile_warmup", "type": int, "default": 1,
+            "help": "Number of profiler warmup epochs before the first profiled one"},
+        {"name": "--profile_record_shapes", "action": "store_true", "default": False,
+            "help": "Record operator input shapes in the profiler trace"},
+        {"name": "--profile_with_stack", "action": "store_true", "default": False,
+            "help": "Record Python stacks in the profiler trace"},
+        {"name": "--buffer_dtype", "type": str, "default": "float32",
+            "help": "Storage type of the observations, mus and sigmas in the experience buffer: float32, float16 or bfloat16"},
+        {"name": "--grad_accum_steps", "type": int, "default": 1,
+            "help": "Split each minibatch into this many micro-batches and accumulate their gradients, to fit large minibatches in memory"},
+        {"name": "--async_update", "action": "store_true", "default": False,
+            "help": "Play the next rollout with a frozen copy of the policy while the PPO update of the last one runs"},
+        {"name": "--background_save", "action": "store_true", "default": False,
+            "help": "Write checkpoints from a background thread instead of blocking training"},
+        {"name": "--masked_reset", "action": "store_true", "default": False,
+            "help": "Reset finished envs with a boolean mask instead of index tensors, avoiding a host sync every step"},
         {"name": "--randomize", "action": "store_true", "default": False,
             "help": "Apply physics domain randomization"},
+        {"name": "--vectorized_randomization", "action": "store_true", "default": False,
+            "help": "Apply domain randomization with batched tensor draws instead of per-env gymutil calls"},
         {"name": "--torch_deterministic", "action": "store_true", "default": False,
             "help": "Apply additional PyTorch settings for more deterministic behaviour"},
         {"name": "--output_path", "type": str, "default": "output/", "help": "Specify output directory"},
@@ -0,0 +1,127 @@
+import os
+import queue
+import subprocess
+import threading
+
+
+class FrameWriter():
+    """
+    Writes rendered frames from a background thread.
+
+    put() never blocks the render loop: when the bounded queue is full the frame is dropped and
+    recorded in dropped_frames. Frames are written in the order they were queued, either as
+    PNG files (mode 'png', out_path is a directory) or piped into an ffmpeg subprocess that
+    encodes them straight into a video (mode 'video', out_path is the video file).
+
+    A failed write stops the writing, the frames queued after it are recorded as dropped, and its
+    error is raised by the next put() or close(). close() always closes the ffmpeg subprocess.
+    """
+    def __init__(self, out_path, mode='png', fps=30, max_queue_size=64, file_pattern="rgb_env0_frame%05d.png"):
+        assert(mode in ['png', 'video']), f"Unsupported frame writer mode: {mode}"
+        self.out_path = out_path
+        self.mode = mode
+        self.fps = fps
+        self.file_pattern = file_pattern
+
+        self.num_written = 0
+        self.dropped_frames = []
+        self._encoder = None
+        self._failed = False
+        self._error = None
+        self._closed = False
+        self._queue = queue.Queue(maxsize=max_queue_size)
+
+        if self.mode == 'png':
+            os.makedirs(self.out_path, exist_ok=True)
+        else:
+            out_dir = os.path.dirname(self.out_path)
+            if out_dir != '':
+                os.makedirs(out_dir, exist_ok=True)
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return
+
+    def put(self, frame_id, frame):
+        self._raise_error()
+        try:
+            self._queue.put_nowait((frame_id, frame))
+        except queue.Full:
+            self.dropped_frames.append(frame_id)
+        return
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._queue.put(None)
+            self._thread.join()
+        finally:
+            self._close_encoder()
+
+        print("Frame writer: {:d} frames written to {:s}, {:d} dropped".format(
+            self.num_written, self.out_path, len(self.dropped_frames)))
+        self._raise_error()
+        return
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            frame_id, frame = item
+            if self._failed:
+                self.dropped_frames.append(frame_id)
+                continue
+            try:
+                self._write(frame_id, frame)
+                self.num_written += 1
+            except Exception as e:
+                self._failed = True
+                self._error = e
+                self.dropped_frames.append(frame_id)
+        return
+
+    def _raise_error(self):
+        if self._error is not None:
+            error = self._error
+            self._error = None
+            raise error
+        return
+
+    def _close_encoder(self):
+        if self._encoder is None:
+            return
+        encoder = self._encoder
+        self._encoder = None
+        try:
+            encoder.stdin.close()
+        except BrokenPipeError:
+            # ffmpeg already exited, its exit code is checked below
+            pass
+        returncode = encoder.wait()
+        if returncode != 0 and self._error is None:
+            self._error = RuntimeError("ffmpeg exited with code {:d} while writing {:s}".format(returncode, self.out_path))
+        return
+
+    def _write(self, frame_id, frame):
+        if self.mode == 'png':
+            import imageio
+            imageio.imwrite(os.path.join(self.out_path, self.file_pattern % frame_id), frame)
+        else:
+            if self._encoder is None:
+                self._encoder = self._start_encoder(frame.shape[1], frame.shape[0], frame.shape[2])
+            self._encoder.stdin.write(frame.tobytes())
+        return
+
+    def _start_encoder(self, width, height, channels):
+        pix_fmt = {1: 'gray', 3: 'rgb24', 4: 'rgba'}[channels]
+        cmd = ['ffmpeg', '-y', '-loglevel', 'error',
+               '-f', 'rawvideo', '-pix_fmt', pix_fmt, '-s', '{:d}x{:d}'.format(width, height),
+               '-r', str(self.fps), '-i', '-',
+               '-vcodec', 'libx264', '-pix_fmt', 'yuv420p',
+               # yuv420p needs even dimensions
+               '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2',
+               self.out_path]
+        return subprocess.Popen(cmd, stdin=subprocess.PIPE)
@@ -1,20 +1,73 @@
-from moviepy.editor import ImageSequenceClip
 import os, argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 
-parser = argparse.ArgumentParser()
-parser.add_argument("--image_path",type=str)
-parser.add_argument("--fps",type=int,default=30)
-args = parser.parse_args()
 
-image_folder = args.image_path
+def load_frame(image_file, scale=1.):
+    import numpy as np
+    from PIL import Image
 
-image_files = [os.path.join(image_folder, img) for img in os.listdir(image_folder) if img.endswith(".png")]
+    image = Image.open(image_file).convert("RGB")
+    if scale != 1.:
+        # even sizes keep yuv420p encoding happy
+        width = max(2, int(image.width * scale) // 2 * 2)
+        height = max(2, int(image.height * scale) // 2 * 2)
+        image = image.resize((width, height), Image.BILINEAR)
+    return np.asarray(image)
 
-image_files.sort()
 
-clip = ImageSequenceClip(image_files, fps=args.fps)
+def stream_frames(image_files, load_fn, workers):
+    """
+    Yields load_fn(image_file) for every file in order, loaded by a pool of workers threads.
+    At most 2 * workers loaded frames are in flight, so memory does not grow with the clip length.
+    """
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for image_file in image_files:
+            pending.append(executor.submit(load_fn, image_file))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while len(pending) > 0:
+            yield pending.popleft().result()
 
-data_name = image_folder[len('skillmimic/data/images/'):] #projectname
-os.makedirs("skillmimic/data/videos/", exist_ok=True)
-out_path = 'skillmimic/data/videos/' + data_name + '.mp4' #projectname
-clip.write_videofile(out_path) 
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--image_path",type=str)
+    parser.add_argument("--fps",type=int,default=30)
+    parser.add_argument("--start",type=int,default=0,help="First frame to use")
+    parser.add_argument("--end",type=int,default=None,help="Frame to stop before, all frames by default")
+    parser.add_argument("--scale",type=float,default=1.,help="Downscale factor applied to every frame, e.g. 0.5")
+    parser.add_argument("--stream",action="store_true",default=False,
+                        help="Decode frames with a thread pool and pipe them into the encoder without holding the clip in memory")
+    parser.add_argument("--workers",type=int,default=4,help="Decoding threads used by --stream")
+    args = parser.parse_args()
+
+    image_folder = args.image_path
+
+    image_files = [os.path.join(image_folder, img) for img in os.listdir(image_folder) if img.endswith(".png")]
+
+    image_files.sort()
+    image_files = image_files[args.start:args.end]
+
+    data_name = image_folder[len('skillmimic/data/images/'):] #projectname
+    os.makedirs("skillmimic/data/videos/", exist_ok=True)
+    out_path = 'skillmimic/data/videos/' + data_name + '.mp4' #projectname
+
+    if args.stream:
+        import imageio
+
+        writer = imageio.get_writer(out_path, fps=args.fps, macro_block_size=1)
+        for frame in stream_frames(image_files, partial(load_frame, scale=args.scale), args.workers):
+            writer.append_data(frame)
+        writer.close()
+        print("Wrote {:d} frames to {:s}".format(len(image_files), out_path))
+    else:
+        from moviepy.editor import ImageSequenceClip
+
+        if args.scale != 1.:
+            clip = ImageSequenceClip([load_frame(f, args.scale) for f in image_files], fps=args.fps)
+        else:
+            clip = ImageSequenceClip(image_files, fps=args.fps)
+        clip.write_videofile(out_path)
@@ -5,6 +5,7 @@ import numpy as np
 import torch.nn.functional as F
 import re
 from utils import torch_utils
+from utils import motion_scan
 
 class MotionDataHandler:
     def __init__(self, motion_file, device, key_body_ids, cfg, num_envs, max_episode_length, reward_weights_default, 
@@ -20,6 +21,7 @@ class MotionDataHandler:
         self.hoi_data_label_batch = None
         self.motion_lengths = None
         self.load_motion(motion_file)
+        self._motion_tensors = None
 
         self.num_envs = num_envs
         self.envid2motid = torch.zeros(self.num_envs, device=self.device, dtype=torch.long)
@@ -49,6 +51,7 @@ class MotionDataHandler:
         self.root_target = torch.zeros((len(all_seqs), 3), device=self.device, dtype=torch.float)
 
         all_seqs.sort(key=self._sort_key)
+        self.motion_files = all_seqs
         for i, seq_path in enumerate(all_seqs):
             loaded_dict = self._process_sequence(seq_path)
             self.hoi_data_dict[i] = loaded_dict
@@ -137,6 +140,9 @@ class MotionDataHandler:
 
         return quat_seq
 
+    def scan_anomalies(self, **kwargs):
+        return motion_scan.scan_motion_data(self, **kwargs)
+
     def _compute_motion_weights(self, motion_class):
         unique_classes, counts = np.unique(motion_class, return_counts=True)
         class_to_index = {k: v for v, k in enumerate(unique_classes)}
@@ -168,6 +174,29 @@ class MotionDataHandler:
             motion_times = torch.ones((1), device=self.device, dtype=torch.int32)
         return motion_times
 
+    def sample_motions_on_device(self, n):
+        self._build_motion_tensors()
+        motion_ids = torch.multinomial(self._motion_weights_tensor, num_samples=n, replacement=True)
+        return motion_ids
+
+    def sample_time_on_device(self, motion_ids, truncate_time=None):
+        # same distribution as sample_time, drawn without leaving the device
+        lengths = self.motion_lengths[motion_ids]
+
+        start = 2
+        end = lengths - 2
+
+        motion_times = start + (torch.rand(lengths.shape, device=self.device) * (end - start + 1)).long()
+        motion_times = torch.min(motion_times, end).int()
+
+        if truncate_time is not None:
+            assert truncate_time >= 0
+            motion_times = torch.min(motion_times, self.motion_lengths[motion_ids] - truncate_time)
+
+        if self.play_dataset:
+            motion_times = torch.ones_like(motion_times)
+        return motion_times
+
 
     def get_initial_state(self, env_ids, motion_ids, start_frames):
         """
@@ -241,6 +270,84 @@ class MotionDataHandler:
                 root_pos, root_rot, root_vel, root_ang_vel, dof_pos, dof_vel, \
                 obj_pos, obj_pos_vel, obj_rot, obj_rot_vel
                 
+    def get_initial_state_masked(self, reset_mask, motion_ids, start_frames):
+        """
+        Get the initial state of every environment, without per-env host round trips.
+
+        The per-env bookkeeping (motion ids, episode lengths, reward weights) is only updated
+        where reset_mask is set; the returned state holds a sample for every environment.
+
+        Parameters:
+        reset_mask (Tensor): A boolean tensor marking the environments being reset.
+        motion_ids (Tensor): A tensor containing the motion id for each environment.
+        start_frames (Tensor): A tensor containing the starting frame number for each environment.
+
+        Returns:
+        Tuple: A tuple containing the initial state, in the order of get_initial_state
+        """
+        self._build_motion_tensors()
+        motion_ids = motion_ids.to(self.device)
+        start_frames = start_frames.long()
+
+        lengths = self.motion_lengths[motion_ids]
+        valid_lengths = lengths - start_frames if not self.play_dataset else lengths
+        episode_lengths = torch.where(valid_lengths < self.max_episode_length,
+                                      valid_lengths, self.max_episode_length)
+
+        self.envid2motid[:] = torch.where(reset_mask, motion_ids, self.envid2motid)
+        self.envid2episode_lengths[:] = torch.where(reset_mask, episode_lengths, self.envid2episode_lengths)
+        for k in self.reward_weights_default:
+            self.reward_weights[k][:] = torch.where(reset_mask, self._motion_reward_weights[k][motion_ids], self.reward_weights[k])
+
+        # the padded reference window of get_initial_state, gathered for every env at once
+        frames = start_frames.unsqueeze(-1) + self._episode_frames.unsqueeze(0)
+        valid_frames = (self._episode_frames.unsqueeze(0) < episode_lengths.unsqueeze(-1)) & (frames < lengths.unsqueeze(-1))
+        frames = torch.clamp(frames, max=self._motion_tensors['hoi_data'].shape[1] - 1)
+        hoi_data = self._motion_tensors['hoi_data'][motion_ids.unsqueeze(-1), frames]
+        hoi_data = torch.where(valid_frames.unsqueeze(-1), hoi_data, torch.zeros_like(hoi_data))
+
+        state = {k: self._motion_tensors[k][motion_ids, start_frames] for k in
+                 ['root_pos', 'root_rot', 'root_pos_vel', 'root_rot_vel', 'dof_pos', 'dof_pos_vel',
+                  'obj_pos', 'obj_pos_vel', 'obj_rot', 'obj_rot_vel']}
+
+        # the special case draws a random object state, see _get_special_case_initial_state
+        special_case = self._motion_special_case[motion_ids].unsqueeze(-1)
+        num_envs = motion_ids.shape[0]
+        state['obj_pos'] = torch.where(special_case, torch.rand((num_envs, 3), device=self.device) * 10 - 5, state['obj_pos'])
+        state['obj_pos_vel'] = torch.where(special_case, torch.rand((num_envs, 3), device=self.device) * 5, state['obj_pos_vel'])
+        state['obj_rot'] = torch.where(special_case, torch.rand((num_envs, 4), device=self.device), state['obj_rot'])
+        state['obj_rot_vel'] = torch.where(special_case, torch.rand_like(state['obj_rot_vel']) * 0.1, state['obj_rot_vel'])
+
+        return hoi_data, \
+                state['root_pos'], state['root_rot'], state['root_pos_vel'], state['root_rot_vel'], state['dof_pos'], state['dof_pos_vel'], \
+                state['obj_pos'], state['obj_pos_vel'], state['obj_rot'], state['obj_rot_vel']
+
+    def _build_motion_tensors(self):
+        # all motions padded to the longest one, built on first use of the masked reset path
+        if self._motion_tensors is not None:
+            return
+
+        max_length = int(self.motion_lengths.max())
+        self._motion_tensors = {}
+        for k in ['hoi_data', 'root_pos', 'root_rot', 'root_pos_vel', 'root_rot_vel', 'dof_pos', 'dof_pos_vel',
+                  'obj_pos', 'obj_pos_vel', 'obj_rot', 'obj_rot_vel']:
+            self._motion_tensors[k] = torch.stack([
+                F.pad(self.hoi_data_dict[i][k], (0, 0, 0, max_length - self.hoi_data_dict[i][k].shape[0]))
+                for i in range(self.num_motions)
+            ], dim=0)
+
+        special_case = [self.hoi_data_dict[i]['hoi_data_text'] == '000' for i in range(self.num_motions)]
+        self._motion_special_case = torch.tensor(special_case, device=self.device, dtype=torch.bool)
+
+        reward_weights = [self._get_special_case_reward_weights() if special else self._get_general_case_reward_weights()
+                          for special in special_case]
+        self._motion_reward_weights = {k: torch.tensor([w[k] for w in reward_weights], device=self.device, dtype=torch.float)
+                                       for k in self.reward_weights_default}
+
+        self._motion_weights_tensor = torch.tensor(self._motion_weights, device=self.device, dtype=torch.float)
+        self._episode_frames = torch.arange(int(self.max_episode_length), device=self.device, dtype=torch.long)
+        return
+
 
     def _get_special_case_initial_state(self, motion_id, start_frame, episode_length):
         hoi_data = F.pad(
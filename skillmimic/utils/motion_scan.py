@@ -0,0 +1,119 @@
+import os
+import json
+import torch
+from torch.nn.utils.rnn import pad_sequence
+
+ANG_VEL_THRESHOLD = 5. # same threshold as the abnormal check in play_dataset_step
+BALL_RADIUS = 0.12 # sphere radius in ball.urdf
+PENETRATION_TOLERANCE = 0.02
+FLICKER_FRAMES = 3
+
+ANOMALY_TYPES = ['nan', 'angular_velocity_spike', 'quat_sign_flip', 'obj_floor_penetration', 'contact_flicker']
+
+
+def scan_motion_data(motion_data, ang_vel_threshold=ANG_VEL_THRESHOLD, min_obj_height=None, flicker_frames=FLICKER_FRAMES):
+    """
+    Scan every clip loaded by a MotionDataHandler for data anomalies.
+
+    All clips are padded into a single [num_clips, max_frames, ...] batch so each check
+    is one tensor op over the whole library. Only the final per-frame listing leaves torch.
+
+    Returns:
+    dict: A JSON-serializable report with the flagged frames of every clip.
+    """
+    num_clips = motion_data.num_motions
+    if min_obj_height is None:
+        ball_size = motion_data.cfg["env"].get("ballSize", 1.)
+        min_obj_height = BALL_RADIUS * ball_size - PENETRATION_TOLERANCE
+
+    clips = [motion_data.hoi_data_dict[i] for i in range(num_clips)]
+    lengths = motion_data.motion_lengths.cpu()
+    max_len = int(lengths.max())
+    valid = torch.arange(max_len).unsqueeze(0) < lengths.unsqueeze(-1) # [num_clips, max_frames]
+
+    hoi_data = pad_sequence([c['hoi_data'].cpu() for c in clips], batch_first=True)
+    root_rot = pad_sequence([c['root_rot'].cpu() for c in clips], batch_first=True)
+    # root_rot_vel is built from frame differences and has one row less than the clip,
+    # the missing last frame is padded with zeros
+    root_rot_vel = pad_sequence([_pad_frames(c['root_rot_vel'].cpu(), int(n)) for c, n in zip(clips, lengths)], batch_first=True)
+    obj_pos = pad_sequence([c['obj_pos'].cpu() for c in clips], batch_first=True)
+    contact = pad_sequence([c['contact'].cpu() for c in clips], batch_first=True)[..., 0]
+
+    # clips labeled '000' have no ball, so object checks do not apply to them
+    has_obj = torch.tensor([c['hoi_data_text'] != '000' for c in clips]).unsqueeze(-1)
+
+    nan = ~torch.isfinite(hoi_data).all(dim=-1) & valid
+
+    ang_vel = torch.norm(root_rot_vel, dim=-1)
+    ang_vel_spike = (ang_vel > ang_vel_threshold) & valid
+
+    # consecutive quats should stay in the same hemisphere after smooth_quat_seq
+    quat_dot = torch.sum(root_rot[:, 1:] * root_rot[:, :-1], dim=-1)
+    quat_flip = torch.zeros_like(valid)
+    quat_flip[:, 1:] = (quat_dot < 0) & valid[:, 1:]
+
+    penetration = (obj_pos[..., 2] < min_obj_height) & valid & has_obj
+
+    # a label change that is undone within flicker_frames frames
+    toggles = (contact[:, 1:] != contact[:, :-1]) & valid[:, 1:]
+    toggle_count = torch.nn.functional.pad(torch.cumsum(toggles.int(), dim=1), (1, 0))
+    window_end = torch.clamp(torch.arange(max_len - 1) + flicker_frames + 1, max=max_len - 1)
+    later_toggles = toggle_count[:, window_end] - toggle_count[:, 1:]
+    contact_flicker = torch.zeros_like(valid)
+    contact_flicker[:, 1:] = toggles & (later_toggles > 0) & has_obj
+
+    flags = torch.stack([nan, ang_vel_spike, quat_flip, penetration, contact_flicker], dim=0)
+    counts = flags.sum(dim=-1).T # [num_clips, num_anomaly_types]
+    flagged = torch.nonzero(flags, as_tuple=False).tolist()
+
+    # frames with non-finite data are reported as 'nan', the max is taken over the finite ones
+    finite_ang_vel = torch.where(torch.isfinite(ang_vel) & valid, ang_vel, torch.full_like(ang_vel, -float('inf')))
+    max_ang_vel = finite_ang_vel.max(dim=-1)[0].tolist()
+
+    names = getattr(motion_data, 'motion_files', [str(i) for i in range(num_clips)])
+    clip_reports = []
+    for i in range(num_clips):
+        clip_report = {
+            'file': os.path.basename(names[i]),
+            'num_frames': int(lengths[i]),
+            'max_ang_vel': max_ang_vel[i] if max_ang_vel[i] != -float('inf') else None,
+        }
+        for k, anomaly in enumerate(ANOMALY_TYPES):
+            clip_report[anomaly] = []
+        clip_reports.append(clip_report)
+
+    for k, clip_id, frame in flagged:
+        clip_reports[clip_id][ANOMALY_TYPES[k]].append(frame)
+
+    counts = counts.tolist()
+    for clip_report, clip_counts in zip(clip_reports, counts):
+        clip_report['clean'] = sum(clip_counts) == 0
+
+    report = {
+        'skill': motion_data.skill_name,
+        'num_clips': num_clips,
+        'num_flagged_clips': sum(not c['clean'] for c in clip_reports),
+        'thresholds': {
+            'ang_vel': ang_vel_threshold,
+            'min_obj_height': min_obj_height,
+            'flicker_frames': flicker_frames,
+        },
+        'clips': clip_reports,
+    }
+    return report
+
+
+def _pad_frames(data, num_frames):
+    return torch.nn.functional.pad(data, (0, 0, 0, num_frames - data.shape[0]))
+
+
+def save_report(report, report_file):
+    report_dir = os.path.dirname(report_file)
+    if report_dir != '':
+        os.makedirs(report_dir, exist_ok=True)
+    with open(report_file, 'w') as f:
+        json.dump(report, f, indent=2, allow_nan=False)
+
+    print("Motion scan: {:d}/{:d} clips flagged, report saved to {:s}".format(
+        report['num_flagged_clips'], report['num_clips'], report_file))
+    return
@@ -27,14 +27,18 @@
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 from env.tasks.vec_task_wrappers import VecTaskPythonWrapper
+from env.tasks.vec_task_sharded import VecTaskPythonSharded
 from env.tasks.skillmimic import SkillMimicBallPlay
 from env.tasks.hrl_circling import HRLCircling
 from env.tasks.hrl_heading_easy import HRLHeadingEasy
 from env.tasks.hrl_throwing import HRLThrowing
 from env.tasks.hrl_scoring_layup import HRLScoringLayup
 
+from isaacgym import gymapi
 from isaacgym import rlgpu
 
+import copy
+import functools
 import json
 import numpy as np
 
@@ -67,3 +71,34 @@ def parse_task(args, cfg, cfg_train, sim_params):
     env = VecTaskPythonWrapper(task, rl_device, cfg_train.get("clip_observations", np.inf), cfg_train.get("clip_actions", 1.0))
 
     return task, env
+
+
+def make_shard_env(shard_id, args, cfg, cfg_train, shard_sizes):
+    # runs in a worker process of VecTaskPythonSharded, sim_params are rebuilt there
+    from utils.config import parse_sim_params
+
+    args = copy.copy(args)
+    args.physics_engine = gymapi.SIM_PHYSX if args.physics_engine == 'physx' else gymapi.SIM_FLEX
+    cfg = copy.deepcopy(cfg)
+    cfg_train = copy.deepcopy(cfg_train)
+    cfg["env"]["numEnvs"] = shard_sizes[shard_id]
+    seed = cfg_train.get("seed", -1)
+    if seed != -1:
+        cfg_train["seed"] = seed + shard_id
+
+    sim_params = parse_sim_params(args, cfg, cfg_train)
+    task, env = parse_task(args, cfg, cfg_train, sim_params)
+    return env
+
+def parse_sharded_task(args, cfg, cfg_train):
+    assert(args.device == 'cpu'), "Sharded envs are meant for CPU simulation"
+
+    num_envs = cfg["env"]["numEnvs"]
+    shard_sizes = [len(shard) for shard in np.array_split(np.arange(num_envs), args.num_shards)]
+    # the gymapi enum does not pickle, workers get it back by name
+    shard_args = copy.copy(args)
+    shard_args.physics_engine = 'physx' if args.physics_engine == gymapi.SIM_PHYSX else 'flex'
+    make_env_fn = functools.partial(make_shard_env, args=shard_args, cfg=cfg, cfg_train=cfg_train, shard_sizes=shard_sizes)
+    env = VecTaskPythonSharded(make_env_fn, args.num_shards, args.rl_device)
+
+    return env.task, env
@@ -0,0 +1,94 @@
+import os
+import shutil
+import socket
+import time
+
+import torch
+
+
+class EpochProfiler():
+    """
+    Captures epochs first..last (1-based, counted from the start of this run) of a training run,
+    or steps first..last of a player run, with torch.profiler.
+
+    step() is called once per epoch or step. Up to `warmup` steps before `first` are profiled
+    but discarded. When `last` is reached, the trace is exported once as the Chrome trace
+    trace_{first}-{last}.json, which chrome://tracing and Perfetto can open, and copied under the
+    name the tensorboard profiler plugin looks for ({worker}.{time}.pt.trace.json).
+    """
+    def __init__(self, out_dir, first, last, warmup=1, record_shapes=False, with_stack=False):
+        assert(1 <= first <= last), "Invalid profile range: {:d}..{:d}".format(first, last)
+        self.out_dir = out_dir
+        self.first = first
+        self.last = last
+        self._num_steps = 0
+
+        warmup = min(warmup, first - 1)
+        activities = [torch.profiler.ProfilerActivity.CPU]
+        if torch.cuda.is_available():
+            activities.append(torch.profiler.ProfilerActivity.CUDA)
+
+        os.makedirs(self.out_dir, exist_ok=True)
+        self._profiler = torch.profiler.profile(
+            activities=activities,
+            schedule=torch.profiler.schedule(wait=first - 1 - warmup, warmup=warmup, active=last - first + 1, repeat=1),
+            on_trace_ready=self._on_trace_ready,
+            record_shapes=record_shapes,
+            with_stack=with_stack)
+        self._profiler.start()
+        return
+
+    def step(self):
+        if self._profiler is None:
+            return
+        self._profiler.step()
+        self._num_steps += 1
+        if self._num_steps >= self.last:
+            self.close()
+        return
+
+    def close(self):
+        if self._profiler is None:
+            return
+        self._profiler.stop()
+        self._profiler = None
+        return
+
+    def _on_trace_ready(self, prof):
+        # a profile can only be exported once, so the tensorboard file is a copy of the chrome trace
+        chrome_trace = os.path.join(self.out_dir, "trace_{:d}-{:d}.json".format(self.first, self.last))
+        prof.export_chrome_trace(chrome_trace)
+        tb_trace = "{:s}_{:d}.{:d}.pt.trace.json".format(socket.gethostname(), os.getpid(), time.time_ns())
+        shutil.copyfile(chrome_trace, os.path.join(self.out_dir, tb_trace))
+        print("Profiler: trace of {:d}..{:d} written to {:s}".format(self.first, self.last, self.out_dir))
+        return
+
+
+def parse_profile_range(profile_range):
+    """
+    (first, last) from 'N', 'N,M', N or [N, M]; a single epoch N is profiled as N..N.
+    """
+    if isinstance(profile_range, str):
+        profile_range = [r for r in profile_range.split(',') if r.strip() != '']
+    elif not isinstance(profile_range, (list, tuple)):
+        profile_range = [profile_range]
+    try:
+        profile_range = [int(r) for r in profile_range]
+    except ValueError:
+        profile_range = []
+    if len(profile_range) == 1:
+        profile_range = profile_range * 2
+    if len(profile_range) != 2 or not (1 <= profile_range[0] <= profile_range[1]):
+        raise ValueError("Invalid profile range, expected N or N,M with 1 <= N <= M")
+    return tuple(profile_range)
+
+
+def build_profiler(config, out_dir):
+    profile_range = config.get('profile_epochs', None)
+    if profile_range is None:
+        return None
+    first, last = parse_profile_range(profile_range)
+    return EpochProfiler(config.get('profile_dir', out_dir), first, last,
+                         warmup=config.get('profile_warmup', 1),
+                         record_shapes=config.get('profile_record_shapes', False),
+                         with_stack=config.get('profile_with_stack', False))
@@ -0,0 +1,82 @@
+import math
+import operator
+
+import torch
+
+
+def schedule_scaling(params, last_step):
+    sched_type = params.get("schedule", None)
+    if sched_type == 'linear':
+        sched_step = params["schedule_steps"]
+        return 1.0 / sched_step * min(last_step, sched_step)
+    elif sched_type == 'constant':
+        return 0 if last_step < params["schedule_steps"] else 1
+    return 1
+
+
+def scheduled_range(params, last_step, range_key="range"):
+    """
+    Distribution range after applying the randomization schedule, following isaacgym.gymutil:
+    an additive randomization is scaled towards 0 and a scaling randomization towards 1.
+    For a gaussian the range is (mu, std).
+    """
+    lo, hi = params.get(range_key, [0., 0.])
+    sched_scaling = schedule_scaling(params, last_step)
+
+    if params["operation"] == 'additive':
+        return lo * sched_scaling, hi * sched_scaling
+
+    if params["distribution"] == 'gaussian':
+        return lo * sched_scaling + 1.0 * (1.0 - sched_scaling), hi * sched_scaling
+    return lo * sched_scaling + 1.0 * (1.0 - sched_scaling), hi * sched_scaling + 1.0 * (1.0 - sched_scaling)
+
+
+def sample(distribution, dist_range, shape, device="cpu", dtype=torch.float, generator=None):
+    """
+    One batched draw of shape samples from a gaussian, uniform or loguniform distribution.
+    """
+    a, b = dist_range
+    if distribution == 'gaussian':
+        return torch.randn(shape, device=device, dtype=dtype, generator=generator) * b + a
+    elif distribution == 'uniform':
+        return torch.rand(shape, device=device, dtype=dtype, generator=generator) * (b - a) + a
+    elif distribution == 'loguniform':
+        log_a, log_b = math.log(a), math.log(b)
+        return torch.exp(torch.rand(shape, device=device, dtype=dtype, generator=generator) * (log_b - log_a) + log_a)
+    else:
+        raise ValueError("Unsupported randomization distribution: {:s}".format(distribution))
+
+
+def scale_correlated(distribution, dist_range, corr):
+    """
+    The correlated noise part from a standard normal draw corr, as apply_randomizations computes it:
+    corr * var + mu for a gaussian range (mu, var) and corr * (hi - lo) + lo for a uniform range (lo, hi).
+    """
+    a, b = dist_range
+    if distribution == 'gaussian':
+        return corr * b + a
+    elif distribution == 'uniform':
+        return corr * (b - a) + a
+    else:
+        raise ValueError("Unsupported noise distribution: {:s}".format(distribution))
+
+
+def get_operator(params):
+    return operator.add if params["operation"] == 'additive' else operator.mul
+
+
+def sample_params(params, original, num_envs, last_step, generator=None):
+    """
+    Randomized values of one property attribute for every env.
+
+    Args:
+    params (dict): The dr_params entry of the attribute.
+    original (Tensor): Unrandomized values, [num_values].
+
+    Returns:
+    Tensor: [num_envs, num_values] randomized values.
+    """
+    dist_range = scheduled_range(params, last_step)
+    samples = sample(params["distribution"], dist_range, (num_envs, original.shape[0]),
+                     device=original.device, dtype=original.dtype, generator=generator)
+    return get_operator(params)(original.unsqueeze(0), samples)
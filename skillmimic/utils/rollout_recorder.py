@@ -0,0 +1,104 @@
+import os
+import queue
+import threading
+
+import torch
+
+
+class RolloutRecorder():
+    """
+    Records the body and ball transforms of selected envs for offline rendering.
+
+    Steps are written into device buffers of chunk_size steps; a full chunk is copied to host
+    without blocking and collected by a background thread. close() writes one file per env,
+    env{id}.pt, holding the dict read by blender_for_SkillMimic/motionseq2mesh.py:
+    dofpos [T, num_bodies, 3], dofrot [T, num_bodies, 4] (xyzw), ballpos [T, 3], ballrot [T, 4] (xyzw).
+    """
+    def __init__(self, out_dir, env_ids, num_bodies, device, chunk_size=256):
+        self.out_dir = out_dir
+        self.env_ids = torch.tensor(env_ids, device=device, dtype=torch.long)
+        self.device = device
+        self.chunk_size = chunk_size
+        self._pin_memory = torch.cuda.is_available() and str(device).startswith('cuda')
+
+        num_envs = len(env_ids)
+        self._buffers = {
+            'dofpos': torch.zeros((chunk_size, num_envs, num_bodies, 3), device=device, dtype=torch.float),
+            'dofrot': torch.zeros((chunk_size, num_envs, num_bodies, 4), device=device, dtype=torch.float),
+            'ballpos': torch.zeros((chunk_size, num_envs, 3), device=device, dtype=torch.float),
+            'ballrot': torch.zeros((chunk_size, num_envs, 4), device=device, dtype=torch.float),
+        }
+        self._step = 0
+        self._chunks = {k: [] for k in self._buffers}
+
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return
+
+    def record(self, body_pos, body_rot, ball_pos, ball_rot):
+        self._buffers['dofpos'][self._step] = body_pos[self.env_ids]
+        self._buffers['dofrot'][self._step] = body_rot[self.env_ids]
+        self._buffers['ballpos'][self._step] = ball_pos[self.env_ids]
+        self._buffers['ballrot'][self._step] = ball_rot[self.env_ids]
+        self._step += 1
+        if self._step == self.chunk_size:
+            self._flush()
+        return
+
+    def record_task(self, task):
+        self.record(task._rigid_body_pos, task._rigid_body_rot, task._target_states[..., 0:3], task._target_states[..., 3:7])
+        return
+
+    def close(self):
+        if not self._thread.is_alive():
+            return
+        self._flush()
+        self._queue.put(None)
+        self._thread.join()
+
+        os.makedirs(self.out_dir, exist_ok=True)
+        for i, env_id in enumerate(self.env_ids.tolist()):
+            motion = {k: torch.cat([chunk[:, i] for chunk in chunks], dim=0) for k, chunks in self._chunks.items()}
+            torch.save(motion, os.path.join(self.out_dir, "env{:d}.pt".format(env_id)))
+
+        print("Rollout recorder: {:d} steps of {:d} envs written to {:s}".format(
+            sum(chunk.shape[0] for chunk in self._chunks['dofpos']), len(self.env_ids), self.out_dir))
+        return
+
+    def _flush(self):
+        if self._step == 0:
+            return
+        # the copies are queued on the current stream ahead of any later writes to the device buffers
+        host_chunk = {}
+        for k, buffer in self._buffers.items():
+            host_chunk[k] = torch.empty(buffer[:self._step].shape, dtype=buffer.dtype, pin_memory=self._pin_memory)
+            host_chunk[k].copy_(buffer[:self._step], non_blocking=self._pin_memory)
+        event = None
+        if self._pin_memory:
+            event = torch.cuda.Event()
+            event.record()
+        self._queue.put((event, host_chunk))
+        self._step = 0
+        return
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            event, host_chunk = item
+            if event is not None:
+                event.synchronize()
+            for k, chunk in host_chunk.items():
+                self._chunks[k].append(chunk)
+        return
+
+
+def build_rollout_recorder(config, task):
+    out_dir = config.get('record_rollout', '')
+    if out_dir == '':
+        return None
+    env_ids = config.get('record_envs', [0])
+    return RolloutRecorder(out_dir, env_ids, task.num_bodies, task.device,
+                           chunk_size=config.get('record_chunk_size', 256))
@@ -0,0 +1,59 @@
+import time
+
+import torch
+
+
+class BatchedScalarWriter():
+    """
+    Wraps a SummaryWriter and defers add_scalar until flush_scalars().
+
+    Scalars may be given as device tensors. flush_scalars() stacks all pending tensor values and
+    copies them to host with one transfer per device, then writes every scalar in the order it was
+    added, so logging an epoch costs one device sync instead of one per scalar. All other writer
+    methods are forwarded unchanged.
+    """
+    def __init__(self, writer):
+        self.writer = writer
+        self._pending = []
+        return
+
+    def add_scalar(self, tag, scalar_value, global_step=None, walltime=None):
+        if walltime is None:
+            walltime = time.time()
+        if torch.is_tensor(scalar_value):
+            scalar_value = scalar_value.detach().reshape(())
+        self._pending.append((tag, scalar_value, global_step, walltime))
+        return
+
+    def flush_scalars(self):
+        if len(self._pending) == 0:
+            return
+
+        device_values = {}
+        for _, value, _, _ in self._pending:
+            if torch.is_tensor(value):
+                device_values.setdefault(value.device, []).append(value)
+        host_values = {device: iter(torch.stack([v.float() for v in values]).cpu().tolist())
+                       for device, values in device_values.items()}
+
+        for tag, value, global_step, walltime in self._pending:
+            if torch.is_tensor(value):
+                value = next(host_values[value.device])
+            self.writer.add_scalar(tag, value, global_step, walltime=walltime)
+        self._pending = []
+        return
+
+    def flush(self):
+        self.flush_scalars()
+        self.writer.flush()
+        return
+
+    def close(self):
+        self.flush_scalars()
+        self.writer.close()
+        return
+
+    def __getattr__(self, name):
+        if name == 'writer':
+            raise AttributeError(name)
+        return getattr(self.writer, name)
@@ -0,0 +1,58 @@
+import time
+from contextlib import contextmanager, nullcontext
+
+import torch
+
+
+class StepTimer():
+    """
+    Accumulates the time spent in named phases of the rollout loop.
+
+    On a CUDA device each phase records a pair of CUDA events, which does not block the host;
+    the events are resolved once per epoch in summary(). Otherwise phases are timed with
+    time.perf_counter. Phases may nest, e.g. the env phases run inside the agent's env_step.
+    The events only time work on the current torch stream, GPU work queued elsewhere (PhysX) is
+    attributed to the phase that waits for it.
+    """
+    def __init__(self, device):
+        self.use_cuda_events = torch.cuda.is_available() and str(device).startswith('cuda')
+        self.reset()
+        return
+
+    def reset(self):
+        self._events = {}
+        self._totals = {}
+        return
+
+    @contextmanager
+    def phase(self, name):
+        if self.use_cuda_events:
+            start = torch.cuda.Event(enable_timing=True)
+            end = torch.cuda.Event(enable_timing=True)
+            start.record()
+            yield
+            end.record()
+            self._events.setdefault(name, []).append((start, end))
+        else:
+            start = time.perf_counter()
+            yield
+            self._totals[name] = self._totals.get(name, 0.) + (time.perf_counter() - start) * 1000.
+
+    def summary(self):
+        """
+        Returns the total milliseconds per phase since the last call and starts a new period.
+        """
+        if len(self._events) > 0:
+            torch.cuda.synchronize()
+        for name, events in self._events.items():
+            self._totals[name] = self._totals.get(name, 0.) + sum(start.elapsed_time(end) for start, end in events)
+
+        totals = self._totals
+        self.reset()
+        return totals
+
+
+def time_phase(timer, name):
+    if timer is None:
+        return nullcontext()
+    return timer.phase(name)
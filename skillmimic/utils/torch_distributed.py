@@ -0,0 +1,139 @@
+import os
+from contextlib import contextmanager
+
+import torch
+import torch.distributed as dist
+
+
+class _DistributedOptimizer():
+    """
+    Mixed in before the optimizer class by distributed_optimizer(). Follows the interface of
+    horovod's DistributedOptimizer so the agents' calc_gradients works with either:
+    step() averages the gradients over all ranks first, unless synchronize() was already called
+    for this step, e.g. to clip the averaged gradients inside skip_synchronize().
+    """
+    def __init__(self, params, world_size):
+        super().__init__(params)
+        self._world_size = world_size
+        self._should_synchronize = True
+        self._synchronized = False
+        return
+
+    def synchronize(self):
+        if self._synchronized:
+            return
+        params = [p for group in self.param_groups for p in group['params'] if p.requires_grad]
+        for p in params:
+            if p.grad is None:
+                # every rank has to contribute the same flat buffer
+                p.grad = torch.zeros_like(p)
+
+        # a single all-reduce over all gradients instead of one per parameter
+        flat_grads = torch.cat([p.grad.reshape(-1) for p in params])
+        dist.all_reduce(flat_grads)
+        flat_grads /= self._world_size
+        offset = 0
+        for p in params:
+            numel = p.grad.numel()
+            p.grad.copy_(flat_grads[offset:offset + numel].view_as(p.grad))
+            offset += numel
+
+        self._synchronized = True
+        return
+
+    @contextmanager
+    def skip_synchronize(self):
+        self._should_synchronize = False
+        try:
+            yield
+        finally:
+            self._should_synchronize = True
+
+    def step(self, closure=None):
+        if self._should_synchronize:
+            self.synchronize()
+        self._synchronized = False
+        return super().step(closure)
+
+
+def distributed_optimizer(optimizer, world_size):
+    cls = type(optimizer.__class__.__name__, (_DistributedOptimizer, optimizer.__class__), {})
+    dist_optimizer = cls(optimizer.param_groups, world_size)
+    dist_optimizer.load_state_dict(optimizer.state_dict())
+    return dist_optimizer
+
+
+def _stats_tensors(stats):
+    if torch.is_tensor(stats):
+        return [stats]
+    elif isinstance(stats, dict):
+        return [t for v in stats.values() for t in _stats_tensors(v)]
+    return []
+
+
+class TorchDistributedWrapper():
+    """
+    torch.distributed counterpart of rl_games' HorovodWrapper, used by the agents in place of
+    self.hvd. The process group is set up from the environment variables of torchrun
+    (RANK, WORLD_SIZE, LOCAL_RANK, MASTER_ADDR, MASTER_PORT), with nccl on GPUs and gloo on CPU.
+    """
+    def __init__(self, backend=None):
+        use_cuda = torch.cuda.is_available()
+        if backend is None:
+            backend = 'nccl' if use_cuda else 'gloo'
+        if not dist.is_initialized():
+            dist.init_process_group(backend, init_method='env://')
+
+        self.rank = dist.get_rank()
+        self.rank_size = dist.get_world_size()
+        self.local_rank = int(os.environ.get('LOCAL_RANK', self.rank))
+        self.device_name = 'cuda:' + str(self.local_rank) if use_cuda and backend == 'nccl' else 'cpu'
+        print('Starting torch.distributed ({:s}) with rank: {:d}, size: {:d}'.format(backend, self.rank, self.rank_size))
+        return
+
+    def update_algo_config(self, config):
+        config['device'] = self.device_name
+        if self.rank != 0:
+            config['print_stats'] = False
+            config['lr_schedule'] = None
+        return config
+
+    def setup_algo(self, algo):
+        for v in algo.model.state_dict().values():
+            self.broadcast_value(v, 'model')
+        algo.optimizer = distributed_optimizer(algo.optimizer, self.rank_size)
+        for v in _stats_tensors(algo.optimizer.state_dict()['state']):
+            self.broadcast_value(v, 'optimizer')
+
+        self.sync_stats(algo)
+
+        assert(not algo.has_central_value), "The central value net is not supported with torch.distributed"
+        return
+
+    def sync_stats(self, algo):
+        for v in _stats_tensors(algo.get_stats_weights()):
+            if torch.is_floating_point(v):
+                dist.all_reduce(v)
+                v /= self.rank_size
+
+        curr_frames = torch.tensor(algo.curr_frames, device=self.device_name)
+        dist.all_reduce(curr_frames)
+        algo.curr_frames = curr_frames.item()
+        return
+
+    def broadcast_value(self, val, name):
+        # update_lr broadcasts a CPU tensor, which nccl cannot
+        buffer = val.to(self.device_name)
+        dist.broadcast(buffer, src=0)
+        if buffer is not val:
+            val.copy_(buffer)
+        return
+
+    def is_root(self):
+        return self.rank == 0
+
+    def average_value(self, val, name):
+        avg_tensor = val.detach().clone()
+        dist.all_reduce(avg_tensor)
+        avg_tensor /= self.rank_size
+        return avg_tensor
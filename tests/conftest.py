@@ -0,0 +1,120 @@
+import os
+import sys
+
+import pytest
+
+# the code under skillmimic/ imports its packages top-level (utils, learning, env), as run.py does
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'skillmimic'))
+
+try:
+    import isaacgym
+except ImportError:
+    import fake_isaacgym
+    fake_isaacgym.install()
+
+TOY_OBS = 6
+TOY_ACTIONS = 3
+
+
+def _toy_network():
+    from rl_games.algos_torch import model_builder
+
+    params = {
+        'model': {'name': 'continuous_a2c_logstd'},
+        'network': {
+            'name': 'actor_critic',
+            'separate': False,
+            'space': {'continuous': {'mu_activation': 'None', 'sigma_activation': 'None',
+                                     'mu_init': {'name': 'default'},
+                                     'sigma_init': {'name': 'const_initializer', 'val': -1.},
+                                     'fixed_sigma': True}},
+            'mlp': {'units': [16, 16], 'activation': 'elu', 'initializer': {'name': 'default'}},
+        },
+    }
+    return model_builder.ModelBuilder().load(params)
+
+
+@pytest.fixture
+def make_toy_agent():
+    """Builds a CPU CommonAgent around a small rl_games MLP without an env, for the learner code paths."""
+    import torch
+    from rl_games.algos_torch.running_mean_std import RunningMeanStd
+    from rl_games.common import schedulers
+    from rl_games.common.algo_observer import DefaultAlgoObserver
+
+    import learning.amp_datasets as amp_datasets
+    from learning.common_agent import CommonAgent
+
+    def make(cls=CommonAgent, batch_size=32, minibatch_size=16, normalize_input=False, **attrs):
+        torch.manual_seed(0)
+        agent = cls.__new__(cls)
+        agent.ppo_device = 'cpu'
+        agent.obs_shape = (TOY_OBS,)
+        agent.model = _toy_network().build({'actions_num': TOY_ACTIONS, 'input_shape': (TOY_OBS,),
+                                            'num_seqs': 1, 'value_size': 1})
+        agent.normalize_input = normalize_input
+        if normalize_input:
+            agent.running_mean_std = RunningMeanStd((TOY_OBS,))
+        agent.normalize_value = False
+        agent.normalize_advantage = True
+        agent.has_central_value = False
+        agent.is_rnn = False
+        agent.is_discrete = False
+        agent.rnn_states = None
+        agent.multi_gpu = False
+        agent.mixed_precision = False
+        agent.scaler = torch.cuda.amp.GradScaler(enabled=False)
+        agent.last_lr = 1e-3
+        agent.optimizer = torch.optim.Adam(agent.model.parameters(), agent.last_lr)
+        agent.scheduler = schedulers.IdentityScheduler()
+        agent.schedule_type = 'standard'
+        agent.epoch_num = 0
+        agent.e_clip = 0.2
+        agent.clip_value = True
+        agent.critic_coef = 1.
+        agent.entropy_coef = 0.
+        agent.bounds_loss_coef = 0.0001
+        agent.mini_epochs_num = 2
+        agent.batch_size = batch_size
+        agent.minibatch_size = minibatch_size
+        agent.dataset = amp_datasets.AMPDataset(batch_size, minibatch_size, False, False, 'cpu', 1)
+        agent.algo_observer = DefaultAlgoObserver()
+        agent._grad_accum_steps = 1
+        agent._pending_kl = None
+        agent._lr_needs_kl = False
+        agent._kl_early_stop = 0
+        agent._kl_target = 0.008
+        agent._step_timer = None
+        agent._async_update = False
+        agent._async_actor = None
+        agent._learner = None
+        agent._learner_stream = None
+        for name, value in attrs.items():
+            setattr(agent, name, value)
+        return agent
+
+    return make
+
+
+def _toy_batch(agent, obs):
+    import torch
+
+    agent.set_eval()
+    res_dict = agent.get_action_values({'obs': obs})
+    n = obs.shape[0]
+    return {
+        'obses': obs,
+        'actions': res_dict['actions'],
+        'neglogpacs': res_dict['neglogpacs'],
+        'values': res_dict['values'],
+        'mus': res_dict['mus'],
+        'sigmas': res_dict['sigmas'],
+        'returns': res_dict['values'] + torch.randn(n, 1),
+        'dones': torch.zeros(n),
+    }
+
+
+@pytest.fixture
+def toy_batch():
+    """A rollout batch for a toy agent, with actions and neglogpacs from its current policy."""
+    return _toy_batch
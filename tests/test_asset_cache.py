@@ -0,0 +1,136 @@
+import math
+import os
+import shutil
+import xml.etree.ElementTree as ET
+
+import pytest
+import yaml
+
+from utils import asset_cache
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'skillmimic', 'data')
+HUMANOID_FILE = os.path.join(DATA_DIR, 'assets', 'mjcf', 'mocap_humanoid.xml')
+BALL_FILE = os.path.join(DATA_DIR, 'assets', 'urdf', 'ball.urdf')
+
+
+def _env_cfg():
+    with open(os.path.join(DATA_DIR, 'cfg', 'skillmimic.yaml'), 'r') as f:
+        return yaml.safe_load(f)['env']
+
+
+def _reference_parse(asset_file):
+    # the rigid body and dof order of the loaded asset: bodies depth first, hinge joints in body order
+    bodies = []
+    dofs = []
+
+    def visit(body):
+        bodies.append(body.get('name'))
+        for joint in body.findall('joint'):
+            lower, upper = joint.get('range').split()
+            dofs.append((joint.get('name'), math.radians(float(lower)), math.radians(float(upper))))
+        for child in body.findall('body'):
+            visit(child)
+
+    root = ET.parse(asset_file).getroot()
+    for body in root.find('worldbody').findall('body'):
+        visit(body)
+    gears = {motor.get('joint'): float(motor.get('gear')) for motor in root.find('actuator').findall('motor')}
+    return bodies, dofs, gears
+
+
+@pytest.fixture
+def humanoid_file(tmp_path):
+    # a copy the tests can edit, next to its own cache dir
+    path = tmp_path / 'mocap_humanoid.xml'
+    shutil.copy(HUMANOID_FILE, str(path))
+    return str(path)
+
+
+@pytest.fixture
+def count_parses(monkeypatch):
+    parses = []
+    parse = asset_cache.parse_mjcf_metadata
+
+    def counting_parse(*args, **kwargs):
+        parses.append(args)
+        return parse(*args, **kwargs)
+
+    monkeypatch.setattr(asset_cache, 'parse_mjcf_metadata', counting_parse)
+    return parses
+
+
+def test_humanoid_metadata_matches_reference():
+    env_cfg = _env_cfg()
+    assert env_cfg['asset']['assetFileName'] == 'mjcf/mocap_humanoid.xml'
+    metadata = asset_cache.load_mjcf_metadata(HUMANOID_FILE, env_cfg['keyBodies'], env_cfg['contactBodies'], cache_dir=None)
+
+    bodies, dofs, gears = _reference_parse(HUMANOID_FILE)
+    # the sizes _setup_character_props hard-codes for this asset
+    assert len(bodies) == 53 and len(dofs) == 52 * 3
+    assert metadata['body_names'] == bodies
+    assert metadata['dof_names'] == [name for name, _, _ in dofs]
+    assert metadata['dof_limits_lower'] == pytest.approx([lower for _, lower, _ in dofs])
+    assert metadata['dof_limits_upper'] == pytest.approx([upper for _, _, upper in dofs])
+    # the Spine2_y/z motors of this asset drive Spine2_x, those dofs have no gear of their own
+    assert metadata['motor_efforts'] == [gears.get(name, 0.) for name, _, _ in dofs]
+    assert [name for name, _, _ in dofs if name not in gears] == ['Spine2_y', 'Spine2_z']
+
+    assert metadata['key_body_ids'] == [bodies.index(name) for name in env_cfg['keyBodies']]
+    assert metadata['contact_body_ids'] == [bodies.index(name) for name in env_cfg['contactBodies']]
+    assert bodies[metadata['key_body_ids'][0]] == 'Head'
+
+
+def test_unknown_body_rejected():
+    with pytest.raises(AssertionError):
+        asset_cache.parse_mjcf_metadata(HUMANOID_FILE, key_bodies=['Tail'])
+
+
+def test_metadata_cache_hit_and_miss(tmp_path, humanoid_file, count_parses):
+    cache_dir = str(tmp_path / 'cache')
+    key_bodies, contact_bodies = ['Head', 'L_Knee'], ['L_Index3']
+
+    metadata = asset_cache.load_mjcf_metadata(humanoid_file, key_bodies, contact_bodies, cache_dir)
+    assert len(count_parses) == 1 and len(os.listdir(cache_dir)) == 1
+    assert metadata == asset_cache.parse_mjcf_metadata(humanoid_file, key_bodies, contact_bodies)
+    del count_parses[:]
+
+    # the same file and options read the cache back
+    assert asset_cache.load_mjcf_metadata(humanoid_file, key_bodies, contact_bodies, cache_dir) == metadata
+    assert count_parses == [] and len(os.listdir(cache_dir)) == 1
+
+    # other loader options are a miss
+    other = asset_cache.load_mjcf_metadata(humanoid_file, key_bodies, ['R_Index3'], cache_dir)
+    assert len(count_parses) == 1 and len(os.listdir(cache_dir)) == 2
+    assert other['contact_body_ids'] != metadata['contact_body_ids']
+
+    # so is an edited asset, with the same path and options
+    with open(humanoid_file, 'r') as f:
+        xml = f.read()
+    with open(humanoid_file, 'w') as f:
+        f.write(xml.replace('name="Head"', 'name="Skull"', 1))
+    edited = asset_cache.load_mjcf_metadata(humanoid_file, ['Skull', 'L_Knee'], contact_bodies, cache_dir)
+    assert len(count_parses) == 2 and len(os.listdir(cache_dir)) == 3
+    assert 'Skull' in edited['body_names'] and 'Head' not in edited['body_names']
+    with pytest.raises(AssertionError):
+        asset_cache.load_mjcf_metadata(humanoid_file, key_bodies, contact_bodies, cache_dir)
+
+
+def test_no_cache_dir_always_parses(humanoid_file, count_parses):
+    for _ in range(2):
+        asset_cache.load_mjcf_metadata(humanoid_file, cache_dir=None)
+    assert len(count_parses) == 2
+
+
+def test_ball_has_no_mesh_collision(tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    # ball.urdf collides as a sphere, so the loader skips the convex decomposition
+    assert asset_cache.urdf_has_mesh_collision(BALL_FILE, cache_dir) is False
+    assert asset_cache.urdf_has_mesh_collision(BALL_FILE, cache_dir) is False
+    assert len(os.listdir(cache_dir)) == 1
+
+    mesh_file = tmp_path / 'mesh.urdf'
+    with open(BALL_FILE, 'r') as f:
+        urdf = f.read()
+    mesh_file.write_text(urdf.replace('<collision>\n      <origin xyz="0 0 0"/>\n      <geometry>\n        <sphere radius="0.12"/>',
+                                      '<collision>\n      <origin xyz="0 0 0"/>\n      <geometry>\n        <mesh filename="ball.obj"/>'))
+    assert asset_cache.urdf_has_mesh_collision(str(mesh_file), cache_dir) is True
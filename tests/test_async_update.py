@@ -0,0 +1,103 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+import pytest
+import torch
+
+from learning.common_agent import CommonAgent
+
+
+def _record_ratios(agent):
+    ratios = []
+    actor_loss = agent._actor_loss
+
+    def record(old_action_log_probs_batch, action_log_probs, advantage, curr_e_clip):
+        ratios.append(torch.exp(old_action_log_probs_batch - action_log_probs).detach())
+        return actor_loss(old_action_log_probs_batch, action_log_probs, advantage, curr_e_clip)
+
+    agent._actor_loss = record
+    return ratios
+
+
+def _first_minibatch(agent, batch):
+    agent.set_train()
+    agent.prepare_dataset(batch)
+    return agent.dataset[0]
+
+
+def test_ratio_against_lagged_policy(make_toy_agent, toy_batch):
+    agent = make_toy_agent()
+    ratios = _record_ratios(agent)
+    actor = agent._async_actor = agent._build_async_actor()
+
+    # the policy is unchanged since the actor played the batch
+    batch = toy_batch(actor, torch.randn(agent.batch_size, *agent.obs_shape))
+    info = agent.train_actor_critic(_first_minibatch(agent, batch))
+    assert torch.allclose(ratios[-1], torch.ones_like(ratios[-1]), atol=1e-6)
+    assert info['actor_clip_frac'].item() == 0.
+
+    # the learner has stepped, the actor still plays the policy from before the update
+    batch = toy_batch(actor, torch.randn(agent.batch_size, *agent.obs_shape))
+    agent.train_actor_critic(_first_minibatch(agent, batch))
+    assert not torch.allclose(ratios[-1], torch.ones_like(ratios[-1]), atol=1e-6)
+
+    agent._sync_async_actor()
+    batch = toy_batch(actor, torch.randn(agent.batch_size, *agent.obs_shape))
+    agent.train_actor_critic(_first_minibatch(agent, batch))
+    assert torch.allclose(ratios[-1], torch.ones_like(ratios[-1]), atol=1e-6)
+
+
+def test_actor_shares_no_module(make_toy_agent):
+    agent = make_toy_agent(normalize_input=True)
+    actor = agent._async_actor = agent._build_async_actor()
+    for name in ['model', 'running_mean_std']:
+        learner_module = getattr(agent, name)
+        actor_module = getattr(actor, name)
+        assert actor_module is not learner_module
+        learner_ptrs = {t.data_ptr() for t in learner_module.state_dict().values()}
+        assert learner_ptrs.isdisjoint(t.data_ptr() for t in actor_module.state_dict().values())
+
+    agent.running_mean_std(torch.randn(8, *agent.obs_shape) + 3.)
+    agent._sync_async_actor()
+    for k, v in agent.running_mean_std.state_dict().items():
+        assert torch.equal(actor.running_mean_std.state_dict()[k], v)
+
+
+class _TimedAgent(CommonAgent):
+    # a rollout that blocks the host like a GPU simulation step, and records when it ran
+    def play_steps(self):
+        start = time.perf_counter()
+        time.sleep(0.05)
+        batch = self._toy_batch(self, torch.randn(self.batch_size, *self.obs_shape))
+        batch['played_frames'] = self.batch_size
+        self._events.append(('play', start, time.perf_counter(), threading.get_ident()))
+        return batch
+
+    def calc_gradients(self, input_dict):
+        start = time.perf_counter()
+        super().calc_gradients(input_dict)
+        self._events.append(('update', start, time.perf_counter(), threading.get_ident()))
+
+
+def test_async_epoch_overlaps_play_and_update(make_toy_agent, toy_batch):
+    agent = make_toy_agent(cls=_TimedAgent, _async_update=True, _learner=ThreadPoolExecutor(max_workers=1),
+                           _events=[], _toy_batch=toy_batch)
+    try:
+        agent._train_epoch_async()
+        # the first epoch plays an extra rollout, the learner trains on the first
+        assert agent.curr_frames == 2 * agent.batch_size
+        del agent._events[:]
+
+        train_info = agent._train_epoch_async()
+    finally:
+        agent._learner.shutdown()
+    assert agent.curr_frames == agent.batch_size
+    plays = [e for e in agent._events if e[0] == 'play']
+    updates = [e for e in agent._events if e[0] == 'update']
+    assert len(plays) == 1
+    assert len(updates) == agent.mini_epochs_num * len(agent.dataset)
+    # the update ran on the learner thread while the rollout was played
+    assert all(u[3] != plays[0][3] for u in updates)
+    assert updates[0][1] < plays[0][2]
+    assert train_info['play_time'] + train_info['update_time'] > train_info['total_time']
@@ -0,0 +1,53 @@
+from types import SimpleNamespace
+
+import pytest
+import torch
+
+from learning.common_agent_mixin import BUFFER_DTYPES
+
+# unit roundoff of the storage types, the bound on the relative error of a round trip through them
+ROUNDOFF = {'float16': 2. ** -11, 'bfloat16': 2. ** -8}
+
+
+def _experience_buffer(fields):
+    tensor_dict = {name: torch.zeros(4, 8, 5) for name in fields}
+    tensor_dict['rewards'] = torch.zeros(4, 8, 1)
+    return SimpleNamespace(tensor_dict=tensor_dict)
+
+
+@pytest.mark.parametrize('buffer_dtype', ['float16', 'bfloat16'])
+def test_round_trip_error(make_toy_agent, buffer_dtype):
+    agent = make_toy_agent(batch_size=32, minibatch_size=32, _buffer_dtype=BUFFER_DTYPES[buffer_dtype],
+                           _buffer_half_fields=['obses'], experience_buffer=_experience_buffer(['obses']))
+    agent._cast_experience_buffer()
+    tensor_dict = agent.experience_buffer.tensor_dict
+    assert tensor_dict['obses'].dtype == BUFFER_DTYPES[buffer_dtype]
+    assert tensor_dict['rewards'].dtype == torch.float32
+
+    # magnitudes from 1e-3 to 1e3, within the normal range of both types
+    obs = (torch.rand(4, 8, 5) + 1.) * torch.logspace(-3, 3, 5) * torch.randn(4, 8, 5).sign()
+    tensor_dict['obses'][:] = obs
+    agent.dataset.update_values_dict({'obs': tensor_dict['obses'].reshape(32, 5)})
+    sample_idx = agent.dataset._idx_buf.clone()
+    restored = agent.dataset[0]['obs']
+
+    assert restored.dtype == torch.float32
+    expected = obs.reshape(32, 5)[sample_idx]
+    assert torch.all((restored - expected).abs() <= ROUNDOFF[buffer_dtype] * expected.abs())
+
+
+def test_logs_only_cast_fields(make_toy_agent, capsys):
+    # the discrete agents store no mus and sigmas
+    agent = make_toy_agent(_buffer_dtype=torch.float16, _buffer_half_fields=['obses', 'next_obses', 'mus', 'sigmas'],
+                           experience_buffer=_experience_buffer(['obses', 'next_obses']))
+    agent._cast_experience_buffer()
+    log = [line for line in capsys.readouterr().out.splitlines() if line.startswith('Experience buffer')]
+    assert log == ['Experience buffer: obses, next_obses stored as torch.float16, 0.0 MB saved']
+
+
+def test_float32_keeps_buffer(make_toy_agent, capsys):
+    agent = make_toy_agent(_buffer_dtype=BUFFER_DTYPES['float32'], _buffer_half_fields=['obses'],
+                           experience_buffer=_experience_buffer(['obses']))
+    agent._cast_experience_buffer()
+    assert agent.experience_buffer.tensor_dict['obses'].dtype == torch.float32
+    assert 'Experience buffer' not in capsys.readouterr().out
@@ -0,0 +1,74 @@
+import os
+
+import pytest
+import torch
+
+from utils import checkpoint_reader
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    # paths read from disk, in order
+    loads = []
+    torch_load = checkpoint_reader._torch_load
+
+    def counting_load(filename, map_location, mmap):
+        loads.append(os.path.basename(filename))
+        return torch_load(filename, map_location, mmap)
+
+    monkeypatch.setattr(checkpoint_reader, '_torch_load', counting_load)
+    checkpoint_reader.clear_checkpoint_cache()
+    yield loads
+    checkpoint_reader.clear_checkpoint_cache()
+
+
+def _save(path, scale=1.):
+    torch.save({
+        'model': {'a2c_network.actor_mlp.0.weight': torch.ones(2, 3) * scale,
+                  'a2c_network.critic_mlp.0.weight': torch.ones(2, 3)},
+        'running_mean_std': {'running_mean': torch.zeros(3)},
+        'optimizer': {'state': {0: {'exp_avg': torch.ones(2, 3)}}},
+        'epoch': 7,
+    }, str(path))
+    return str(path)
+
+
+def test_actor_state_loaded_once(tmp_path, loads):
+    fn = _save(tmp_path / 'llc.pth')
+    first = checkpoint_reader.load_checkpoint(fn, actor_only=True)
+    for _ in range(3):
+        assert checkpoint_reader.load_checkpoint(fn, actor_only=True) is first
+    assert loads == ['llc.pth']
+    assert set(first) == {'model', 'running_mean_std'}
+    assert list(first['model']) == ['a2c_network.actor_mlp.0.weight']
+
+    # a new checkpoint at the same path is read again
+    _save(tmp_path / 'llc.pth', scale=2.)
+    stamp = os.stat(fn).st_mtime_ns + 1
+    os.utime(fn, ns=(stamp, stamp))
+    second = checkpoint_reader.load_checkpoint(fn, actor_only=True)
+    assert loads == ['llc.pth'] * 2
+    assert torch.equal(second['model']['a2c_network.actor_mlp.0.weight'], torch.full((2, 3), 2.))
+
+
+def test_full_checkpoint_not_cached(tmp_path, loads):
+    fn = _save(tmp_path / 'full.pth')
+    for _ in range(2):
+        checkpoint = checkpoint_reader.load_checkpoint(fn)
+        assert 'optimizer' in checkpoint
+    assert loads == ['full.pth'] * 2
+    assert len(checkpoint_reader._cache) == 0
+
+
+def test_cache_bounded(tmp_path, loads, monkeypatch):
+    monkeypatch.setattr(checkpoint_reader, 'MAX_CACHED_CHECKPOINTS', 2)
+    fns = [_save(tmp_path / '{}.pth'.format(i)) for i in range(3)]
+    checkpoint_reader.load_checkpoint(fns[0], actor_only=True)
+    checkpoint_reader.load_checkpoint(fns[1], actor_only=True)
+    # 0 is now the most recently used, 1 is dropped for 2
+    checkpoint_reader.load_checkpoint(fns[0], actor_only=True)
+    checkpoint_reader.load_checkpoint(fns[2], actor_only=True)
+    assert len(checkpoint_reader._cache) == 2
+    checkpoint_reader.load_checkpoint(fns[0], actor_only=True)
+    checkpoint_reader.load_checkpoint(fns[1], actor_only=True)
+    assert loads == ['0.pth', '1.pth', '2.pth', '1.pth']
@@ -0,0 +1,105 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+import torch
+
+from utils import checkpoint_writer
+from utils.checkpoint_writer import CheckpointWriter, save_atomic, state_to_cpu
+
+
+def _trained_agent(make_toy_agent, toy_batch):
+    agent = make_toy_agent(vec_env=SimpleNamespace(get_env_state=lambda: None), frame=64, last_mean_rewards=1.5)
+    batch = toy_batch(agent, torch.randn(agent.batch_size, *agent.obs_shape))
+    agent.set_train()
+    agent.prepare_dataset(batch)
+    # gives the optimizer state tensors
+    agent.train_actor_critic(agent.dataset[0])
+    return agent
+
+
+def _assert_same_state(a, b):
+    if torch.is_tensor(a):
+        assert torch.equal(a, b)
+    elif isinstance(a, dict):
+        assert a.keys() == b.keys()
+        for k in a:
+            _assert_same_state(a[k], b[k])
+    elif isinstance(a, (list, tuple)):
+        assert len(a) == len(b)
+        for x, y in zip(a, b):
+            _assert_same_state(x, y)
+    else:
+        assert a == b
+
+
+def test_background_save_matches_sync_save(make_toy_agent, toy_batch, tmp_path):
+    agent = _trained_agent(make_toy_agent, toy_batch)
+    agent._init_checkpoint_writer({})
+    agent.save(str(tmp_path / 'sync'))
+
+    agent._init_checkpoint_writer({'background_save': True})
+    agent.save(str(tmp_path / 'background'))
+    agent._checkpoint_writer.close()
+
+    sync_state = torch.load(tmp_path / 'sync.pth')
+    _assert_same_state(sync_state, torch.load(tmp_path / 'background.pth'))
+    _assert_same_state(sync_state, agent.get_full_state_weights())
+    assert sorted(os.listdir(tmp_path)) == ['background.pth', 'sync.pth']
+
+
+def test_saved_state_is_a_snapshot(tmp_path):
+    weights = torch.zeros(4)
+    writer = CheckpointWriter()
+    writer.save(str(tmp_path / 'ckpt.pth'), {'model': {'w': weights}, 'epoch': 3})
+    # training keeps updating the tensors while the write is pending
+    weights += 1.
+    writer.close()
+    state = torch.load(tmp_path / 'ckpt.pth')
+    assert torch.equal(state['model']['w'], torch.zeros(4))
+    assert state['epoch'] == 3
+
+
+def test_state_to_cpu_copies():
+    state = {'a': [torch.ones(2), (torch.zeros(1), 'x')], 'b': 1}
+    copy = state_to_cpu(state)
+    _assert_same_state(state, copy)
+    assert copy['a'][0] is not state['a'][0]
+    assert isinstance(copy['a'][1], tuple)
+
+
+def _crashing_save(state, f):
+    f.write(b'partial checkpoint')
+    raise KeyboardInterrupt()
+
+
+def test_crash_keeps_previous_checkpoint(tmp_path, monkeypatch):
+    filename = str(tmp_path / 'ckpt.pth')
+    save_atomic(filename, {'epoch': 1})
+
+    monkeypatch.setattr(checkpoint_writer.torch, 'save', _crashing_save)
+    with pytest.raises(KeyboardInterrupt):
+        save_atomic(filename, {'epoch': 2})
+    monkeypatch.undo()
+
+    assert torch.load(filename) == {'epoch': 1}
+    assert os.listdir(tmp_path) == ['ckpt.pth']
+
+
+def test_background_error_is_raised(tmp_path, monkeypatch):
+    filename = str(tmp_path / 'ckpt.pth')
+    save_atomic(filename, {'epoch': 1})
+
+    def failing_save(state, f):
+        f.write(b'partial checkpoint')
+        raise OSError('disk full')
+
+    monkeypatch.setattr(checkpoint_writer.torch, 'save', failing_save)
+    writer = CheckpointWriter()
+    writer.save(filename, {'epoch': 2})
+    with pytest.raises(OSError):
+        writer.close()
+    monkeypatch.undo()
+
+    assert torch.load(filename) == {'epoch': 1}
+    assert os.listdir(tmp_path) == ['ckpt.pth']
@@ -0,0 +1,70 @@
+from collections import Counter
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+
+from env.tasks import humanoid_object_task
+from env.tasks.skillmimic import SkillMimicBallPlay
+
+NUM_BODIES = 53
+
+
+def _make_task(headless, monkeypatch):
+    monkeypatch.setattr(humanoid_object_task.asset_cache, 'urdf_has_mesh_collision', lambda *args: False)
+    task = SkillMimicBallPlay.__new__(SkillMimicBallPlay)
+    task.gym = mock.MagicMock()
+    task.gym.get_actor_rigid_shape_properties.side_effect = lambda env_ptr, handle: [SimpleNamespace(restitution=0.)]
+    task.sim = None
+    task.headless = headless
+    task.cfg = {'env': {'asset': {'assetFileName': 'mjcf/mocap_humanoid.xml'}}}
+    task.up_axis_idx = 2
+    task.num_bodies = NUM_BODIES
+    task._pd_control = True
+    task._humanoid_dof_props = {'driveMode': None}
+    task.humanoid_handles = []
+    task._target_handles = []
+    task.projtype = 'None'
+    task.ball_density = 1.
+    task.ball_restitution = 0.8
+    task.ball_size = 1.
+    task.get_asset_cache_dir = lambda: None
+    task.save_images = False
+    return task
+
+
+def _count_env_creation_calls(task, num_envs):
+    # gym calls of loading the ball asset and building num_envs envs
+    task._load_target_asset()
+    for i in range(num_envs):
+        task._build_env(i, 'env_{}'.format(i), 'humanoid_asset')
+    return Counter(name for name, args, kwargs in task.gym.method_calls)
+
+
+@pytest.mark.parametrize('headless', [True, False])
+def test_env_creation_call_counts(headless, monkeypatch):
+    one_env = _count_env_creation_calls(_make_task(headless, monkeypatch), 1)
+    task = _make_task(headless, monkeypatch)
+    many_envs = _count_env_creation_calls(task, 9)
+    per_env = {name: (many_envs[name] - one_env[name]) // 8 for name in many_envs}
+    once = {name: one_env[name] - per_env[name] for name in one_env}
+
+    assert per_env['create_actor'] == 2
+    assert per_env['set_actor_dof_properties'] == 1
+    assert per_env['set_actor_rigid_shape_properties'] == 1
+    # the asset and shape properties are read once, not per env
+    assert once['load_asset'] == 1
+    assert once['get_actor_rigid_shape_properties'] == 1
+    assert per_env.get('get_asset_dof_properties', 0) == 0
+    if headless:
+        assert 'set_rigid_body_color' not in many_envs
+        assert 'create_texture_from_file' not in many_envs
+        assert 'set_rigid_body_texture' not in many_envs
+    else:
+        assert per_env['set_rigid_body_color'] == NUM_BODIES + 1
+        assert once['create_texture_from_file'] == 1
+        assert per_env['set_rigid_body_texture'] == 1
+    # every ball gets the shape properties with the restitution set
+    for args in task.gym.set_actor_rigid_shape_properties.call_args_list:
+        assert args[0][2] is task._target_shape_props
+    assert [p.restitution for p in task._target_shape_props] == [task.ball_restitution]
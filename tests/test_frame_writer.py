@@ -0,0 +1,119 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from utils.frame_writer import FrameWriter
+
+
+class _FakeStdin():
+    def __init__(self, encoder):
+        self._encoder = encoder
+        self.closed = False
+
+    def write(self, data):
+        self._encoder.write(data)
+
+    def close(self):
+        self.closed = True
+
+
+class _FakeEncoder():
+    # stands in for the ffmpeg subprocess, keeps the first pixel of every frame piped into it
+    def __init__(self, fail_at=None, returncode=0):
+        self.stdin = _FakeStdin(self)
+        self.frames = []
+        self.waited = False
+        self.release = threading.Event()
+        self.release.set()
+        self.writing = threading.Event()
+        self._fail_at = fail_at
+        self._returncode = returncode
+
+    def write(self, data):
+        self.writing.set()
+        self.release.wait()
+        if len(self.frames) == self._fail_at:
+            raise BrokenPipeError("ffmpeg exited")
+        self.frames.append(data[0])
+
+    def wait(self):
+        self.waited = True
+        return self._returncode
+
+
+def _make_writer(tmp_path, monkeypatch, encoder, max_queue_size=64):
+    monkeypatch.setattr(FrameWriter, '_start_encoder', lambda self, width, height, channels: encoder)
+    return FrameWriter(str(tmp_path / 'out.mp4'), mode='video', max_queue_size=max_queue_size)
+
+
+def _frame(frame_id):
+    return np.full((2, 2, 4), frame_id, dtype=np.uint8)
+
+
+def test_frames_written_in_order(tmp_path, monkeypatch):
+    encoder = _FakeEncoder()
+    writer = _make_writer(tmp_path, monkeypatch, encoder)
+    for frame_id in range(20):
+        writer.put(frame_id, _frame(frame_id))
+    writer.close()
+
+    assert encoder.frames == list(range(20))
+    assert writer.num_written == 20
+    assert writer.dropped_frames == []
+    assert encoder.stdin.closed and encoder.waited
+
+
+def test_full_queue_drops_frames(tmp_path, monkeypatch):
+    encoder = _FakeEncoder()
+    encoder.release.clear()
+    writer = _make_writer(tmp_path, monkeypatch, encoder, max_queue_size=2)
+    writer.put(0, _frame(0))
+    # frame 0 is being written, 1 and 2 fill the queue, the rest is dropped
+    encoder.writing.wait()
+    for frame_id in range(1, 6):
+        writer.put(frame_id, _frame(frame_id))
+    encoder.release.set()
+    writer.close()
+
+    assert writer.dropped_frames == [3, 4, 5]
+    assert encoder.frames == [0, 1, 2]
+    assert writer.num_written + len(writer.dropped_frames) == 6
+
+
+def test_write_error_raised_and_encoder_closed(tmp_path, monkeypatch):
+    encoder = _FakeEncoder(fail_at=2)
+    writer = _make_writer(tmp_path, monkeypatch, encoder)
+    for frame_id in range(5):
+        writer.put(frame_id, _frame(frame_id))
+
+    with pytest.raises(BrokenPipeError):
+        writer.close()
+    assert encoder.stdin.closed and encoder.waited
+    assert encoder.frames == [0, 1]
+    assert writer.dropped_frames == [2, 3, 4]
+    # the error is raised once, the atexit close does nothing
+    writer.close()
+
+
+def test_put_raises_after_error(tmp_path, monkeypatch):
+    encoder = _FakeEncoder(fail_at=0)
+    writer = _make_writer(tmp_path, monkeypatch, encoder)
+    writer.put(0, _frame(0))
+    deadline = time.time() + 5.
+    while writer.dropped_frames != [0] and time.time() < deadline:
+        time.sleep(0.001)
+
+    with pytest.raises(BrokenPipeError):
+        writer.put(1, _frame(1))
+    writer.close()
+    assert encoder.stdin.closed and encoder.waited
+
+
+def test_encoder_exit_code_raised(tmp_path, monkeypatch):
+    encoder = _FakeEncoder(returncode=1)
+    writer = _make_writer(tmp_path, monkeypatch, encoder)
+    writer.put(0, _frame(0))
+    with pytest.raises(RuntimeError, match='code 1'):
+        writer.close()
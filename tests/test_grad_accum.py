@@ -0,0 +1,51 @@
+import pytest
+import torch
+
+from learning.common_agent import CommonAgent
+from learning.skillmimic_agent import SkillMimicAgent
+
+
+def _gradients(agent, input_dict):
+    agent.calc_gradients(input_dict)
+    return [p.grad.clone() for p in agent.model.parameters()], agent.train_result
+
+
+def _rand_action_mask(batch_size):
+    # the first micro-batch took only deterministic actions, the others a mix
+    mask = torch.bernoulli(torch.full((batch_size,), 0.5), generator=torch.Generator().manual_seed(1))
+    mask[:8] = 0.
+    mask[8] = 1.
+    return mask
+
+
+def _make_agent(make_toy_agent, cls, batch_size, **attrs):
+    if cls is SkillMimicAgent:
+        attrs.update(_normalize_input=False, truncate_grads=True, grad_norm=1.)
+    return make_toy_agent(cls=cls, batch_size=batch_size, minibatch_size=batch_size, **attrs)
+
+
+@pytest.mark.parametrize('cls', [CommonAgent, SkillMimicAgent])
+@pytest.mark.parametrize('batch_size', [32, 30])
+def test_accumulated_gradients_match(make_toy_agent, toy_batch, cls, batch_size):
+    # 30 does not split evenly, the last micro-batch is smaller
+    single = _make_agent(make_toy_agent, cls, batch_size)
+    accum = _make_agent(make_toy_agent, cls, batch_size, _grad_accum_steps=4)
+    for p, q in zip(single.model.parameters(), accum.model.parameters()):
+        assert torch.equal(p, q)
+    assert len(accum._micro_batches(batch_size)) == 4
+
+    # the rollout of a CommonAgent with the same weights, SkillMimicAgent acts with its own rand_action_probs
+    batch = toy_batch(make_toy_agent(), torch.randn(batch_size, *single.obs_shape))
+    if cls is SkillMimicAgent:
+        # each micro-batch's masked losses are divided by the mask sum of the whole minibatch
+        batch['rand_action_mask'] = _rand_action_mask(batch_size)
+    single.set_train()
+    single.prepare_dataset(batch)
+    input_dict = single.dataset[0]
+
+    single_grads, single_result = _gradients(single, input_dict)
+    accum_grads, accum_result = _gradients(accum, input_dict)
+    for g, h in zip(single_grads, accum_grads):
+        assert torch.allclose(g, h, rtol=1e-5, atol=1e-7)
+    for k in ['actor_loss', 'critic_loss', 'b_loss', 'entropy', 'actor_clip_frac', 'kl']:
+        assert torch.allclose(single_result[k], accum_result[k], rtol=1e-5, atol=1e-7), k
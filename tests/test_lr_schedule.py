@@ -0,0 +1,69 @@
+import pytest
+import torch
+from rl_games.algos_torch import torch_ext
+from rl_games.common import schedulers
+
+NUM_EPOCHS = 6
+
+
+def _baseline_mini_epochs(agent):
+    # the mini-epoch loop before the lr schedule was deferred, reading the KL back as a float
+    train_info = None
+    for _ in range(0, agent.mini_epochs_num):
+        for i in range(len(agent.dataset)):
+            curr_train_info = agent.train_actor_critic(agent.dataset[i])
+            if agent.schedule_type == 'legacy':
+                agent.last_lr, agent.entropy_coef = agent.scheduler.update(agent.last_lr, agent.entropy_coef, agent.epoch_num, 0, curr_train_info['kl'].item())
+                agent.update_lr(agent.last_lr)
+
+            if (train_info is None):
+                train_info = {k: [v] for k, v in curr_train_info.items()}
+            else:
+                for k, v in curr_train_info.items():
+                    train_info[k].append(v)
+
+        av_kls = torch_ext.mean_list(train_info['kl'])
+        if agent.schedule_type == 'standard':
+            agent.last_lr, agent.entropy_coef = agent.scheduler.update(agent.last_lr, agent.entropy_coef, agent.epoch_num, 0, av_kls.item())
+            agent.update_lr(agent.last_lr)
+    return train_info
+
+
+def _lr_trajectory(agent, toy_batch, train_fn):
+    trajectory = []
+    for epoch in range(NUM_EPOCHS):
+        agent.epoch_num = epoch
+        # the same rollout and minibatch order for both agents
+        torch.manual_seed(epoch)
+        batch = toy_batch(agent, torch.randn(agent.batch_size, *agent.obs_shape) * 3.)
+        agent.set_train()
+        agent.prepare_dataset(batch)
+        train_fn(agent)
+        trajectory.append((agent.last_lr, [group['lr'] for group in agent.optimizer.param_groups]))
+    return trajectory
+
+
+def _scheduler(name):
+    if name == 'adaptive':
+        return schedulers.AdaptiveScheduler(kl_threshold=0.008)
+    return schedulers.LinearScheduler(1e-3, max_steps=NUM_EPOCHS)
+
+
+@pytest.mark.parametrize('schedule_type', ['legacy', 'standard'])
+@pytest.mark.parametrize('scheduler', ['adaptive', 'linear'])
+def test_lr_trajectory_matches_baseline(make_toy_agent, toy_batch, schedule_type, scheduler):
+    baseline = make_toy_agent(mini_epochs_num=3, schedule_type=schedule_type, scheduler=_scheduler(scheduler))
+    expected = _lr_trajectory(baseline, toy_batch, _baseline_mini_epochs)
+
+    agent = make_toy_agent(mini_epochs_num=3, schedule_type=schedule_type, scheduler=_scheduler(scheduler),
+                           _lr_needs_kl=(scheduler == 'adaptive'))
+    trajectory = _lr_trajectory(agent, toy_batch, lambda a: a._train_mini_epochs())
+
+    assert trajectory == expected
+    # the schedule moved the lr, up and down for the adaptive one
+    lrs = [lr for lr, _ in expected]
+    assert len(set(lrs)) > 1
+    if scheduler == 'adaptive':
+        assert any(b > a for a, b in zip(lrs, lrs[1:])) and any(b < a for a, b in zip(lrs, lrs[1:]))
+    for p, baseline_p in zip(agent.model.parameters(), baseline.model.parameters()):
+        assert torch.equal(p, baseline_p)
@@ -0,0 +1,50 @@
+import threading
+import tracemalloc
+
+import numpy as np
+
+from utils.make_video import stream_frames
+
+NUM_FRAMES = 10000
+FRAME_SHAPE = (48, 64, 3)
+WORKERS = 4
+
+
+class _SyntheticFrames():
+    # decodes frame i as an image filled with i, tracking how many decoded frames are alive
+    def __init__(self):
+        self.alive = 0
+        self.max_alive = 0
+        self._lock = threading.Lock()
+
+    def load(self, frame_id):
+        with self._lock:
+            self.alive += 1
+            self.max_alive = max(self.max_alive, self.alive)
+        return np.full(FRAME_SHAPE, frame_id % 251, dtype=np.uint8)
+
+    def release(self):
+        with self._lock:
+            self.alive -= 1
+
+
+def test_stream_memory_bounded_over_10k_frames():
+    frames = _SyntheticFrames()
+    frame_bytes = int(np.prod(FRAME_SHAPE))
+
+    tracemalloc.start()
+    num_frames = 0
+    for frame_id, frame in enumerate(stream_frames(range(NUM_FRAMES), frames.load, WORKERS)):
+        # frames arrive in file order
+        assert frame[0, 0, 0] == frame_id % 251
+        num_frames += 1
+        del frame
+        frames.release()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert num_frames == NUM_FRAMES
+    # one queued ahead per in-flight slot plus the frame being written
+    assert frames.max_alive <= 2 * WORKERS + 1
+    # the whole clip would take NUM_FRAMES * frame_bytes, about 92 MB
+    assert peak < 64 * frame_bytes
@@ -0,0 +1,114 @@
+import numpy as np
+import torch
+
+from env.tasks.skillmimic import SkillMimicBallPlay
+from utils.motion_data_handler import MotionDataHandler
+
+NUM_ENVS = 6
+RESET_MASK = torch.tensor([True, False, True, True, False, True])
+ENV_IDS = RESET_MASK.nonzero(as_tuple=False).flatten()
+REWARD_WEIGHTS = {k: 1. for k in ['p', 'r', 'op', 'ig', 'cg1', 'cg2', 'pv', 'rv', 'or', 'opv', 'orv']}
+STATE_FIELDS = ['root_pos', 'root_rot', 'root_pos_vel', 'root_rot_vel', 'dof_pos', 'dof_pos_vel',
+                'obj_pos', 'obj_pos_vel', 'obj_rot', 'obj_rot_vel']
+STATE_DIMS = [3, 4, 3, 3, 5, 5, 3, 3, 4, 3]
+
+
+def _clip(num_frames):
+    clip = {'hoi_data_text': '010', 'hoi_data': torch.randn(num_frames, 10)}
+    for k, dim in zip(STATE_FIELDS, STATE_DIMS):
+        clip[k] = torch.randn(num_frames, dim)
+    return clip
+
+
+def _motion_data(clips):
+    motion_data = MotionDataHandler.__new__(MotionDataHandler)
+    motion_data.device = 'cpu'
+    motion_data.play_dataset = False
+    motion_data.max_episode_length = 8
+    motion_data.hoi_data_dict = dict(enumerate(clips))
+    motion_data.num_motions = len(clips)
+    motion_data.motion_lengths = torch.tensor([c['hoi_data'].shape[0] for c in clips])
+    motion_data._motion_weights = np.ones(len(clips))
+    motion_data._motion_tensors = None
+    motion_data.num_envs = NUM_ENVS
+    motion_data.envid2motid = torch.zeros(NUM_ENVS, dtype=torch.long)
+    motion_data.envid2episode_lengths = torch.zeros(NUM_ENVS, dtype=torch.long)
+    motion_data.reward_weights_default = REWARD_WEIGHTS
+    motion_data.reward_weights = {k: torch.full((NUM_ENVS,), -1.) for k in REWARD_WEIGHTS}
+    return motion_data
+
+
+def test_initial_state_mask_matches_index():
+    clips = [_clip(9), _clip(14), _clip(20)]
+    by_index = _motion_data(clips)
+    by_mask = _motion_data(clips)
+    motion_ids = torch.tensor([2, 0, 1, 0, 1, 2])
+    # windows that fit in the clip, and ones cut short by its end
+    start_frames = torch.tensor([3, 2, 2, 5, 9, 15], dtype=torch.int)
+
+    expected = by_index.get_initial_state(ENV_IDS, motion_ids[ENV_IDS], start_frames[ENV_IDS])
+    state = by_mask.get_initial_state_masked(RESET_MASK, motion_ids, start_frames)
+
+    for e, s in zip(expected, state):
+        assert torch.equal(s[ENV_IDS], e)
+    assert torch.equal(by_mask.envid2motid, by_index.envid2motid)
+    assert torch.equal(by_mask.envid2episode_lengths, by_index.envid2episode_lengths)
+    for k in REWARD_WEIGHTS:
+        assert torch.equal(by_mask.reward_weights[k], by_index.reward_weights[k])
+
+
+def _make_task():
+    task = SkillMimicBallPlay.__new__(SkillMimicBallPlay)
+    task.num_envs = NUM_ENVS
+    task.device = 'cpu'
+    task._sim_tensor_refresh_fns = {}
+    task._sim_tensor_stale = {'root_state': False, 'dof_state': False}
+    task._humanoid_root_states = torch.randn(NUM_ENVS, 13)
+    task._target_states = torch.randn(NUM_ENVS, 13)
+    task._dof_pos = torch.randn(NUM_ENVS, 5)
+    task._dof_vel = torch.randn(NUM_ENVS, 5)
+    for k, dim in zip(STATE_FIELDS, STATE_DIMS):
+        setattr(task, 'init_' + k, torch.randn(NUM_ENVS, dim))
+    task.progress_buf = torch.randint(0, 8, (NUM_ENVS,))
+    task.hoi_data_batch = torch.randn(NUM_ENVS, 8, 10)
+    task.hoi_data_label_batch = torch.randn(NUM_ENVS, 4)
+    task._enable_task_obs = False
+    task.obs_buf = torch.randn(NUM_ENVS, 13 + 13 + 4)
+    task._curr_ref_obs = torch.randn(NUM_ENVS, 10)
+
+    # per-env observations of the state the reset writes
+    def compute_humanoid_obs(env_ids=None):
+        states = task._humanoid_root_states
+        return states if env_ids is None else states[env_ids]
+
+    def compute_obj_obs(env_ids=None):
+        states = task._target_states
+        return states if env_ids is None else states[env_ids]
+
+    task._compute_humanoid_obs = compute_humanoid_obs
+    task._compute_obj_obs = compute_obj_obs
+    return task
+
+
+def _clone_state(src, dst):
+    for name in ['_humanoid_root_states', '_target_states', '_dof_pos', '_dof_vel', 'obs_buf', '_curr_ref_obs']:
+        setattr(dst, name, getattr(src, name).clone())
+    for name in ['progress_buf', 'hoi_data_batch', 'hoi_data_label_batch'] + ['init_' + k for k in STATE_FIELDS]:
+        setattr(dst, name, getattr(src, name))
+
+
+def test_task_reset_mask_matches_index():
+    by_index = _make_task()
+    by_mask = _make_task()
+    _clone_state(by_index, by_mask)
+
+    by_index._reset_humanoid(ENV_IDS)
+    by_index._reset_target(ENV_IDS)
+    by_index._compute_observations(ENV_IDS)
+
+    by_mask._reset_humanoid_masked(RESET_MASK)
+    by_mask._reset_target_masked(RESET_MASK)
+    by_mask._compute_observations_masked(RESET_MASK)
+
+    for name in ['_humanoid_root_states', '_target_states', '_dof_pos', '_dof_vel', 'obs_buf', '_curr_ref_obs']:
+        assert torch.equal(getattr(by_mask, name), getattr(by_index, name)), name
@@ -0,0 +1,23 @@
+import torch
+
+
+def _train(agent, toy_batch):
+    batch = toy_batch(agent, torch.randn(agent.batch_size, *agent.obs_shape))
+    agent.set_train()
+    agent.prepare_dataset(batch)
+    return agent._train_mini_epochs()
+
+
+def test_all_mini_epochs_without_early_stop(make_toy_agent, toy_batch):
+    agent = make_toy_agent(mini_epochs_num=3)
+    train_info = _train(agent, toy_batch)
+    assert train_info['mini_epochs'] == 3
+    assert len(train_info['kl']) == 3 * len(agent.dataset)
+
+
+def test_kl_early_stop(make_toy_agent, toy_batch):
+    # any KL of the first mini-epoch is above the threshold
+    agent = make_toy_agent(mini_epochs_num=3, _kl_early_stop=1e-12)
+    train_info = _train(agent, toy_batch)
+    assert train_info['mini_epochs'] == 1
+    assert len(train_info['kl']) == len(agent.dataset)
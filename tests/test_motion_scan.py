@@ -0,0 +1,86 @@
+import json
+from types import SimpleNamespace
+
+import torch
+
+from utils import motion_scan
+
+
+def _clip(num_frames, text='010'):
+    root_rot = torch.zeros(num_frames, 4)
+    root_rot[:, 3] = 1.
+    obj_pos = torch.zeros(num_frames, 3)
+    obj_pos[:, 2] = 1.
+    return {
+        'hoi_data_text': text,
+        'hoi_data': torch.zeros(num_frames, 8),
+        'root_rot': root_rot,
+        # built from frame differences, one row less than the clip
+        'root_rot_vel': torch.zeros(num_frames - 1, 3),
+        'obj_pos': obj_pos,
+        'contact': torch.zeros(num_frames, 1),
+    }
+
+
+def _motion_data(clips):
+    return SimpleNamespace(
+        num_motions=len(clips),
+        hoi_data_dict={i: c for i, c in enumerate(clips)},
+        motion_lengths=torch.tensor([c['hoi_data'].shape[0] for c in clips]),
+        motion_files=['{:03d}_clip_{:d}.pt'.format(0, i) for i in range(len(clips))],
+        skill_name='test',
+        cfg={'env': {}},
+    )
+
+
+def test_clean_clips_of_different_lengths():
+    report = motion_scan.scan_motion_data(_motion_data([_clip(12), _clip(7)]))
+
+    assert report['num_clips'] == 2
+    assert report['num_flagged_clips'] == 0
+    assert [c['num_frames'] for c in report['clips']] == [12, 7]
+    assert [c['max_ang_vel'] for c in report['clips']] == [0., 0.]
+
+
+def test_flags_anomalies_at_their_frames():
+    spike = _clip(12)
+    spike['root_rot_vel'][4] = torch.tensor([10., 0., 0.])
+    spike['root_rot'][6:, 3] = -1.
+    spike['obj_pos'][2, 2] = 0.
+    spike['contact'][8] = 1.
+    no_ball = _clip(7, text='000')
+    no_ball['obj_pos'][3, 2] = 0.
+    broken = _clip(9)
+    broken['hoi_data'][5, 0] = float('nan')
+    broken['root_rot_vel'][5] = float('nan')
+
+    report = motion_scan.scan_motion_data(_motion_data([spike, no_ball, broken]))
+    spike_report, no_ball_report, broken_report = report['clips']
+
+    assert spike_report['angular_velocity_spike'] == [4]
+    assert spike_report['max_ang_vel'] == 10.
+    assert spike_report['quat_sign_flip'] == [6]
+    assert spike_report['obj_floor_penetration'] == [2]
+    assert spike_report['contact_flicker'] == [8]
+    assert no_ball_report['clean']
+    assert broken_report['nan'] == [5]
+    assert broken_report['max_ang_vel'] == 0.
+    assert report['num_flagged_clips'] == 2
+
+
+def test_report_is_strict_json(tmp_path):
+    clip = _clip(5)
+    clip['root_rot_vel'][:] = float('nan')
+    report = motion_scan.scan_motion_data(_motion_data([clip]))
+    # only the padded last frame is finite
+    assert report['clips'][0]['max_ang_vel'] == 0.
+
+    report_file = str(tmp_path / 'scan' / 'report.json')
+    motion_scan.save_report(report, report_file)
+    with open(report_file) as f:
+        loaded = json.load(f, parse_constant=_reject_constant)
+    assert loaded == report
+
+
+def _reject_constant(name):
+    raise ValueError("{:s} in the report".format(name))
@@ -0,0 +1,54 @@
+import glob
+import json
+import os
+
+import pytest
+import torch
+
+from utils.profiler import EpochProfiler, build_profiler, parse_profile_range
+
+
+def _run_epochs(profiler, num_epochs):
+    model = torch.nn.Linear(8, 8)
+    for _ in range(num_epochs):
+        model(torch.randn(4, 8)).sum().backward()
+        profiler.step()
+    return
+
+
+def test_trace_files_are_written(tmp_path):
+    out_dir = str(tmp_path)
+    profiler = EpochProfiler(out_dir, 2, 3)
+    _run_epochs(profiler, 5)
+    profiler.close()
+
+    with open(os.path.join(out_dir, 'trace_2-3.json')) as f:
+        trace = json.load(f)
+    assert len(trace['traceEvents']) > 0
+
+    tb_traces = glob.glob(os.path.join(out_dir, '*.pt.trace.json'))
+    assert len(tb_traces) == 1
+    with open(tb_traces[0]) as f:
+        assert json.load(f) == trace
+
+
+def test_single_epoch_from_config(tmp_path):
+    profiler = build_profiler({'profile_epochs': 1}, str(tmp_path))
+    _run_epochs(profiler, 2)
+    assert os.path.exists(str(tmp_path / 'trace_1-1.json'))
+
+
+@pytest.mark.parametrize('profile_range, expected', [
+    ('5', (5, 5)),
+    ('5,7', (5, 7)),
+    (5, (5, 5)),
+    ([2, 3], (2, 3)),
+])
+def test_parse_profile_range(profile_range, expected):
+    assert parse_profile_range(profile_range) == expected
+
+
+@pytest.mark.parametrize('profile_range', ['', '7,5', '0', '1,2,3', 'a,b'])
+def test_parse_profile_range_rejects(profile_range):
+    with pytest.raises(ValueError):
+        parse_profile_range(profile_range)
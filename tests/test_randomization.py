@@ -0,0 +1,99 @@
+import math
+
+import pytest
+import torch
+
+from utils import randomization
+
+NUM_SAMPLES = 200000
+
+
+def _generator():
+    return torch.Generator().manual_seed(0)
+
+
+def test_gaussian():
+    samples = randomization.sample('gaussian', (2., 0.5), (NUM_SAMPLES,), generator=_generator())
+    assert samples.mean().item() == pytest.approx(2., abs=0.01)
+    assert samples.std().item() == pytest.approx(0.5, abs=0.01)
+
+
+def test_uniform():
+    samples = randomization.sample('uniform', (-1., 3.), (NUM_SAMPLES,), generator=_generator())
+    assert samples.min().item() >= -1.
+    assert samples.max().item() <= 3.
+    assert samples.mean().item() == pytest.approx(1., abs=0.02)
+    assert samples.var().item() == pytest.approx(16. / 12., abs=0.02)
+
+
+def test_loguniform():
+    samples = randomization.sample('loguniform', (0.1, 10.), (NUM_SAMPLES,), generator=_generator())
+    assert samples.min().item() >= 0.1
+    assert samples.max().item() <= 10.
+    log_samples = torch.log(samples)
+    assert log_samples.mean().item() == pytest.approx(0., abs=0.02)
+    assert log_samples.var().item() == pytest.approx((2 * math.log(10.)) ** 2 / 12., abs=0.03)
+
+
+def test_unsupported_distribution():
+    with pytest.raises(ValueError):
+        randomization.sample('beta', (0., 1.), (4,))
+
+
+@pytest.mark.parametrize('sched, step, expected', [
+    (None, 0, 1.),
+    ('linear', 0, 0.),
+    ('linear', 50, 0.5),
+    ('linear', 200, 1.),
+    ('constant', 99, 0.),
+    ('constant', 100, 1.),
+])
+def test_schedule_scaling(sched, step, expected):
+    params = {'schedule': sched, 'schedule_steps': 100}
+    assert randomization.schedule_scaling(params, step) == pytest.approx(expected)
+
+
+def test_scheduled_range():
+    additive = {'operation': 'additive', 'distribution': 'uniform', 'range': [-2., 4.], 'schedule': 'linear', 'schedule_steps': 100}
+    assert randomization.scheduled_range(additive, 50) == pytest.approx((-1., 2.))
+
+    scaling = {'operation': 'scaling', 'distribution': 'uniform', 'range': [0.5, 1.5], 'schedule': 'linear', 'schedule_steps': 100}
+    assert randomization.scheduled_range(scaling, 0) == pytest.approx((1., 1.))
+    assert randomization.scheduled_range(scaling, 50) == pytest.approx((0.75, 1.25))
+
+    # a scaled gaussian moves its mean towards 1 and its std towards 0
+    gaussian = {'operation': 'scaling', 'distribution': 'gaussian', 'range': [2., 0.4], 'schedule': 'linear', 'schedule_steps': 100}
+    assert randomization.scheduled_range(gaussian, 50) == pytest.approx((1.5, 0.2))
+
+    assert randomization.scheduled_range({'operation': 'additive'}, 0, 'range_correlated') == (0., 0.)
+
+
+def test_sample_params():
+    original = torch.tensor([1., 2., 4.], dtype=torch.float64)
+    scaling = {'operation': 'scaling', 'distribution': 'uniform', 'range': [0.5, 1.5]}
+    values = randomization.sample_params(scaling, original, 1000, 0, generator=_generator())
+    assert values.shape == (1000, 3)
+    assert values.dtype == torch.float64
+    ratio = values / original
+    assert ratio.min().item() >= 0.5 and ratio.max().item() <= 1.5
+    # every env and value gets its own draw
+    assert torch.unique(ratio).numel() == ratio.numel()
+
+    additive = {'operation': 'additive', 'distribution': 'gaussian', 'range': [0., 0.1]}
+    values = randomization.sample_params(additive, original, NUM_SAMPLES, 0, generator=_generator())
+    assert (values - original).mean(dim=0) == pytest.approx(torch.zeros(3, dtype=torch.float64), abs=0.01)
+    assert (values - original).std(dim=0) == pytest.approx(torch.full((3,), 0.1, dtype=torch.float64), abs=0.01)
+
+
+def test_scale_correlated():
+    corr = torch.randn(NUM_SAMPLES, generator=_generator())
+    gaussian = randomization.scale_correlated('gaussian', (1., 0.2), corr)
+    assert gaussian.mean().item() == pytest.approx(1., abs=0.01)
+    assert gaussian.std().item() == pytest.approx(0.2, abs=0.01)
+
+    # as in apply_randomizations, a uniform range scales a normal draw
+    uniform = randomization.scale_correlated('uniform', (-0.1, 0.3), corr)
+    assert torch.equal(uniform, corr * 0.4 - 0.1)
+
+    with pytest.raises(ValueError):
+        randomization.scale_correlated('loguniform', (0.1, 1.), corr)
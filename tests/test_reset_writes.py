@@ -0,0 +1,62 @@
+import torch
+
+from env.tasks import humanoid_task
+from env.tasks.skillmimic import SkillMimicBallPlay
+
+NUM_ENVS = 4
+
+
+class _WriteCountingGym():
+    # records the actor ids of every indexed state write
+    def __init__(self):
+        self.root_writes = []
+        self.dof_writes = []
+
+    def set_actor_root_state_tensor_indexed(self, sim, states, actor_ids, num_actors):
+        assert num_actors == len(actor_ids)
+        self.root_writes.append(actor_ids.tolist())
+
+    def set_dof_state_tensor_indexed(self, sim, states, actor_ids, num_actors):
+        assert num_actors == len(actor_ids)
+        self.dof_writes.append(actor_ids.tolist())
+
+
+def _make_task(monkeypatch):
+    monkeypatch.setattr(humanoid_task.gymtorch, 'unwrap_tensor', lambda tensor: tensor)
+    task = SkillMimicBallPlay.__new__(SkillMimicBallPlay)
+    task.gym = _WriteCountingGym()
+    task.sim = None
+    task.num_envs = NUM_ENVS
+    task._sim_tensor_refresh_fns = {}
+    task._sim_tensor_stale = {name: False for name in ['dof_state', 'root_state', 'rigid_body_state', 'contact_force']}
+    task._root_states = torch.zeros(2 * NUM_ENVS, 13)
+    task._dof_state = torch.zeros(NUM_ENVS * 5, 2)
+    # humanoid and ball of env i are actors 2i and 2i + 1
+    task._humanoid_actor_ids = 2 * torch.arange(NUM_ENVS)
+    task._tar_actor_ids = 2 * torch.arange(NUM_ENVS) + 1
+    task._all_env_ids = torch.arange(NUM_ENVS)
+    task.progress_buf = torch.ones(NUM_ENVS, dtype=torch.long)
+    task.reset_buf = torch.ones(NUM_ENVS, dtype=torch.long)
+    task._terminate_buf = torch.ones(NUM_ENVS, dtype=torch.long)
+    return task
+
+
+def test_one_root_and_one_dof_write_per_reset(monkeypatch):
+    task = _make_task(monkeypatch)
+    task._reset_env_tensors(torch.tensor([0, 2, 3]))
+
+    # humanoids and balls in one root write, the humanoids in one dof write
+    assert task.gym.root_writes == [[0, 4, 6, 1, 5, 7]]
+    assert task.gym.dof_writes == [[0, 4, 6]]
+    assert task.progress_buf.tolist() == [0, 1, 0, 0]
+    assert task._sim_tensor_stale == {'dof_state': False, 'root_state': False,
+                                      'rigid_body_state': True, 'contact_force': True}
+
+
+def test_masked_reset_writes_every_actor_once(monkeypatch):
+    task = _make_task(monkeypatch)
+    task._reset_env_tensors_masked(torch.tensor([False, True, False, False]))
+
+    assert task.gym.root_writes == [[0, 2, 4, 6, 1, 3, 5, 7]]
+    assert task.gym.dof_writes == [[0, 2, 4, 6]]
+    assert task.progress_buf.tolist() == [1, 0, 1, 1]
@@ -0,0 +1,57 @@
+from types import SimpleNamespace
+
+import torch
+
+from utils.rollout_recorder import RolloutRecorder, build_rollout_recorder
+
+NUM_ENVS = 5
+NUM_BODIES = 4
+NUM_STEPS = 11
+
+
+def _task_states(num_steps):
+    # the body and ball transforms of every env over num_steps steps
+    return {
+        'body_pos': torch.randn(num_steps, NUM_ENVS, NUM_BODIES, 3),
+        'body_rot': torch.randn(num_steps, NUM_ENVS, NUM_BODIES, 4),
+        'target_states': torch.randn(num_steps, NUM_ENVS, 13),
+    }
+
+
+def test_round_trip(tmp_path):
+    env_ids = [3, 0]
+    states = _task_states(NUM_STEPS)
+    # 11 steps over chunks of 4, the last chunk is partial
+    recorder = RolloutRecorder(str(tmp_path), env_ids, NUM_BODIES, 'cpu', chunk_size=4)
+    for t in range(NUM_STEPS):
+        task = SimpleNamespace(_rigid_body_pos=states['body_pos'][t], _rigid_body_rot=states['body_rot'][t],
+                               _target_states=states['target_states'][t].clone())
+        recorder.record_task(task)
+    recorder.close()
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['env0.pt', 'env3.pt']
+    for env_id in env_ids:
+        motion = torch.load(str(tmp_path / 'env{:d}.pt'.format(env_id)))
+        # the dict and shapes the blender scripts read
+        assert set(motion) == {'dofpos', 'dofrot', 'ballpos', 'ballrot'}
+        assert torch.equal(motion['dofpos'], states['body_pos'][:, env_id])
+        assert torch.equal(motion['dofrot'], states['body_rot'][:, env_id])
+        assert torch.equal(motion['ballpos'], states['target_states'][:, env_id, 0:3])
+        assert torch.equal(motion['ballrot'], states['target_states'][:, env_id, 3:7])
+
+
+def test_close_once(tmp_path):
+    recorder = RolloutRecorder(str(tmp_path), [1], NUM_BODIES, 'cpu', chunk_size=8)
+    states = _task_states(3)
+    for t in range(3):
+        recorder.record(states['body_pos'][t], states['body_rot'][t],
+                        states['target_states'][t, :, 0:3], states['target_states'][t, :, 3:7])
+    recorder.close()
+    # the atexit close after an explicit one leaves the file as written
+    recorder.close()
+    assert torch.load(str(tmp_path / 'env1.pt'))['dofpos'].shape == (3, NUM_BODIES, 3)
+
+
+def test_disabled_without_out_dir():
+    task = SimpleNamespace(num_bodies=NUM_BODIES, device='cpu')
+    assert build_rollout_recorder({}, task) is None
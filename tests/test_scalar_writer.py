@@ -0,0 +1,100 @@
+import torch
+
+from utils.scalar_writer import BatchedScalarWriter
+
+
+class _CountingWriter():
+    # records what reaches the SummaryWriter
+    def __init__(self):
+        self.scalars = []
+        self.calls = []
+
+    def add_scalar(self, tag, scalar_value, global_step=None, walltime=None):
+        self.scalars.append((tag, scalar_value, global_step, walltime))
+
+    def add_histogram(self, tag, values, global_step=None):
+        self.calls.append('add_histogram')
+
+    def flush(self):
+        self.calls.append('flush')
+
+    def close(self):
+        self.calls.append('close')
+
+
+def _count_host_copies(monkeypatch):
+    copies = []
+    cpu = torch.Tensor.cpu
+
+    def counting_cpu(tensor, *args, **kwargs):
+        copies.append(tuple(tensor.shape))
+        return cpu(tensor, *args, **kwargs)
+
+    def no_item(tensor):
+        raise AssertionError("a scalar was read back on its own")
+
+    monkeypatch.setattr(torch.Tensor, 'cpu', counting_cpu)
+    monkeypatch.setattr(torch.Tensor, 'item', no_item)
+    return copies
+
+
+def test_one_host_copy_per_flush(monkeypatch):
+    counting = _CountingWriter()
+    writer = BatchedScalarWriter(counting)
+    copies = _count_host_copies(monkeypatch)
+
+    writer.add_scalar('losses/a_loss', torch.tensor(0.5), 10, walltime=1.)
+    writer.add_scalar('info/lr', 3e-4, 10, walltime=2.)
+    writer.add_scalar('losses/c_loss', torch.tensor([2.]), 10, walltime=3.)
+    writer.add_scalar('info/kl', torch.tensor(1, dtype=torch.int32), 11, walltime=4.)
+    # nothing is written or copied before the flush
+    assert counting.scalars == [] and copies == []
+
+    writer.flush_scalars()
+    assert copies == [(3,)]
+    # every scalar in the order it was added, with its step and walltime
+    assert counting.scalars == [('losses/a_loss', 0.5, 10, 1.), ('info/lr', 3e-4, 10, 2.),
+                                ('losses/c_loss', 2., 10, 3.), ('info/kl', 1., 11, 4.)]
+
+    writer.flush_scalars()
+    assert copies == [(3,)] and len(counting.scalars) == 4
+
+
+def test_flush_and_close_write_pending(monkeypatch):
+    counting = _CountingWriter()
+    writer = BatchedScalarWriter(counting)
+    writer.add_scalar('a', torch.tensor(1.), 0)
+    writer.flush()
+    assert [s[0] for s in counting.scalars] == ['a'] and counting.calls == ['flush']
+
+    writer.add_scalar('b', 2., 1)
+    writer.add_histogram('h', torch.zeros(3), 1)
+    writer.close()
+    assert [s[0] for s in counting.scalars] == ['a', 'b']
+    assert counting.calls == ['flush', 'add_histogram', 'close']
+
+
+def test_hrl_reward_logging_keeps_meter():
+    from rl_games.algos_torch import torch_ext
+    from learning.hrl_agent_discrete import HRLAgentDiscrete
+
+    agent = HRLAgentDiscrete.__new__(HRLAgentDiscrete)
+    agent._llc_steps = 5
+    agent.game_rewards = torch_ext.AverageMeter(1, 100)
+    # rl_games updates the meter with current_rewards[done_indices], [num_done, 1, value_size]
+    agent.game_rewards.update(torch.tensor([[[1.]], [[3.]]]))
+    counting = _CountingWriter()
+    writer = BatchedScalarWriter(counting)
+
+    for epoch_num in range(3):
+        # the logging of an epoch, then the printed mean
+        mean_rewards = agent._get_mean_rewards_tensor()
+        writer.add_scalar('rewards0/iter', mean_rewards[0], epoch_num)
+        writer.flush_scalars()
+        assert agent._get_mean_rewards().tolist() == [10.]
+        assert agent.game_rewards.mean.tolist() == [[2.]]
+    assert [s[1] for s in counting.scalars] == [10.] * 3
+
+    # the meter carries its own mean forward
+    agent.game_rewards.update(torch.tensor([[[2.]], [[2.]]]))
+    assert agent.game_rewards.mean.tolist() == [[2.]]
@@ -0,0 +1,216 @@
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+import torch
+
+from env.tasks.hrl_scoring_layup import HRLScoringLayup
+from env.tasks.skillmimic import SkillMimicBallPlay
+
+SIM_TENSORS = ['dof_state', 'root_state', 'rigid_body_state', 'contact_force']
+
+
+class _CountingGym():
+    # each refresh copies the simulation step count into the tensor, so reads show which state they see
+    def __init__(self, tensors):
+        self.sim_step = 0
+        self.calls = Counter()
+        self._tensors = tensors
+
+    def simulate(self, sim):
+        self.sim_step += 1
+        self.calls['simulate'] += 1
+
+    def _refresh(self, name):
+        def refresh(sim):
+            self.calls[name] += 1
+            self._tensors[name].fill_(self.sim_step)
+        return refresh
+
+
+def _make_task():
+    task = SkillMimicBallPlay.__new__(SkillMimicBallPlay)
+    tensors = {name: torch.zeros(2) for name in SIM_TENSORS}
+    task.gym = _CountingGym(tensors)
+    task.sim = None
+    task.viewer = None
+    task.evts = []
+    task.control_freq_inv = 2
+    task.step_timer = None
+    task.projtype = 'None'
+    task.progress_buf = torch.zeros(2, dtype=torch.long)
+    task.extras = {}
+    task._terminate_buf = torch.zeros(2, dtype=torch.long)
+    task._sim_tensor_refresh_fns = {name: task.gym._refresh(name) for name in SIM_TENSORS}
+    task._sim_tensor_stale = {name: False for name in SIM_TENSORS}
+    task._dof_pos = tensors['dof_state']
+    task._humanoid_root_states = tensors['root_state']
+    task._target_states = tensors['root_state']
+    task._rigid_body_pos = tensors['rigid_body_state']
+    task._contact_forces = tensors['contact_force']
+    task._tar_contact_forces = tensors['contact_force']
+
+    # the attributes the real methods read, recording the simulation step each of them saw
+    task.seen = {}
+
+    def compute_hoi_observations(env_ids=None):
+        task.seen['hoi'] = (task._rigid_body_pos[0].item(), task._dof_pos[0].item(), task._target_states[0].item())
+
+    def compute_observations(env_ids=None):
+        task.seen['obs'] = (task._rigid_body_pos[0].item(), task._contact_forces[0].item(),
+                            task._humanoid_root_states[0].item(), task._target_states[0].item())
+
+    def compute_reward(actions):
+        task._contact_forces, task._tar_contact_forces
+
+    def compute_reset():
+        task._contact_forces, task._rigid_body_pos
+
+    task._compute_hoi_observations = compute_hoi_observations
+    task._compute_observations = compute_observations
+    task._compute_reward = compute_reward
+    task._compute_reset = compute_reset
+    task._update_hist_hoi_obs = lambda env_ids=None: None
+    task.actions = None
+    return task
+
+
+def _step(task):
+    task.gym.calls.clear()
+    task._physics_step()
+    task.post_physics_step()
+    return task.gym.calls
+
+
+def test_each_tensor_refreshed_once_per_step():
+    task = _make_task()
+    _step(task)
+    for n in range(2, 6):
+        calls = _step(task)
+        assert calls['simulate'] == task.control_freq_inv
+        for name in SIM_TENSORS:
+            assert calls[name] == 1, name
+        pre_step_sim = (n - 1) * task.control_freq_inv
+        # the hoi observations see the state from before simulate, the policy observations the one after it
+        assert task.seen['hoi'] == (pre_step_sim, pre_step_sim, pre_step_sim)
+        assert task.seen['obs'] == (n * task.control_freq_inv,) * 4
+
+
+def test_pre_step_refresh_only_when_stale():
+    task = _make_task()
+    _step(task)
+    # the policy observations refreshed root and rigid body states, only dof_state is left stale
+    assert [name for name, stale in task._sim_tensor_stale.items() if stale] == ['dof_state']
+    task.gym.calls.clear()
+    for name in task._get_pre_step_sim_tensors():
+        task._refresh_sim_tensor(name)
+    assert task.gym.calls == Counter({'dof_state': 1})
+
+
+HRL_NUM_ENVS = 4
+HRL_NUM_BODIES = 5
+
+
+def _make_hrl_task():
+    # an HRL task with its own observation, task observation, reward and reset code, on gym-shaped state tensors
+    task = HRLScoringLayup.__new__(HRLScoringLayup)
+    n = HRL_NUM_ENVS
+    tensors = {'root_state': torch.rand(n * 2, 13), 'dof_state': torch.rand(n * 6, 2),
+               'rigid_body_state': torch.rand(n * (HRL_NUM_BODIES + 1), 13),
+               'contact_force': torch.rand(n * (HRL_NUM_BODIES + 1), 3)}
+    task.gym = _CountingGym(tensors)
+    task.sim = None
+    task.viewer = None
+    task.device = 'cpu'
+    task.num_envs = n
+    task.control_freq_inv = 2
+    task.step_timer = None
+    task.projtype = 'None'
+    task._sim_tensor_refresh_fns = {name: task.gym._refresh(name) for name in SIM_TENSORS}
+    task._sim_tensor_stale = {name: False for name in SIM_TENSORS}
+
+    root_states = tensors['root_state'].view(n, 2, 13)
+    task._root_states = tensors['root_state']
+    task._humanoid_root_states = root_states[:, 0]
+    task._target_states = root_states[:, 1]
+    dof_state = tensors['dof_state'].view(n, 6, 2)
+    task._dof_state = tensors['dof_state']
+    task._dof_pos = dof_state[..., 0]
+    task._dof_vel = dof_state[..., 1]
+    rigid_body_state = tensors['rigid_body_state'].view(n, HRL_NUM_BODIES + 1, 13)
+    task._rigid_body_state = tensors['rigid_body_state']
+    task._rigid_body_pos = rigid_body_state[:, :HRL_NUM_BODIES, 0:3]
+    task._rigid_body_rot = rigid_body_state[:, :HRL_NUM_BODIES, 3:7]
+    task._rigid_body_vel = rigid_body_state[:, :HRL_NUM_BODIES, 7:10]
+    task._rigid_body_ang_vel = rigid_body_state[:, :HRL_NUM_BODIES, 10:13]
+    contact_forces = tensors['contact_force'].view(n, HRL_NUM_BODIES + 1, 3)
+    task._contact_forces = contact_forces[:, :HRL_NUM_BODIES]
+    task._tar_contact_forces = contact_forces[:, HRL_NUM_BODIES]
+
+    task._local_root_obs = False
+    task._root_height_obs = True
+    task._contact_body_ids = torch.tensor([HRL_NUM_BODIES - 2, HRL_NUM_BODIES - 1])
+    task._enable_task_obs = True
+    task._goal_position = torch.rand(n, 2)
+    task.reached_target = torch.zeros(n, dtype=torch.bool)
+    task._enable_early_termination = True
+    task._termination_heights = torch.tensor(0.15)
+    task.max_episode_length = 800
+    task.progress_buf = torch.zeros(n, dtype=torch.long)
+    task.rew_buf = torch.zeros(n)
+    task.reset_buf = torch.zeros(n, dtype=torch.long)
+    task._terminate_buf = torch.zeros(n, dtype=torch.long)
+    task.extras = {}
+    task.actions = None
+    obs_size = task._compute_humanoid_obs().shape[-1] + task._compute_obj_obs().shape[-1] + task._compute_task_obs().shape[-1]
+    task.obs_buf = torch.zeros(n, obs_size)
+    return task, tensors
+
+
+def test_hrl_task_tensors_refreshed_once_per_step():
+    task, tensors = _make_hrl_task()
+    _step(task)
+    for n in range(2, 6):
+        obs = task.obs_buf.clone()
+        calls = _step(task)
+        assert calls['simulate'] == task.control_freq_inv
+        # the observations, task observations, reward and reset read every tensor but the dof states, once
+        assert {name: calls[name] for name in SIM_TENSORS} == {'dof_state': 0, 'root_state': 1,
+                                                              'rigid_body_state': 1, 'contact_force': 1}
+        sim_step = n * task.control_freq_inv
+        for name in ['root_state', 'rigid_body_state', 'contact_force']:
+            assert (tensors[name] == sim_step).all(), name
+        assert not torch.equal(task.obs_buf, obs)
+    assert task.progress_buf.tolist() == [5] * HRL_NUM_ENVS
+
+
+def _time_reads(read, num_reads=20000):
+    start = time.perf_counter()
+    for _ in range(num_reads):
+        read()
+    return (time.perf_counter() - start) / num_reads
+
+
+def test_view_read_overhead():
+    task, tensors = _make_hrl_task()
+    _step(task)
+    # the staleness checks of a step: one per view read
+    reads = Counter()
+    refresh = task._refresh_sim_tensor
+
+    def counting_refresh(name):
+        reads[name] += 1
+        return refresh(name)
+
+    task._refresh_sim_tensor = counting_refresh
+    _step(task)
+    del task._refresh_sim_tensor
+    num_reads = sum(reads.values())
+    assert num_reads > 0
+
+    plain = SimpleNamespace(_rigid_body_pos=task._rigid_body_pos)
+    read_overhead = min(_time_reads(lambda: task._rigid_body_pos) for _ in range(3)) - \
+        min(_time_reads(lambda: plain._rigid_body_pos) for _ in range(3))
+    step_time = min(_time_reads(lambda: _step(task), num_reads=20) for _ in range(3))
+    # the checks of a step cost less than 1% of the step, which refreshes 3 tensors instead of 4
+    assert num_reads * read_overhead < 0.01 * step_time
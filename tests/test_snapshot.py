@@ -0,0 +1,111 @@
+from types import SimpleNamespace
+
+import torch
+
+from env.tasks import humanoid_task
+from env.tasks.skillmimic import SkillMimicBallPlay
+
+NUM_ENVS = 4
+NUM_DOF = 5
+
+
+class _RecordingGym():
+    def __init__(self):
+        self.root_writes = []
+        self.dof_writes = []
+
+    def set_actor_root_state_tensor_indexed(self, sim, states, actor_ids, num_actors):
+        self.root_writes.append((states.clone(), actor_ids.tolist()))
+
+    def set_dof_state_tensor_indexed(self, sim, states, actor_ids, num_actors):
+        self.dof_writes.append((states.clone(), actor_ids.tolist()))
+
+
+def _make_task(monkeypatch):
+    monkeypatch.setattr(humanoid_task.gymtorch, 'unwrap_tensor', lambda tensor: tensor)
+    task = SkillMimicBallPlay.__new__(SkillMimicBallPlay)
+    task.gym = _RecordingGym()
+    task.sim = None
+    task.num_envs = NUM_ENVS
+    task._sim_tensor_refresh_fns = {}
+    task._sim_tensor_stale = {name: False for name in ['dof_state', 'root_state', 'rigid_body_state', 'contact_force']}
+    # the layout of the isaacgym state tensors, humanoid and ball of each env
+    task._root_states = torch.zeros(2 * NUM_ENVS, 13)
+    task._humanoid_root_states = task._root_states.view(NUM_ENVS, 2, 13)[..., 0, :]
+    task._target_states = task._root_states.view(NUM_ENVS, 2, 13)[..., 1, :]
+    task._dof_state = torch.zeros(NUM_ENVS * NUM_DOF, 2)
+    task._dof_pos = task._dof_state.view(NUM_ENVS, NUM_DOF, 2)[..., 0]
+    task._dof_vel = task._dof_state.view(NUM_ENVS, NUM_DOF, 2)[..., 1]
+    task._humanoid_actor_ids = 2 * torch.arange(NUM_ENVS)
+    task._tar_actor_ids = 2 * torch.arange(NUM_ENVS) + 1
+    task._all_env_ids = torch.arange(NUM_ENVS)
+    task.progress_buf = torch.zeros(NUM_ENVS, dtype=torch.long)
+    task.reset_buf = torch.zeros(NUM_ENVS, dtype=torch.long)
+    task._terminate_buf = torch.zeros(NUM_ENVS, dtype=torch.long)
+    task.obs_buf = torch.zeros(NUM_ENVS, 7)
+    task.hoi_data_batch = torch.zeros(NUM_ENVS, 6, 3)
+    task.hoi_data_label_batch = torch.zeros(NUM_ENVS, 4)
+    task._curr_ref_obs = torch.zeros(NUM_ENVS, 3)
+    task._hist_ref_obs = torch.zeros(NUM_ENVS, 3)
+    task._curr_obs = torch.zeros(NUM_ENVS, 3)
+    task._hist_obs = torch.zeros(NUM_ENVS, 3)
+    task.reached_target = torch.zeros(NUM_ENVS, dtype=torch.long)
+    task._motion_data = SimpleNamespace(envid2motid=torch.zeros(NUM_ENVS, dtype=torch.long),
+                                        envid2episode_lengths=torch.zeros(NUM_ENVS, dtype=torch.long),
+                                        reward_weights={'p': torch.zeros(NUM_ENVS), 'op': torch.zeros(NUM_ENVS)})
+    _scramble(task)
+    return task
+
+
+def _scramble(task):
+    # stands in for stepping the simulation: every tracked tensor gets new values
+    for tensor in task._get_snapshot_tensors().values():
+        if tensor.dtype == torch.long:
+            tensor.random_(0, 100)
+        else:
+            tensor.normal_()
+    return
+
+
+def test_round_trip(monkeypatch):
+    task = _make_task(monkeypatch)
+    snapshot = task.snapshot()
+    root_states = task._root_states.clone()
+    dof_state = task._dof_state.clone()
+
+    _scramble(task)
+    task.restore(snapshot)
+
+    for name, tensor in task._get_snapshot_tensors().items():
+        assert torch.equal(tensor, snapshot[name]), name
+    assert torch.equal(task._root_states, root_states)
+    assert torch.equal(task._dof_state, dof_state)
+    # the restored state is pushed to the simulation for every actor
+    assert len(task.gym.root_writes) == 1 and len(task.gym.dof_writes) == 1
+    assert torch.equal(task.gym.root_writes[0][0], root_states)
+    assert sorted(task.gym.root_writes[0][1]) == list(range(2 * NUM_ENVS))
+    assert torch.equal(task.gym.dof_writes[0][0], dof_state)
+
+
+def test_snapshot_is_a_copy(monkeypatch):
+    task = _make_task(monkeypatch)
+    snapshot = task.snapshot()
+    expected = {name: tensor.clone() for name, tensor in snapshot.items()}
+    _scramble(task)
+    for name, tensor in snapshot.items():
+        assert torch.equal(tensor, expected[name]), name
+
+
+def test_restore_one_env_into_others(monkeypatch):
+    task = _make_task(monkeypatch)
+    snapshot = task.snapshot(torch.tensor([1]))
+    before = {name: tensor.clone() for name, tensor in task._get_snapshot_tensors().items()}
+
+    env_ids = torch.tensor([0, 3])
+    task.restore(snapshot, env_ids)
+
+    for name, tensor in task._get_snapshot_tensors().items():
+        assert torch.equal(tensor[env_ids], snapshot[name].expand_as(tensor[env_ids])), name
+        assert torch.equal(tensor[1:3], before[name][1:3]), name
+    assert task.gym.root_writes[0][1] == [0, 6, 1, 7]
+    assert task.gym.dof_writes[0][1] == [0, 6]
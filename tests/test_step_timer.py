@@ -0,0 +1,178 @@
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+import torch
+from gym import spaces
+from rl_games.algos_torch import torch_ext
+from rl_games.common import tr_helpers
+
+from env.tasks.base_task import BaseTask
+from env.tasks.vec_task_wrappers import VecTaskPythonWrapper
+from utils import step_timer
+from utils.step_timer import StepTimer, time_phase
+
+NUM_ENVS = 4
+HORIZON = 5
+# fake milliseconds each phase takes
+PHASE_MS = {'env_reset': 0.5, 'inference': 2., 'pre_physics_step': 1., 'simulate': 4., 'observations': 1.,
+            'post_physics_step': 3., 'next_values': 0.25}
+
+
+class _Clock():
+    def __init__(self):
+        self.ms = 0.
+
+    def advance(self, name):
+        self.ms += PHASE_MS[name]
+
+    def perf_counter(self):
+        return self.ms / 1000.
+
+
+class _ClockTask(BaseTask):
+    # a task whose phases take PHASE_MS on the clock, with the observations nested in post_physics_step
+    def __init__(self, clock):
+        self.clock = clock
+        self.device = 'cpu'
+        self.num_envs = NUM_ENVS
+        self.num_obs = 6
+        self.num_states = 0
+        self.num_actions = 3
+        self.control_freq_inv = 2
+        self.randomize = False
+        self.sync_debug = False
+        self.dr_randomizations = {}
+        self.step_timer = None
+        self.viewer = None
+        self.sim = None
+        self.gym = SimpleNamespace(simulate=lambda sim: clock.advance('simulate'), fetch_results=lambda sim, wait: None)
+        self.obs_buf = torch.zeros(NUM_ENVS, self.num_obs)
+        self.rew_buf = torch.zeros(NUM_ENVS)
+        self.reset_buf = torch.zeros(NUM_ENVS, dtype=torch.long)
+        self.extras = {'terminate': torch.zeros(NUM_ENVS, dtype=torch.long)}
+
+    def get_num_amp_obs(self):
+        return 1
+
+    def reset(self, env_ids=None):
+        self.clock.advance('env_reset')
+
+    def pre_physics_step(self, actions):
+        self.clock.advance('pre_physics_step')
+
+    def post_physics_step(self):
+        with time_phase(self.step_timer, 'observations'):
+            self.clock.advance('observations')
+            self.obs_buf.normal_()
+        self.clock.advance('post_physics_step')
+        self.rew_buf.fill_(1.)
+
+
+class _CountingWriter():
+    def __init__(self):
+        self.scalars = {}
+
+    def add_scalar(self, tag, scalar_value, global_step=None):
+        self.scalars[tag] = (scalar_value, global_step)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(step_timer, 'time', SimpleNamespace(perf_counter=clock.perf_counter))
+    # VecTask builds its spaces with np.Inf, which requirements.txt's numpy 1.21 has and numpy 2 dropped
+    monkeypatch.setattr(np, 'Inf', np.inf, raising=False)
+    return clock
+
+
+def _make_playing_agent(make_toy_agent, clock, timer):
+    task = _ClockTask(clock)
+    agent = make_toy_agent(horizon_length=HORIZON, num_actors=NUM_ENVS, num_agents=1, value_size=1,
+                           use_action_masks=False, _masked_reset=False, is_tensor_obses=True, clip_actions=False,
+                           gamma=0.99, tau=0.95, rewards_shaper=tr_helpers.DefaultRewardsShaper(), writer=_CountingWriter(),
+                           vec_env=VecTaskPythonWrapper(task, 'cpu', clip_observations=np.inf))
+    agent.env_info = {'observation_space': spaces.Box(-np.inf, np.inf, (6,)), 'action_space': spaces.Box(-1., 1., (3,))}
+    agent.game_rewards = torch_ext.AverageMeter(1, 100)
+    agent.game_lengths = torch_ext.AverageMeter(1, 100)
+    agent.init_tensors()
+    agent.obs = agent.env_reset()
+    agent.done_indices = torch.tensor([], dtype=torch.long)
+    clock.ms = 0.
+
+    def timed(name, fn):
+        def call(*args, **kwargs):
+            clock.advance(name)
+            return fn(*args, **kwargs)
+        return call
+
+    agent.get_action_values = timed('inference', agent.get_action_values)
+    # the toy network has no separate critic head
+    agent._eval_critic = timed('next_values', lambda obs_dict: torch.zeros(NUM_ENVS, 1))
+    agent._step_timer = timer
+    task.step_timer = timer
+    return agent
+
+
+def test_phases_aggregate_and_reset(clock):
+    timer = StepTimer('cpu')
+    assert not timer.use_cuda_events
+    for _ in range(3):
+        with timer.phase('env_step'):
+            clock.advance('pre_physics_step')
+            with timer.phase('simulate'):
+                clock.advance('simulate')
+    assert timer.summary() == pytest.approx({'env_step': 15., 'simulate': 12.})
+    # a new period starts after each summary
+    assert timer.summary() == {}
+
+
+def test_play_steps_phases_logged(make_toy_agent, clock):
+    timer = StepTimer('cpu')
+    agent = _make_playing_agent(make_toy_agent, clock, timer)
+    batch_dict = agent.play_steps()
+    assert batch_dict['obses'].shape == (HORIZON * NUM_ENVS, 6)
+
+    per_step_ms = {'env_reset': PHASE_MS['env_reset'], 'inference': PHASE_MS['inference'],
+                   'pre_physics_step': PHASE_MS['pre_physics_step'],
+                   'simulate': PHASE_MS['simulate'] * 2,
+                   'observations': PHASE_MS['observations'],
+                   'post_physics_step': PHASE_MS['observations'] + PHASE_MS['post_physics_step'],
+                   'next_values': PHASE_MS['next_values']}
+    per_step_ms['env_step'] = per_step_ms['pre_physics_step'] + per_step_ms['simulate'] + per_step_ms['post_physics_step']
+    play_step_ms = per_step_ms['env_reset'] + per_step_ms['inference'] + per_step_ms['env_step'] + per_step_ms['next_values']
+    assert clock.ms == pytest.approx(play_step_ms * HORIZON)
+
+    train_info = {'play_time': clock.ms / 1000., 'step_phase_ms': timer.summary()}
+    assert train_info['step_phase_ms'] == pytest.approx({name: ms * HORIZON for name, ms in per_step_ms.items()})
+
+    agent._log_step_timing(train_info, 100)
+    scalars = agent.writer.scalars
+    assert len(scalars) == 2 * len(per_step_ms)
+    for name, ms in per_step_ms.items():
+        assert scalars['step_phases/{:s}_ms'.format(name)] == (pytest.approx(ms), 100)
+        assert scalars['step_phases/{:s}_pct'.format(name)] == (pytest.approx(100. * ms / play_step_ms), 100)
+
+
+def test_play_steps_without_timer(make_toy_agent, clock):
+    agent = _make_playing_agent(make_toy_agent, clock, None)
+    agent.play_steps()
+    agent._log_step_timing({'play_time': 1.}, 100)
+    assert agent.writer.scalars == {}
+
+
+def test_phase_overhead():
+    # the host cost of a timed phase over an untimed one, which is well below 1% of a simulation step
+    timer = StepTimer('cpu')
+    num_phases = 20000
+
+    def run(timer):
+        start = time.perf_counter()
+        for _ in range(num_phases):
+            with time_phase(timer, 'phase'):
+                pass
+        return (time.perf_counter() - start) / num_phases
+
+    overhead = min(run(timer) for _ in range(3)) - min(run(None) for _ in range(3))
+    assert overhead < 20e-6
@@ -0,0 +1,171 @@
+import pytest
+import torch
+
+from env.tasks import humanoid_object_task, humanoid_task
+from env.tasks.skillmimic import SkillMimicBallPlay
+
+NUM_ENVS = 3
+NUM_BODIES = 4
+NUM_DOFS = 6
+# humanoid, ball and projectile
+NUM_ACTORS = 3
+SIM_TENSORS = ['dof_state', 'root_state', 'rigid_body_state', 'contact_force']
+# the tensor reads that copy to the host, the syncs torch.cuda.set_sync_debug_mode reports on a GPU
+HOST_READS = ['item', 'cpu', 'numpy', 'tolist', 'nonzero', '__bool__', '__int__', '__float__']
+
+
+class _SyncGuard():
+    # stands in for torch.cuda.set_sync_debug_mode on the CPU: in "error" mode every host read raises
+    def __init__(self):
+        self.mode = 'default'
+        self.modes = []
+        self._host_reads = {name: getattr(torch.Tensor, name) for name in HOST_READS}
+
+    def set_sync_debug_mode(self, mode):
+        self.mode = mode
+        self.modes.append(mode)
+        for name, read in self._host_reads.items():
+            setattr(torch.Tensor, name, self._raise if mode == 'error' else read)
+
+    @staticmethod
+    def _raise(*args, **kwargs):
+        raise RuntimeError("called a synchronizing operation")
+
+
+class _Gym():
+    def __init__(self, guard):
+        self.guard = guard
+        self.calls = []
+
+    def _call(self, name):
+        # the sync debug mode each gym call of the step ran under
+        self.calls.append((name, self.guard.mode))
+
+    def simulate(self, sim):
+        self._call('simulate')
+
+    def fetch_results(self, sim, wait):
+        self._call('fetch_results')
+
+    def set_dof_position_target_tensor(self, sim, pd_tar):
+        self._call('set_dof_position_target_tensor')
+
+    def set_actor_root_state_tensor_indexed(self, sim, root_states, actor_ids, num_actors):
+        assert torch.equal(actor_ids, torch.arange(NUM_ENVS, dtype=torch.int32) * NUM_ACTORS + 2)
+        self._call('set_actor_root_state_tensor_indexed')
+
+
+@pytest.fixture
+def guard(monkeypatch):
+    monkeypatch.setattr(humanoid_task.gymtorch, 'unwrap_tensor', lambda t: t)
+    monkeypatch.setattr(humanoid_object_task.gymtorch, 'unwrap_tensor', lambda t: t)
+    guard = _SyncGuard()
+    monkeypatch.setattr(torch.cuda, 'set_sync_debug_mode', guard.set_sync_debug_mode)
+    yield guard
+    guard.set_sync_debug_mode('default')
+
+
+def _make_task(guard):
+    # a headless Auto-projectile task with sync debugging on, as env.syncDebug sets it up for a CUDA run
+    task = SkillMimicBallPlay.__new__(SkillMimicBallPlay)
+    task.gym = _Gym(guard)
+    task.sim = None
+    task.viewer = None
+    task.device = 'cpu'
+    task.num_envs = NUM_ENVS
+    task.control_freq_inv = 2
+    task.randomize = False
+    task.sync_debug = True
+    task.dr_randomizations = {}
+    task.step_timer = None
+    task.projtype = 'Auto'
+    task._pd_control = True
+    task._pd_action_offset = torch.zeros(NUM_DOFS)
+    task._pd_action_scale = torch.ones(NUM_DOFS)
+
+    task._sim_tensor_refresh_fns = {name: lambda sim: None for name in SIM_TENSORS}
+    task._sim_tensor_stale = {name: False for name in SIM_TENSORS}
+    task._root_states = torch.zeros(NUM_ENVS * NUM_ACTORS, 13)
+    actor_root_states = task._root_states.view(NUM_ENVS, NUM_ACTORS, 13)
+    task._humanoid_root_states = actor_root_states[:, 0]
+    task._target_states = actor_root_states[:, 1]
+    task._proj_states = actor_root_states[:, 2:]
+    task._proj_actor_ids = torch.arange(NUM_ENVS, dtype=torch.int32) * NUM_ACTORS + 2
+    task._rigid_body_pos = torch.randn(NUM_ENVS, NUM_BODIES, 3)
+    task._rigid_body_vel = torch.randn(NUM_ENVS, NUM_BODIES, 3)
+    task._proj_dist_min, task._proj_dist_max = 4, 5
+    task._proj_h_min, task._proj_h_max = 0.25, 2
+    task._proj_speed_min, task._proj_speed_max = 30, 40
+    task._calc_perturb_times()
+
+    task.progress_buf = torch.zeros(NUM_ENVS, dtype=torch.long)
+    task.obs_buf = torch.zeros(NUM_ENVS, 13)
+    task.rew_buf = torch.zeros(NUM_ENVS)
+    task.reset_buf = torch.zeros(NUM_ENVS, dtype=torch.long)
+    task._terminate_buf = torch.zeros(NUM_ENVS, dtype=torch.long)
+    task.extras = {}
+
+    # device-side stand-ins for the observation, reward and reset kernels
+    task._compute_hoi_observations = lambda env_ids=None: None
+    task._compute_observations = lambda env_ids=None: task.obs_buf.copy_(task._humanoid_root_states)
+    task._compute_reward = lambda actions: task.rew_buf.copy_(actions.sum(dim=-1))
+    task._compute_reset = lambda: task.reset_buf.copy_(task.progress_buf >= 100)
+    task._update_hist_hoi_obs = lambda env_ids=None: None
+    return task
+
+
+def test_headless_step_runs_under_sync_debug(guard):
+    task = _make_task(guard)
+    launch_step = int(task._perturb_timesteps[0])
+    for n in range(launch_step + 1):
+        prev_proj_states = task._proj_states.clone()
+        task.step(torch.rand(NUM_ENVS, NUM_DOFS))
+
+        # every step switches sync debugging on and back off
+        assert guard.modes == ['error', 'default'] * (n + 1)
+        assert guard.mode == 'default'
+        # all the gym calls of the step ran with it on, the projectiles are written by both _update_proj calls
+        step_calls = ['set_dof_position_target_tensor', 'simulate', 'simulate', 'fetch_results',
+                      'set_actor_root_state_tensor_indexed', 'set_actor_root_state_tensor_indexed']
+        assert task.gym.calls[len(step_calls) * n:] == [(name, 'error') for name in step_calls]
+
+        # the projectile launches on the step env 0 reaches the scheduled time step
+        if n < launch_step:
+            assert torch.equal(task._proj_states, prev_proj_states)
+    assert task.progress_buf.tolist() == [launch_step + 1] * NUM_ENVS
+    proj_states = task._proj_states[:, 0]
+    assert ((proj_states[:, 2] >= task._proj_h_min) & (proj_states[:, 2] <= task._proj_h_max)).all()
+    assert torch.equal(proj_states[:, 3:7], torch.tensor([0., 0., 0., 1.]).expand(NUM_ENVS, 4))
+    assert (proj_states[:, 7:10].norm(dim=-1) > 0.).all()
+
+
+def test_reintroduced_sync_raises(guard):
+    task = _make_task(guard)
+    # the host read of the baseline projectile schedule
+    task._update_proj = lambda: task.progress_buf.cpu().numpy()[0]
+    with pytest.raises(RuntimeError, match="synchronizing"):
+        task.step(torch.rand(NUM_ENVS, NUM_DOFS))
+    # the mode is restored for the code after the step
+    assert guard.modes == ['error', 'default']
+    assert task.progress_buf.cpu().tolist() == [0] * NUM_ENVS
+
+
+def test_sync_debug_off(guard):
+    task = _make_task(guard)
+    task.sync_debug = False
+    task.step(torch.rand(NUM_ENVS, NUM_DOFS))
+    assert guard.modes == []
+
+
+def test_launch_follows_env0_progress(guard):
+    task = _make_task(guard)
+    launch_step = int(task._perturb_timesteps[0])
+    # the schedule of the baseline: every env launches when env 0's progress hits the time step, modulo the period
+    task.progress_buf[:] = torch.tensor([launch_step + 1 + launch_step, 3, 7])
+    task.step(torch.rand(NUM_ENVS, NUM_DOFS))
+    assert (task._proj_states[:, 0, 2] >= task._proj_h_min).all()
+
+    task = _make_task(guard)
+    task.progress_buf[:] = torch.tensor([3, launch_step, launch_step])
+    task.step(torch.rand(NUM_ENVS, NUM_DOFS))
+    assert (task._proj_states == 0.).all()
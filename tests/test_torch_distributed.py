@@ -0,0 +1,123 @@
+import os
+import socket
+from types import SimpleNamespace
+
+import pytest
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+
+from utils.torch_distributed import TorchDistributedWrapper, distributed_optimizer
+
+WORLD_SIZE = 2
+
+pytestmark = pytest.mark.skipif(not dist.is_available() or not dist.is_gloo_available(), reason="needs gloo")
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _model(seed):
+    torch.manual_seed(seed)
+    return torch.nn.Sequential(torch.nn.Linear(4, 8), torch.nn.Tanh(), torch.nn.Linear(8, 2))
+
+
+def _loss(model, rank):
+    torch.manual_seed(100 + rank)
+    return model(torch.randn(16, 4)).pow(2).mean()
+
+
+def _check_rank(rank, port):
+    os.environ.update({'MASTER_ADDR': '127.0.0.1', 'MASTER_PORT': str(port),
+                       'RANK': str(rank), 'WORLD_SIZE': str(WORLD_SIZE), 'LOCAL_RANK': str(rank)})
+    wrapper = TorchDistributedWrapper(backend='gloo')
+    try:
+        assert (wrapper.rank, wrapper.rank_size, wrapper.device_name) == (rank, WORLD_SIZE, 'cpu')
+        assert wrapper.is_root() == (rank == 0)
+
+        value = torch.full((3,), float(rank + 1))
+        wrapper.broadcast_value(value, 'lr')
+        assert torch.equal(value, torch.ones(3))
+        assert torch.equal(wrapper.average_value(torch.tensor(float(rank)), 'kl'), torch.tensor(0.5))
+
+        # each rank starts from a different model and its own optimizer state, setup_algo takes rank 0's
+        model = _model(seed=rank)
+        optimizer = torch.optim.Adam(model.parameters(), lr=1e-2)
+        _loss(model, rank).backward()
+        optimizer.step()
+        optimizer.zero_grad()
+        algo = SimpleNamespace(model=model, optimizer=optimizer, has_central_value=False, curr_frames=10 * (rank + 1),
+                               get_stats_weights=lambda: {'running_mean_std': {'running_mean': torch.full((4,), float(rank)),
+                                                                               'count': torch.tensor(rank, dtype=torch.long)}})
+        wrapper.setup_algo(algo)
+        assert algo.curr_frames == 30
+
+        # reference: a single process stepping rank 0's setup with the gradients averaged over both ranks
+        ref_model = _model(seed=0)
+        ref_optimizer = torch.optim.Adam(ref_model.parameters(), lr=1e-2)
+        _loss(ref_model, 0).backward()
+        ref_optimizer.step()
+        ref_optimizer.zero_grad()
+        for p, ref_p in zip(model.parameters(), ref_model.parameters()):
+            assert torch.equal(p, ref_p)
+        grads = [torch.autograd.grad(_loss(ref_model, r), list(ref_model.parameters())) for r in range(WORLD_SIZE)]
+        for ref_p, *rank_grads in zip(ref_model.parameters(), *grads):
+            ref_p.grad = sum(rank_grads) / WORLD_SIZE
+
+        # gradients synchronized and clipped inside skip_synchronize, as calc_gradients does
+        _loss(model, rank).backward()
+        algo.optimizer.synchronize()
+        torch.nn.utils.clip_grad_norm_(model.parameters(), 0.5)
+        with algo.optimizer.skip_synchronize():
+            algo.optimizer.step()
+        torch.nn.utils.clip_grad_norm_(ref_model.parameters(), 0.5)
+        ref_optimizer.step()
+        for p, ref_p in zip(model.parameters(), ref_model.parameters()):
+            assert torch.allclose(p, ref_p, atol=1e-6)
+
+        # a plain step synchronizes by itself, the ranks stay in step
+        algo.optimizer.zero_grad()
+        _loss(model, rank).backward()
+        algo.optimizer.step()
+        params = torch.cat([p.detach().reshape(-1) for p in model.parameters()])
+        root_params = params.clone()
+        dist.broadcast(root_params, src=0)
+        assert torch.equal(params, root_params)
+    finally:
+        dist.destroy_process_group()
+
+
+def test_two_process_gloo():
+    mp.spawn(_check_rank, args=(_free_port(),), nprocs=WORLD_SIZE, join=True)
+
+
+def test_generated_optimizer_subclass():
+    # a subclass of the generated class builds and steps, inside skip_synchronize it needs no process group
+    model = _model(seed=0)
+    optimizer = distributed_optimizer(torch.optim.Adam(model.parameters(), lr=1e-2), WORLD_SIZE)
+    assert type(optimizer).__name__ == 'Adam' and isinstance(optimizer, torch.optim.Adam)
+
+    class _CountingAdam(type(optimizer)):
+        def step(self, closure=None):
+            self.num_steps = getattr(self, 'num_steps', 0) + 1
+            return super().step(closure)
+
+    ref_model = _model(seed=0)
+    ref_optimizer = torch.optim.Adam(ref_model.parameters(), lr=1e-2)
+    sub_optimizer = _CountingAdam(optimizer.param_groups, WORLD_SIZE)
+    sub_optimizer.load_state_dict(optimizer.state_dict())
+    assert sub_optimizer._world_size == WORLD_SIZE and sub_optimizer.param_groups[0]['lr'] == 1e-2
+    for _ in range(2):
+        _loss(model, 0).backward()
+        _loss(ref_model, 0).backward()
+        with sub_optimizer.skip_synchronize():
+            sub_optimizer.step()
+        ref_optimizer.step()
+        sub_optimizer.zero_grad()
+        ref_optimizer.zero_grad()
+    assert sub_optimizer.num_steps == 2
+    for p, ref_p in zip(model.parameters(), ref_model.parameters()):
+        assert torch.equal(p, ref_p)
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+import torch
+from torch.profiler import profile, ProfilerActivity
+
+from env.tasks.vec_task_wrappers import VecTaskPythonWrapper
+
+NUM_ENVS = 16
+NUM_OBS = 10
+
+
+class _FakeTask():
+    # writes its buffers in place on every step, like the isaacgym tasks
+    def __init__(self, device='cpu'):
+        self.device = device
+        self.num_envs = NUM_ENVS
+        self.num_obs = NUM_OBS
+        self.num_states = 0
+        self.num_actions = 3
+        self.obs_buf = torch.zeros(NUM_ENVS, NUM_OBS, device=device)
+        self.rew_buf = torch.zeros(NUM_ENVS, device=device)
+        self.reset_buf = torch.zeros(NUM_ENVS, dtype=torch.long, device=device)
+        self.extras = {}
+
+    def get_num_amp_obs(self):
+        return 1
+
+    def step(self, actions):
+        self.obs_buf.normal_(std=10.)
+        return
+
+    def reset(self, env_ids=None):
+        self.obs_buf.normal_(std=10.)
+        return
+
+
+@pytest.fixture(autouse=True)
+def numpy_inf(monkeypatch):
+    # VecTask builds its spaces with np.Inf, which requirements.txt's numpy 1.21 has and numpy 2 dropped
+    monkeypatch.setattr(np, 'Inf', np.inf, raising=False)
+
+
+def _allocated_bytes(fn, num_calls=5):
+    with profile(activities=[ProfilerActivity.CPU], profile_memory=True) as prof:
+        for _ in range(num_calls):
+            fn()
+    return sum(e.cpu_memory_usage for e in prof.key_averages() if e.key != '[memory]' and e.cpu_memory_usage > 0)
+
+
+@pytest.mark.parametrize('clip_observations', [np.inf, 5.])
+def test_obs_returned_without_allocation(clip_observations):
+    env = VecTaskPythonWrapper(_FakeTask(), 'cpu', clip_observations=clip_observations)
+    actions = torch.zeros(NUM_ENVS, 3)
+    obs = env.reset()
+    first_ptr = obs.data_ptr()
+
+    for _ in range(3):
+        obs = env.step(actions)[0]
+        # the same buffer every step, holding the clipped observations of that step
+        assert obs.data_ptr() == first_ptr
+        assert torch.equal(obs, env.task.obs_buf.clamp(-clip_observations, clip_observations))
+    assert env.reset().data_ptr() == first_ptr
+    # nothing to clip, the task's own buffer is returned
+    assert (obs is env.task.obs_buf) == np.isinf(clip_observations)
+
+    assert _allocated_bytes(env.get_obs) == 0
+
+
+@pytest.mark.skipif(not torch.cuda.is_available(), reason="needs a GPU")
+def test_obs_copied_to_rl_device_without_allocation():
+    env = VecTaskPythonWrapper(_FakeTask('cuda:0'), 'cpu', clip_observations=np.inf)
+    obs = env.get_obs()
+    assert obs.device == torch.device('cpu')
+    assert torch.equal(obs, env.task.obs_buf.cpu())
+    assert _allocated_bytes(env.get_obs) == 0
+    assert env.get_obs().data_ptr() == obs.data_ptr()
@@ -0,0 +1,89 @@
+import functools
+
+import torch
+
+from env.tasks.vec_task_sharded import VecTaskPythonSharded
+
+NUM_ENVS = 7
+NUM_OBS = 3
+NUM_ACTIONS = 2
+EPISODE_LENGTH = 3
+
+
+class _FakeTask():
+    def get_task_obs_size(self):
+        return 0
+
+
+class _FakeEnv():
+    # a deterministic VecTaskPythonWrapper stand-in, obs and rewards depend on the global env id
+    def __init__(self, env_ids):
+        self.env_ids = env_ids
+        self.num_envs = len(env_ids)
+        self.num_obs = NUM_OBS
+        self.num_states = 0
+        self.num_actions = NUM_ACTIONS
+        self.task = _FakeTask()
+        self.observation_space = None
+        self.action_space = None
+        self.state_space = None
+        self.amp_observation_space = None
+        self._steps = torch.zeros(self.num_envs, dtype=torch.long)
+        self._obs = torch.zeros(self.num_envs, NUM_OBS)
+
+    def get_number_of_agents(self):
+        return 1
+
+    def _write_obs(self):
+        self._obs[:] = (self.env_ids.unsqueeze(-1) * 10 + self._steps.unsqueeze(-1)).float() + torch.arange(NUM_OBS)
+        return self._obs
+
+    def step(self, actions):
+        self._steps += 1
+        rewards = actions.sum(-1) * self.env_ids.float()
+        resets = (self._steps >= EPISODE_LENGTH + self.env_ids % 2).long()
+        extras = {'terminate': resets * (self.env_ids % 3 == 0).long()}
+        return self._write_obs(), rewards, resets, extras
+
+    def reset(self, env_ids=None):
+        if env_ids is None:
+            self._steps[:] = 0
+        else:
+            self._steps[env_ids] = 0
+        return self._write_obs()
+
+    def fetch_amp_obs_demo(self, num_samples):
+        return torch.arange(num_samples * 4, dtype=torch.float).reshape(num_samples, 4)
+
+
+def _make_fake_env(shard_id, shard_sizes):
+    start = sum(shard_sizes[:shard_id])
+    return _FakeEnv(torch.arange(start, start + shard_sizes[shard_id]))
+
+
+def _rollout(env, num_steps=6):
+    outputs = [env.reset().clone()]
+    actions = torch.linspace(-1., 1., NUM_ENVS * NUM_ACTIONS).reshape(NUM_ENVS, NUM_ACTIONS)
+    for n in range(num_steps):
+        obs, rewards, resets, extras = env.step(actions * (n + 1))
+        outputs += [obs.clone(), rewards.clone(), resets.clone(), extras['terminate'].clone()]
+        # alternate between index and mask resets
+        env_ids = resets.nonzero(as_tuple=False).flatten() if n % 2 == 0 else resets.bool()
+        outputs.append(env.reset(env_ids).clone())
+    return outputs
+
+
+def test_sharded_matches_single_process():
+    expected = _rollout(_FakeEnv(torch.arange(NUM_ENVS)))
+    shard_sizes = [3, 2, 2]
+    env = VecTaskPythonSharded(functools.partial(_make_fake_env, shard_sizes=shard_sizes), len(shard_sizes), 'cpu')
+    try:
+        assert env.num_envs == NUM_ENVS
+        outputs = _rollout(env)
+        demo = env.fetch_amp_obs_demo(5)
+    finally:
+        env.close()
+    assert len(outputs) == len(expected)
+    for out, exp in zip(outputs, expected):
+        assert torch.equal(out, exp.to(out.dtype))
+    assert torch.equal(demo, _FakeEnv(torch.arange(1)).fetch_amp_obs_demo(5))